@@ -1,3 +1,12 @@
 #!/usr/bin/python
 
-from . import bash, fish, shell, utils, zsh
+import importlib
+
+# The submodules are imported on first access, so that importing a single
+# submodule (e.g. the client in `server`) does not import the generators.
+__all__ = ['bash', 'fish', 'shell', 'utils', 'zsh']
+
+def __getattr__(name):
+    if name in __all__:
+        return importlib.import_module('.' + name, __name__)
+    raise AttributeError("module %r has no attribute %r" % (__name__, name))
@@ -131,11 +131,11 @@ def ArgumentParser_to_CommandLine(parser, prog=None, description=None):
 
         exclusive_group = MutuallyExclusiveGroup(commandline, group_name)
         for action in group._group_actions:
-            for option in commandline.get_options():
-                for option_string in action.option_strings:
-                    if option_string in option.option_strings:
-                        exclusive_group.add_option(option)
-                        break
+            for option_string in action.option_strings:
+                option = commandline.get_option_by_string(option_string)
+                if option is not None:
+                    exclusive_group.add_option(option)
+                    break
 
     return commandline
 
@@ -1,6 +1,7 @@
 #!/usr/bin/python3
 
 import subprocess
+from collections import OrderedDict
 
 from . import shell, utils
 from . import bash_helpers
@@ -107,7 +108,10 @@ class BashCompleter(shell.ShellCompleter):
 
     def directory(self, ctxt, opts={}):
         directory = opts.get('directory', None)
-        if directory:
+        if directory and ctxt.config.cache_file_completions:
+            funcname = ctxt.helpers.use_function('cached_filedir')
+            return BashCompletionCommand(ctxt, '%s %s -d' % (funcname, shell.escape(directory)))
+        elif directory:
             cmd =  'pushd %s &>/dev/null && {\n'
             cmd += '  _filedir -d\n'
             cmd += '  popd &>/dev/null\n'
@@ -118,7 +122,10 @@ class BashCompleter(shell.ShellCompleter):
 
     def file(self, ctxt, opts={}):
         directory = opts.get('directory', None)
-        if directory:
+        if directory and ctxt.config.cache_file_completions:
+            funcname = ctxt.helpers.use_function('cached_filedir')
+            return BashCompletionCommand(ctxt, '%s %s' % (funcname, shell.escape(directory)))
+        elif directory:
             cmd =  'pushd %s &>/dev/null && {\n'
             cmd += '  _filedir\n'
             cmd += '  popd &>/dev/null\n'
@@ -209,6 +216,9 @@ class BashCompletionGenerator():
         self.positionals = commandline.get_positionals()
         self.subcommands = commandline.get_subcommands_option()
         self.completer   = BashCompleter()
+        self.when_variables = {}
+        self.continues_parent_parse = ctxt.config.bash_single_pass and commandline.parent is not None
+        self.group_variables = self._get_group_variables()
         self._complete_commandline()
 
     def _complete_action(self, action, append=True):
@@ -220,6 +230,57 @@ class BashCompletionGenerator():
             utils.flatten(o.get_long_option_strings() + o.get_old_option_strings() for o in options)
         )
 
+    def _get_group_variables(self):
+        # Each mutually exclusive group is tracked by a single GROUP_<N> bitmask
+        # that is set while parsing the options. Options that cannot be repeated
+        # share bit 1, since any other member of the group disables them anyway.
+        # Options that can be repeated get a bit of their own, so that they are
+        # still completed if only they have been seen.
+        #
+        # The groups are numbered across all parent commandlines, so that in
+        # single-pass mode the variables of the parent groups can be set, too.
+        #
+        # Returns a dictionary mapping `id(option)` to a tuple of
+        # (variable, assignment, guard).
+        r = {}
+
+        groups = [(commandline, options)
+                  for commandline in self.commandline.get_parents(include_self=True)
+                  for options in commandline.get_mutually_exclusive_groups().values()]
+
+        for i, (commandline, options) in enumerate(groups):
+            if commandline is not self.commandline and not self.continues_parent_parse:
+                continue
+
+            num_multiple = sum(1 for o in options if o.multiple_option)
+            if len(options) < 2 or num_multiple > 62:
+                continue
+
+            variable = 'GROUP_%d' % i
+            bits, next_bit = [], 2
+            for option in options:
+                if option.multiple_option:
+                    bits.append(next_bit)
+                    next_bit <<= 1
+                else:
+                    bits.append(1)
+            all_bits = sum(set(bits))
+
+            for option, bit in zip(options, bits):
+                if bit == all_bits:
+                    assignment = '%s=1' % variable
+                else:
+                    assignment = '%s=$((%s | %d))' % (variable, variable, bit)
+
+                if bit == 1:
+                    guard = '! %s' % variable
+                else:
+                    guard = '! (%s & %d)' % (variable, all_bits & ~bit)
+
+                r[id(option)] = (variable, assignment, guard)
+
+        return r
+
     def _generate_options_parsing(self):
         def get_long_options_case_without_arg(options):
             return '|'.join(options)
@@ -230,6 +291,12 @@ class BashCompletionGenerator():
         def get_short_options_case(options):
             return '|'.join(o[1] for o in options)
 
+        def set_have(option):
+            r = '%s=1' % make_option_variable_name(option, prefix='HAVE_')
+            if id(option) in self.group_variables:
+                r += ' %s' % self.group_variables[id(option)][1]
+            return r
+
         options = self.commandline.get_options(with_parent_options=True)
 
         if self.commandline.abbreviate_options:
@@ -237,14 +304,38 @@ class BashCompletionGenerator():
         else:
             abbreviations = utils.DummyAbbreviationGenerator()
 
+        if self.continues_parent_parse:
+            # The variables of the parent options are declared by the parent functions
+            parent_options = self.commandline.parent.get_options(with_parent_options=True)
+            declared = set(make_option_variable_name(o) for o in parent_options)
+            local_options = [o for o in self.options if make_option_variable_name(o) not in declared]
+        else:
+            local_options = options
+
         local = ' '.join(
             '%s=0 %s=\'\'' % (
                 make_option_variable_name(o, prefix='HAVE_'),
                 make_option_variable_name(o, prefix='VALUE_')
             )
-            for o in options
+            for o in local_options
         )
 
+        group_variables = OrderedDict(
+            (self.group_variables[id(o)][0], None) for o in self.options if id(o) in self.group_variables)
+        if group_variables:
+            local += ' ' + ' '.join('%s=0' % v for v in group_variables)
+
+        subcommand_call = ''
+        if self.ctxt.config.bash_single_pass and self.subcommands:
+            if self.commandline.inherit_options:
+                local += ' SUBCOMMAND_CALLED=0'
+            # Call the subcommand function as soon as the subcommand is parsed,
+            # so it continues parsing the remaining words.
+            subcommand_call  = '\nif (( POSITIONAL_NUM == %d )); then\n' % self.subcommands.get_positional_num()
+            subcommand_call += '%s\n' % utils.indent(self._generate_subcommand_case('$arg', True), 2)
+            subcommand_call += 'fi'
+            subcommand_call  = utils.indent(subcommand_call, 6)
+
         case_long_options = []
         case_short_options = []
 
@@ -256,28 +347,28 @@ class BashCompletionGenerator():
             if long_options:
                 if option.takes_args == '?':
                     r  = '%s)\n'      % get_long_options_case_without_arg(long_options)
-                    r += '  %s=1;;\n' % make_option_variable_name(option, prefix='HAVE_')
+                    r += '  %s;;\n' % set_have(option)
                     r += '%s)\n'      % get_long_options_case_with_arg(long_options)
-                    r += '  %s=1\n'   % make_option_variable_name(option, prefix='HAVE_')
+                    r += '  %s\n'   % set_have(option)
                     r += '  %s="${arg#*=}";;' % make_option_variable_name(option, prefix='VALUE_')
                     case_long_options.append(r)
                 elif option.takes_args:
                     r  = '%s)\n'      % get_long_options_case_without_arg(long_options)
-                    r += '  %s=1\n'   % make_option_variable_name(option, prefix='HAVE_')
+                    r += '  %s\n'   % set_have(option)
                     r += '  %s="${words[$((++argi))]}";;\n' % make_option_variable_name(option, prefix='VALUE_')
                     r += '%s)\n'      % get_long_options_case_with_arg(long_options)
-                    r += '  %s=1\n'   % make_option_variable_name(option, prefix='HAVE_')
+                    r += '  %s\n'   % set_have(option)
                     r += '  %s="${arg#*=}";;' % make_option_variable_name(option, prefix='VALUE_')
                     case_long_options.append(r)
                 else:
                     r  = '%s)\n' % get_long_options_case_without_arg(long_options)
-                    r += '  %s=1;;' % make_option_variable_name(option, prefix='HAVE_')
+                    r += '  %s;;' % set_have(option)
                     case_long_options.append(r)
 
             if short_options:
                 if option.takes_args == '?':
                     r  = '%s)\n'    % get_short_options_case(short_options)
-                    r += '  %s=1\n' % make_option_variable_name(option, prefix='HAVE_')
+                    r += '  %s\n' % set_have(option)
                     r += '  if $has_trailing_chars; then\n'
                     r += '    %s="${arg:$((c + 1))}"\n' % make_option_variable_name(option, 'VALUE_')
                     r += '  fi\n'
@@ -285,7 +376,7 @@ class BashCompletionGenerator():
                     case_short_options.append(r)
                 elif option.takes_args:
                     r  = '%s)\n'    % get_short_options_case(short_options)
-                    r += '  %s=1\n' % make_option_variable_name(option, prefix='HAVE_')
+                    r += '  %s\n' % set_have(option)
                     r += '  if $has_trailing_chars; then\n'
                     r += '    %s="${arg:$((c + 1))}"\n' % make_option_variable_name(option, 'VALUE_')
                     r += '  else\n'
@@ -295,16 +386,28 @@ class BashCompletionGenerator():
                     case_short_options.append(r)
                 else:
                     r  = '%s)\n'    % get_short_options_case(short_options)
-                    r += '  %s=1;;' % make_option_variable_name(option, prefix='HAVE_')
+                    r += '  %s;;' % set_have(option)
                     case_short_options.append(r)
 
-        s = '''\
+        if self.continues_parent_parse:
+            # Continue parsing where the parent function stopped
+            s = '''\
+local %LOCALS%
+
+for ((++argi; argi < ${#words[@]} - 1; ++argi)); do
+  local arg="${words[$argi]}"'''
+            if not local:
+                s = s.replace('local %LOCALS%\n\n', '')
+        else:
+            s = '''\
 local -a POSITIONALS
 local END_OF_OPTIONS=0 POSITIONAL_NUM=0 %LOCALS%
 
 local argi
 for ((argi=1; argi < ${#words[@]} - 1; ++argi)); do
-  local arg="${words[$argi]}"
+  local arg="${words[$argi]}"'''
+
+        s += '''
 
   case "$arg" in
 %CASE_LONG_OPTIONS%
@@ -322,13 +425,14 @@ for ((argi=1; argi < ${#words[@]} - 1; ++argi)); do
       local c
       for ((c=1; c < ${#arg}; ++c)); do
         local char="${arg:$c:1}"
-        local has_trailing_chars=$( (( $c + 1 < ${#arg} )) && echo true || echo false)
+        local has_trailing_chars=false
+        (( c + 1 < ${#arg} )) && has_trailing_chars=true
         case "$char" in
 %CASE_SHORT_OPTIONS%
         esac
       done;;
     *)
-      POSITIONALS[$((POSITIONAL_NUM++))]="$arg";;
+      POSITIONALS[$((POSITIONAL_NUM++))]="$arg"%SUBCOMMAND_CALL%;;
   esac
 done
 
@@ -342,6 +446,7 @@ for ((; argi < ${#words[@]}; ++argi)); do
   esac
 done'''
         s = s.replace('%LOCALS%', local)
+        s = s.replace('%SUBCOMMAND_CALL%', subcommand_call)
 
         if len(case_long_options):
             s = s.replace('%CASE_LONG_OPTIONS%', utils.indent('\n'.join(case_long_options), 4))
@@ -359,15 +464,11 @@ done'''
         result = []
 
         for option_string in option_strings:
-            found = False
-            for option in self.options:
-                if option_string in option.option_strings:
-                    if option not in result:
-                        result.append(option)
-                    found = True
-                    break
-            if not found:
+            option = self.commandline.get_option_by_string(option_string)
+            if option is None:
                 raise Exception('Option %r not found' % option_string)
+            if option not in result:
+                result.append(option)
 
         return result
 
@@ -412,29 +513,52 @@ done'''
         else:
             raise Exception('invalid instance of `parse`')
 
+    def _generate_when_variables(self):
+        # Every distinct `when` condition is evaluated only once per completion.
+        # The result is stored in a WHEN_<N> variable which is then used by
+        # the option and positional guards.
+        conditions = OrderedDict()
+
+        for action in list(self.options) + self.positionals:
+            if action.when is None or action.when in self.when_variables:
+                continue
+
+            condition = self._generate_when_conditions(action.when)
+            if condition not in conditions:
+                conditions[condition] = 'WHEN_%d' % len(conditions)
+            self.when_variables[action.when] = conditions[condition]
+
+        if not conditions:
+            return ''
+
+        r  = 'local %s\n' % ' '.join('%s=0' % var for var in conditions.values())
+        r += '\n'.join('%s && %s=1' % (cond, var) for cond, var in conditions.items())
+        return r
+
     def _generate_option_strings_completion(self):
         r  = 'if (( ! END_OF_OPTIONS )) && [[ "$cur" = -* ]]; then\n'
         r += '  local -a POSSIBLE_OPTIONS=()\n'
         for option in self.options:
             option_guard = []
 
-            if not option.multiple_option:
-                option_guard += ["! %s" % make_option_variable_name(option, prefix='HAVE_')]
+            if id(option) in self.group_variables:
+                option_guard += [self.group_variables[id(option)][2]]
+            else:
+                if not option.multiple_option:
+                    option_guard += ["! %s" % make_option_variable_name(option, prefix='HAVE_')]
 
-            for exclusive_option in option.get_conflicting_options():
-                option_guard += ["! %s" % make_option_variable_name(exclusive_option, prefix='HAVE_')]
+                for exclusive_option in option.get_conflicting_options():
+                    option_guard += ["! %s" % make_option_variable_name(exclusive_option, prefix='HAVE_')]
+
+            if option.when is not None:
+                option_guard += [self.when_variables[option.when]]
 
             if option_guard:
                 option_guard = '(( %s )) && ' % ' && '.join(option_guard)
             else:
                 option_guard = ''
 
-            when_guard = ''
-            if option.when is not None:
-                when_guard = self._generate_when_conditions(option.when)
-                when_guard = '%s && ' % when_guard
-
-            r += '  %s%sPOSSIBLE_OPTIONS+=(%s)\n' % (option_guard, when_guard, ' '.join(shell.escape(o) for o in option.option_strings))
+            r += '  %sPOSSIBLE_OPTIONS+=(%s)\n' % (option_guard, ' '.join(shell.escape(o) for o in option.option_strings))
         r += '  %s -a -- "$cur" "${POSSIBLE_OPTIONS[@]}"\n' % self.ctxt.helpers.use_function('compgen_w_replacement')
         r += '  return 0\n'
         r += 'fi'
@@ -635,7 +759,7 @@ __is_oldstyle_option() {
                 operator = '-ge'
             r += 'test "$POSITIONAL_NUM" %s %d && ' % (operator, positional.get_positional_num())
             if positional.when:
-                r += '%s && ' % self._generate_when_conditions(positional.when)
+                r += '(( %s )) && ' % self.when_variables[positional.when]
             r += '{\n'
             r += '%s\n}\n' % utils.indent(self._complete_action(positional), 4)
 
@@ -646,7 +770,7 @@ __is_oldstyle_option() {
             r += '%s\n}\n' % utils.indent(complete, 4)
         return r.strip()
 
-    def _generate_subcommand_call(self):
+    def _generate_subcommand_case(self, word, set_called=False):
         # This code is used to call subcommand functions
 
         if self.commandline.abbreviate_commands:
@@ -655,8 +779,7 @@ __is_oldstyle_option() {
         else:
             abbrevs = utils.DummyAbbreviationGenerator()
 
-        r  = 'if (( %i < POSITIONAL_NUM )); then\n' % (self.subcommands.get_positional_num() - 1)
-        r += '  case "${POSITIONALS[%i]}" in\n' % (self.subcommands.get_positional_num() - 1)
+        r = 'case "%s" in\n' % word
         for subcommand in self.subcommands.subcommands:
             cmds = abbrevs.get_abbreviations(subcommand.prog)
             for alias in subcommand.aliases:
@@ -664,10 +787,23 @@ __is_oldstyle_option() {
 
             pattern = '|'.join(shell.escape(s) for s in cmds)
             if self.commandline.inherit_options:
-                r += '    %s) %s && return 0;;\n' % (pattern, shell.make_completion_funcname(subcommand))
+                if set_called:
+                    r += '  %s) SUBCOMMAND_CALLED=1; %s && return 0;;\n' % (pattern, shell.make_completion_funcname(subcommand))
+                else:
+                    r += '  %s) %s && return 0;;\n' % (pattern, shell.make_completion_funcname(subcommand))
             else:
-                r += '    %s) %s && return 0 || return 1;;\n' % (pattern, shell.make_completion_funcname(subcommand))
-        r += '  esac\n'
+                r += '  %s) %s && return 0 || return 1;;\n' % (pattern, shell.make_completion_funcname(subcommand))
+        r += 'esac'
+        return r
+
+    def _generate_subcommand_call(self):
+        num = self.subcommands.get_positional_num() - 1
+
+        if self.ctxt.config.bash_single_pass and self.commandline.inherit_options:
+            r = 'if (( ! SUBCOMMAND_CALLED && %i < POSITIONAL_NUM )); then\n' % num
+        else:
+            r = 'if (( %i < POSITIONAL_NUM )); then\n' % num
+        r += '%s\n' % utils.indent(self._generate_subcommand_case('${POSITIONALS[%i]}' % num), 2)
         r += 'fi'
         return r
 
@@ -700,6 +836,10 @@ __is_oldstyle_option() {
             # This code is used to complete arguments of options
             code += [self._generate_option_completion()]
 
+        # This sets up the WHEN_* variables used by the code below.
+        code += [self._generate_when_variables()]
+
+        if len(self.options):
             # This code is used to complete option strings (--foo, ...)
             code += [self._generate_option_strings_completion()]
 
@@ -714,15 +854,42 @@ __is_oldstyle_option() {
 
         self.result = r
 
+def _get_max_candidates_function(funcname, max_candidates):
+    # Wraps the completion function. The candidates are always kept in the
+    # order they were produced, so that the listing does not change its order
+    # when it gets truncated. The last entry reports the number of omitted ones.
+    r  = '%s_max_candidates() {\n' % funcname
+    r += '  %s "$@"\n' % funcname
+    r += '\n'
+    r += '  compopt -o nosort 2>/dev/null\n'
+    r += '\n'
+    r += '  if (( ${#COMPREPLY[@]} > %d )); then\n' % max_candidates
+    r += '    local OMITTED=$(( ${#COMPREPLY[@]} - %d ))\n' % max_candidates
+    r += '    COMPREPLY=("${COMPREPLY[@]:0:%d}" "($OMITTED more not shown)")\n' % max_candidates
+    r += '  fi\n'
+    r += '}'
+    return r
+
 def generate_completion(commandline, program_name=None, config=None):
     result = shell.CompletionGenerator(BashCompletionGenerator, bash_helpers.BASH_Helpers, commandline, program_name, config)
+    config = result.ctxt.config
     commandline = result.result[0].commandline
 
+    def finish(kind, name, code, may_minify=True):
+        return shell.finish_code(config, 'bash', kind, name, code, may_minify)
+
     output  = [generation_notice.GENERATION_NOTICE]
-    output += result.include_files_content
-    output += result.ctxt.helpers.get_used_functions_code()
-    output += [r.result for r in result.result]
-    output += ['complete -F %s %s' % (shell.make_completion_funcname(commandline), commandline.prog)]
+    output += [finish('include', file, code, False) for file, code in zip(config.include_files, result.include_files_content)]
+    output += [finish('helper', funcname, code) for funcname, code in result.ctxt.helpers.get_used_functions()]
+    output += [finish('command', shell.get_command_path(r.commandline), r.result) for r in result.result]
+
+    funcname = shell.make_completion_funcname(commandline)
+    if config.bash_max_candidates:
+        output += [finish('helper', funcname + '_max_candidates',
+            _get_max_candidates_function(funcname, config.bash_max_candidates))]
+        funcname += '_max_candidates'
+
+    output += ['complete -F %s %s' % (funcname, commandline.prog)]
     if config.vim_modeline:
         output += [modeline.get_vim_modeline('sh')]
 
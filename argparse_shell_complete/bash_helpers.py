@@ -321,10 +321,9 @@ done
 
 _VALUE_LIST = helpers.ShellFunction('value_list', r'''
 local SEPARATOR="$1"; shift
-local -a VALUES=("$@")
 
 if [[ -z "$cur" ]]; then
-  COMPREPLY=("${VALUES[@]}")
+  COMPREPLY=("$@")
   return
 fi
 
@@ -332,37 +331,28 @@ local IFS="$SEPARATOR"
 local -a HAVING_VALUES=($cur)
 unset IFS
 
-local -a REMAINING_VALUES=()
-local VALUE='' HAVING_VALUE='' FOUND_VALUE=''
-
-for VALUE in "${VALUES[@]}"; do
-  FOUND_VALUE=false
-
-  for HAVING_VALUE in "${HAVING_VALUES[@]}"; do
-    if [[ "$VALUE" == "$HAVING_VALUE" ]]; then
-      FOUND_VALUE=true
-      break
-    fi
-  done
-
-  if ! $FOUND_VALUE; then
-    REMAINING_VALUES+=("$VALUE")
-  fi
+# Values that are already in the list (empty strings can't be keys)
+local -A USED_VALUES=()
+local VALUE=''
+for VALUE in "${HAVING_VALUES[@]}"; do
+  [[ -n "$VALUE" ]] && USED_VALUES["$VALUE"]=1
 done
 
 COMPREPLY=()
 
 if [[ "${cur: -1}" == "$SEPARATOR" ]]; then
-  for VALUE in "${REMAINING_VALUES[@]}"; do
-    COMPREPLY+=("$cur$VALUE")
+  for VALUE; do
+    if [[ -z "$VALUE" || -z "${USED_VALUES["$VALUE"]+set}" ]]; then
+      COMPREPLY+=("$cur$VALUE")
+    fi
   done
 elif (( ${#HAVING_VALUES[@]} )); then
-  local CUR_LAST_VALUE=${HAVING_VALUES[-1]}
+  local CUR_LAST_VALUE="${HAVING_VALUES[-1]}"
+  local CUR_PREFIX="${cur%"$CUR_LAST_VALUE"}"
 
-  COMPREPLY=()
-  for VALUE in "${REMAINING_VALUES[@]}"; do
-    if [[ "$VALUE" == "$CUR_LAST_VALUE"* ]]; then
-      COMPREPLY+=("${cur%$CUR_LAST_VALUE}$VALUE")
+  for VALUE; do
+    if [[ "$VALUE" == "$CUR_LAST_VALUE"* ]] && [[ -z "$VALUE" || -z "${USED_VALUES["$VALUE"]+set}" ]]; then
+      COMPREPLY+=("$CUR_PREFIX$VALUE")
     fi
   done
 fi
@@ -377,6 +367,67 @@ for VAR in $(declare -p -x | sed 's/=.*//; s/.* //'); do
 done
 ''')
 
+_CACHED_FILEDIR = helpers.ShellFunction('cached_filedir', r'''
+# Completes files inside directory $1, or only directories if $2 is `-d`.
+#
+# The listing of a directory is cached in a global variable. Next to each
+# listing an empty stamp file is written just before the directory is read.
+# The listing is reused while the stamp is strictly newer than the directory,
+# which needs no external commands. A change made in the same timestamp tick
+# as the listing (e.g. within the same second on file systems with a precision
+# of one second) leaves the times equal, so the directory is read again.
+#
+# The stamp files are kept in a directory created once per shell, inside
+# $XDG_RUNTIME_DIR if set, which is removed at logout.
+
+local DIR="$1" TYPE="${2:--f}" SUBDIR='' KEY='' STAMP='' ENTRY=''
+local -a ENTRIES=()
+
+# Words containing quotes or expansions are left to _filedir
+if [[ "$cur" == *[\'\"\\$~]* ]]; then
+  pushd "$DIR" &>/dev/null && {
+    _filedir ${2:+"$2"}
+    popd &>/dev/null
+  }
+  return
+fi
+
+[[ "$DIR" == /* ]] || DIR="$PWD/$DIR"
+[[ "$cur" == */* ]] && SUBDIR="${cur%/*}/"
+[[ -d "$DIR/$SUBDIR" ]] || return
+
+declare -gA _ARGPARSE_SHELL_COMPLETE_FILE_CACHE _ARGPARSE_SHELL_COMPLETE_FILE_CACHE_STAMP
+declare -g _ARGPARSE_SHELL_COMPLETE_FILE_CACHE_DIR
+
+if [[ ! -d "$_ARGPARSE_SHELL_COMPLETE_FILE_CACHE_DIR" ]]; then
+  _ARGPARSE_SHELL_COMPLETE_FILE_CACHE_DIR="$(mktemp -d "${XDG_RUNTIME_DIR:-${TMPDIR:-/tmp}}/argparse-shell-complete.XXXXXX")" || return
+  _ARGPARSE_SHELL_COMPLETE_FILE_CACHE_STAMP=()
+fi
+
+KEY="$TYPE $DIR/$SUBDIR"
+STAMP="${_ARGPARSE_SHELL_COMPLETE_FILE_CACHE_STAMP[$KEY]}"
+
+if [[ -z "$STAMP" ]]; then
+  STAMP="$_ARGPARSE_SHELL_COMPLETE_FILE_CACHE_DIR/${#_ARGPARSE_SHELL_COMPLETE_FILE_CACHE_STAMP[@]}"
+  _ARGPARSE_SHELL_COMPLETE_FILE_CACHE_STAMP[$KEY]="$STAMP"
+fi
+
+if [[ ! "$STAMP" -nt "$DIR/$SUBDIR" ]]; then
+  : > "$STAMP"
+  pushd "$DIR" &>/dev/null || return
+  _ARGPARSE_SHELL_COMPLETE_FILE_CACHE[$KEY]="$(compgen $TYPE -- "$SUBDIR")"
+  popd &>/dev/null
+fi
+
+mapfile -t ENTRIES <<< "${_ARGPARSE_SHELL_COMPLETE_FILE_CACHE[$KEY]}"
+
+for ENTRY in "${ENTRIES[@]}"; do
+  [[ -n "$ENTRY" && "$ENTRY" == "$cur"* ]] && COMPREPLY+=("$ENTRY")
+done
+
+(( ${#COMPREPLY[@]} )) && compopt -o filenames 2>/dev/null
+''')
+
 class BASH_Helpers(helpers.GeneralHelpers):
     def __init__(self, function_prefix):
         super().__init__(function_prefix)
@@ -385,3 +436,4 @@ class BASH_Helpers(helpers.GeneralHelpers):
         self.add_function(_BASH_HELPER)
         self.add_function(_VALUE_LIST)
         self.add_function(_EXPORTED_VARIABLES)
+        self.add_function(_CACHED_FILEDIR)
@@ -1,5 +1,9 @@
 #!/usr/bin/python3
 
+import sys
+import itertools
+from types import MappingProxyType
+from contextlib import contextmanager
 from collections import OrderedDict
 
 from . import config as _config
@@ -7,6 +11,99 @@ from . import config as _config
 def is_bool(obj):
     return isinstance(obj, bool)
 
+def _intern(string):
+    if isinstance(string, str):
+        return sys.intern(string)
+    return string
+
+_NO_COMPLETE = ('none',)
+
+# Every modification gives a CommandLine a new version number, so a cached
+# view is stale if it was computed for another number (see
+# CommandLine._get_cached). The tree version of a CommandLine also changes
+# when one of its subcommands is modified (see CommandLine.set_validated).
+_versions = itertools.count()
+
+# Completion specs that are equal are shared between the options and
+# positionals created inside a `shared_complete_specs()` block, so a choices
+# list used by thousands of options exists only once in memory. The table
+# only lives as long as the block, e.g. while a file is loaded.
+_complete_specs = None
+
+def _freeze(obj):
+    # Returns an immutable copy of `obj`: lists become tuples and dicts
+    # become read-only mappings.
+    if isinstance(obj, (list, tuple)):
+        return tuple(_freeze(item) for item in obj)
+    if isinstance(obj, (dict, MappingProxyType)):
+        return MappingProxyType({key: _freeze(value) for key, value in obj.items()})
+    return obj
+
+def _thaw(obj):
+    # Reverses `_freeze()`, e.g. for passing a spec to `json.dumps()`.
+    if isinstance(obj, tuple):
+        return [_thaw(item) for item in obj]
+    if isinstance(obj, MappingProxyType):
+        return {key: _thaw(value) for key, value in obj.items()}
+    return obj
+
+def _make_key(obj):
+    # The type is part of the key, so that e.g. 1 and True are not merged
+    if isinstance(obj, tuple):
+        return (tuple, tuple(_make_key(item) for item in obj))
+    if isinstance(obj, MappingProxyType):
+        return (dict, tuple((_make_key(key), _make_key(value)) for key, value in obj.items()))
+    return (type(obj), obj)
+
+@contextmanager
+def shared_complete_specs():
+    '''
+    Shares equal completion specs between the options and positionals
+    that are created inside the `with` block.
+
+    Example:
+        with shared_complete_specs():
+            commandline = JSON_To_Commandline(objects)
+    '''
+    global _complete_specs
+
+    if _complete_specs is not None:
+        yield
+        return
+
+    _complete_specs = {}
+    try:
+        yield
+    finally:
+        _complete_specs = None
+
+def get_complete_spec(complete):
+    '''
+    Returns an immutable instance of the completion spec `complete`.
+
+    Lists are converted to tuples and dicts to read-only mappings. Inside a
+    `shared_complete_specs()` block equal specs return the same instance.
+
+    Args:
+        complete (tuple or list or None): The completion specification.
+
+    Returns:
+        tuple: The completion specification.
+    '''
+    if not complete:
+        return _NO_COMPLETE
+
+    complete = tuple(_freeze(item) for item in complete)
+
+    if _complete_specs is None:
+        return complete
+
+    try:
+        return _complete_specs.setdefault(_make_key(complete), complete)
+    except TypeError:
+        # Unhashable arguments, e.g. a set of choices
+        return complete
+
 class ExtendedBool:
     TRUE    = True
     FALSE   = False
@@ -17,6 +114,12 @@ class CommandLine:
     Represents a command line interface with options, positionals, and subcommands.
     '''
 
+    __slots__ = (
+        'prog', 'parent', 'help', 'aliases', 'abbreviate_commands',
+        'abbreviate_options', 'inherit_options', 'options', 'positionals',
+        'subcommands', 'group_options', '_cache', '_version', '_tree_version',
+        '_validated')
+
     def __init__(self,
                  program_name,
                  parent=None,
@@ -51,6 +154,74 @@ class CommandLine:
         self.options = []
         self.positionals = []
         self.subcommands = None
+        self.group_options = OrderedDict()
+        self._cache = {}
+        self._version = next(_versions)
+        self._tree_version = self._version
+        self._validated = -1
+
+    def _get_stamp(self, with_parents):
+        # Returns the version of the command line, or with `with_parents`
+        # the versions of the command line and of all its parents.
+        if not with_parents:
+            return self._version
+
+        stamp = []
+        commandline = self
+        while commandline is not None:
+            stamp.append(commandline._version)
+            commandline = commandline.parent
+        return tuple(stamp)
+
+    def _get_cached(self, key, compute, with_parents=False):
+        # Returns the cached result of `compute()`. The result is computed
+        # again if the command line, or with `with_parents` one of its
+        # parents, has been modified since.
+        stamp = self._get_stamp(with_parents)
+
+        try:
+            cached_stamp, r = self._cache[key]
+            if cached_stamp == stamp:
+                return r
+        except KeyError:
+            pass
+
+        r = compute()
+        self._cache[key] = (stamp, r)
+        return r
+
+    def _changed(self, added_option=None):
+        # Called when the options, positionals, subcommands or the parent of
+        # the command line have changed. This makes the cached views of the
+        # command line and of its subcommands stale. If `added_option` has
+        # been appended to the options, the option indexes are updated
+        # instead of being built again on the next lookup.
+        indexes = []
+        if added_option is not None:
+            for with_parents in (False, True):
+                key = ('option_index', with_parents)
+                entry = self._cache.get(key)
+                if entry is not None and entry[0] == self._get_stamp(with_parents):
+                    indexes.append((key, with_parents, entry[1]))
+
+        self._version = next(_versions)
+        self._tree_changed()
+
+        # The options of the command line come last in both indexes
+        for key, with_parents, index in indexes:
+            for string in added_option.option_strings:
+                index.setdefault(string, added_option)
+            self._cache[key] = (self._get_stamp(with_parents), index)
+
+    def _tree_changed(self):
+        # Called when the command line or one of its subcommands has
+        # changed. This drops the validated mark of the command line and
+        # of its parents.
+        version = next(_versions)
+        commandline = self
+        while commandline is not None:
+            commandline._tree_version = version
+            commandline = commandline.parent
 
     def add_option(self,
             option_strings,
@@ -88,6 +259,9 @@ class CommandLine:
                    multiple_option=multiple_option,
                    when=when)
         self.options.append(o)
+        if group is not None:
+            self._add_option_to_group(o)
+        self._changed(added_option=o)
         return o
 
     def add_positional(self,
@@ -119,18 +293,36 @@ class CommandLine:
                        complete=complete,
                        when=when)
         self.positionals.append(p)
+        self._changed()
         return p
 
-    def add_mutually_exclusive_group(self):
+    def add_mutually_exclusive_group(self, group):
         '''
         Adds a new mutually exclusive group
 
+        Args:
+            group (str): The name of the mutually exclusive group.
+
         Returns:
             MutuallyExclusiveGroup: The newly created mutually exclusive group.
         '''
-        group = MutuallyExclusiveGroup(self)
+        group = MutuallyExclusiveGroup(self, group)
         return group
 
+    def _add_option_to_group(self, option):
+        self.group_options.setdefault(option.group, []).append(option)
+        self._tree_changed()
+
+    def _remove_option_from_group(self, option):
+        options = self.group_options[option.group]
+        for i, o in enumerate(options):
+            if o is option:
+                del options[i]
+                break
+        if not options:
+            del self.group_options[option.group]
+        self._tree_changed()
+
     def add_subcommands(self, name='command', help=None):
         '''
         Adds a subcommands option to the command line if none exists already.
@@ -152,51 +344,91 @@ class CommandLine:
             raise Exception('CommandLine object already has subcommands')
 
         self.subcommands = SubCommandsOption(self, name, help)
+        self._changed()
         return self.subcommands
 
     def get_options(self, with_parent_options=False, only_with_arguments=False):
         '''
-        Gets a list of options associated with the command line.
+        Gets the options associated with the command line.
 
         Args:
             with_parent_options (bool): If True, include options from parent command lines.
             only_with_arguments (bool): If True, include only options that take arguments.
 
         Returns:
-            list: A list of Option objects
+            tuple: A tuple of Option objects
+
+        Note:
+            The result is cached and shared between calls, which is why it is
+            a tuple and not a list. Use `list()` to get a modifiable copy.
         '''
         assert is_bool(with_parent_options), "CommandLine.get_options: with_parent_options: expected bool, got %r" % with_parent_options
         assert is_bool(only_with_arguments), "CommandLine.get_options: only_with_arguments: expected bool, got %r" % only_with_arguments
 
-        commandlines = self.get_parents(include_self=True) if with_parent_options else [self]
-        result = []
+        def compute():
+            commandlines = self.get_parents(include_self=True) if with_parent_options else [self]
+            result = []
+
+            for commandline in commandlines:
+                for option in commandline.options:
+                    if only_with_arguments is False or option.takes_args:
+                        result.append(option)
+            return tuple(result)
 
-        for commandline in commandlines:
-            for option in commandline.options:
-                if only_with_arguments is False or option.takes_args:
-                    result.append(option)
-        return result
+        return self._get_cached(('options', with_parent_options, only_with_arguments), compute, with_parent_options)
 
     def get_option_strings(self, with_parent_options=False, only_with_arguments=False):
         '''
-        Gets a list of option strings associated with the command line.
+        Gets the option strings associated with the command line.
 
         Args:
             with_parent_options (bool): If True, include options from parent command lines.
             only_with_arguments (bool): If True, include only options that take arguments.
 
         Returns:
-            list: A list of option strings
+            tuple: A tuple of option strings
+
+        Note:
+            The result is cached and shared between calls, which is why it is
+            a tuple and not a list. Use `list()` to get a modifiable copy.
         '''
         assert is_bool(with_parent_options), "CommandLine.get_option_strings: with_parent_options: expected bool, got %r" % with_parent_options
         assert is_bool(only_with_arguments), "CommandLine.get_option_strings: only_with_arguments: expected bool, got %r" % only_with_arguments
 
-        option_strings = []
+        def compute():
+            option_strings = []
 
-        for o in self.get_options(with_parent_options=with_parent_options, only_with_arguments=only_with_arguments):
-            option_strings.extend(o.option_strings)
+            for o in self.get_options(with_parent_options=with_parent_options, only_with_arguments=only_with_arguments):
+                option_strings.extend(o.option_strings)
 
-        return option_strings
+            return tuple(option_strings)
+
+        return self._get_cached(('option_strings', with_parent_options, only_with_arguments), compute, with_parent_options)
+
+    def get_option_by_string(self, option_string, with_parent_options=False):
+        '''
+        Gets the option that has `option_string`.
+
+        If more than one option has `option_string`, the first one in the
+        order of `get_options()` is returned.
+
+        Args:
+            option_string (str): The option string, e.g. "--help".
+            with_parent_options (bool): If True, include options from parent command lines.
+
+        Returns:
+            Option or None: The option, or None if no option has `option_string`.
+        '''
+        assert is_bool(with_parent_options), "CommandLine.get_option_by_string: with_parent_options: expected bool, got %r" % with_parent_options
+
+        def compute():
+            index = {}
+            for option in self.get_options(with_parent_options=with_parent_options):
+                for string in option.option_strings:
+                    index.setdefault(string, option)
+            return index
+
+        return self._get_cached(('option_index', with_parent_options), compute, with_parent_options).get(option_string, None)
 
     def get_positionals(self):
         '''
@@ -210,6 +442,27 @@ class CommandLine:
         '''
         return list(self.positionals)
 
+    def get_mutually_exclusive_groups(self):
+        '''
+        Returns the mutually exclusive groups of the command line.
+
+        Returns:
+            OrderedDict: A mapping of group names to lists of Option objects.
+        '''
+        return self.group_options
+
+    def get_group_options(self, group):
+        '''
+        Returns the options belonging to a mutually exclusive group.
+
+        Args:
+            group (str): The name of the mutually exclusive group.
+
+        Returns:
+            list: A list of Option objects.
+        '''
+        return self.group_options.get(group, [])
+
     def get_subcommands_option(self):
         '''
         Gets the subcommands option of the command line.
@@ -251,6 +504,21 @@ class CommandLine:
             highest += 1
         return highest
 
+    def set_validated(self):
+        '''
+        Marks the command line as validated.
+
+        The mark is dropped as soon as the command line or one of its
+        subcommands is modified. It is kept by `copy()`.
+        '''
+        self._validated = self._tree_version
+
+    def is_validated(self):
+        '''
+        Returns True if the command line has been validated and was not modified since.
+        '''
+        return self._validated == self._tree_version
+
     def get_program_name(self):
         commandlines = self.get_parents(include_self=True)
         return commandlines[0].prog
@@ -258,42 +526,37 @@ class CommandLine:
     def copy(self):
         '''
         Make a copy of the current CommandLine object, including sub-objects.
-        '''
-        copy = CommandLine(
-            self.prog,
-            parent=None,
-            help=self.help,
-            aliases=self.aliases,
-            abbreviate_commands=self.abbreviate_commands,
-            abbreviate_options=self.abbreviate_options,
-            inherit_options=self.inherit_options)
-
-        for option in self.options:
-            copy.add_option(
-                option.option_strings,
-                metavar = option.metavar,
-                help = option.help,
-                complete = option.complete,
-                takes_args = option.takes_args,
-                group = option.group,
-                multiple_option = option.multiple_option,
-                when = option.when
-            )
 
-        for positional in self.positionals:
-            copy.add_positional(
-                positional.number,
-                metavar = positional.metavar,
-                help = positional.help,
-                repeatable = positional.repeatable,
-                complete = positional.complete,
-                when = positional.when
-            )
+        The copied Option and Positional objects share their attribute values
+        (option strings, completion specs, help texts) with the originals.
+        The objects are created without going through the constructors, so
+        the copy is not validated: it is exactly as valid as the source.
+        '''
+        copy = CommandLine.__new__(CommandLine)
+        copy.prog = self.prog
+        copy.parent = None
+        copy.help = self.help
+        copy.aliases = self.aliases
+        copy.abbreviate_commands = self.abbreviate_commands
+        copy.abbreviate_options = self.abbreviate_options
+        copy.inherit_options = self.inherit_options
+        copy.options = [option._copy(copy) for option in self.options]
+        copy.positionals = [positional._copy(copy) for positional in self.positionals]
+        copy.subcommands = None
+        copy.group_options = OrderedDict()
+        copy._cache = {}
+        copy._version = next(_versions)
+        copy._tree_version = copy._version
+        copy._validated = copy._tree_version if self.is_validated() else -1
+
+        # The copy is built without the modification methods, which would
+        # drop the validated mark
+        for option in copy.options:
+            if option.group is not None:
+                copy.group_options.setdefault(option.group, []).append(option)
 
         if self.subcommands is not None:
-            subcommands_option = copy.add_subcommands(self.subcommands.metavar, self.subcommands.help)
-            for subparser in self.subcommands.subcommands:
-                subcommands_option.add_commandline_object(subparser.copy())
+            copy.subcommands = self.subcommands._copy(copy)
 
         return copy
 
@@ -316,6 +579,8 @@ class CommandLine:
             self.prog, self.help, self.abbreviate_commands, self.options, self.positionals, self.subcommands)
 
 class Positional:
+    __slots__ = ('parent', 'number', 'metavar', 'help', 'repeatable', 'when', 'complete')
+
     def __init__(
             self,
             parent,
@@ -330,15 +595,11 @@ class Positional:
 
         self.parent = parent
         self.number = number
-        self.metavar = metavar
+        self.metavar = _intern(metavar)
         self.help = help
         self.repeatable = repeatable
-        self.when = when
-
-        if complete:
-            self.complete = complete
-        else:
-            self.complete = ('none',)
+        self.when = _intern(when)
+        self.complete = get_complete_spec(complete)
 
     def get_positional_index(self):
         '''
@@ -372,6 +633,16 @@ class Positional:
         '''
         return self.get_positional_index() + 1
 
+    def _copy(self, parent):
+        copy = Positional.__new__(Positional)
+        copy.parent = parent
+        copy.number = self.number
+        copy.metavar = self.metavar
+        copy.help = self.help
+        copy.repeatable = self.repeatable
+        copy.when = self.when
+        copy.complete = self.complete
+        return copy
 
     def OrderedDict(self):
         r = OrderedDict()
@@ -391,11 +662,15 @@ class Positional:
             r['when'] = self.when
 
         if self.complete and self.complete[0] != 'none':
-            r['complete'] = self.complete
+            r['complete'] = _thaw(self.complete)
 
         return r
 
 class Option:
+    __slots__ = (
+        'parent', 'option_strings', 'metavar', 'help', 'group', 'takes_args',
+        'multiple_option', 'when', 'complete')
+
     def __init__(
             self,
             parent,
@@ -408,13 +683,12 @@ class Option:
             multiple_option=ExtendedBool.INHERIT,
             when=None):
         self.parent = parent
-        self.option_strings = option_strings
-        self.metavar = metavar
+        self.metavar = _intern(metavar)
         self.help = help
-        self.group = group
+        self.group = _intern(group)
         self.takes_args = takes_args
         self.multiple_option = multiple_option
-        self.when = when
+        self.when = _intern(when)
 
         if not len(option_strings):
             raise Exception('Empty option strings')
@@ -426,14 +700,25 @@ class Option:
             if not option_string.startswith('-'):
                 raise Exception("Invalid option: %r" % option_string)
 
-        if complete:
-            self.complete = complete
-        else:
-            self.complete = ('none',)
+        self.option_strings = [sys.intern(o) for o in option_strings]
+        self.complete = get_complete_spec(complete)
 
         if not self.takes_args and self.metavar:
             raise Exception('Option does not take an argument but has metavar set')
 
+    def _copy(self, parent):
+        copy = Option.__new__(Option)
+        copy.parent = parent
+        copy.option_strings = list(self.option_strings)
+        copy.metavar = self.metavar
+        copy.help = self.help
+        copy.group = self.group
+        copy.takes_args = self.takes_args
+        copy.multiple_option = self.multiple_option
+        copy.when = self.when
+        copy.complete = self.complete
+        return copy
+
     def OrderedDict(self):
         r = OrderedDict()
         r['option_strings'] = self.option_strings
@@ -454,7 +739,7 @@ class Option:
             r['multiple_option'] = self.multiple_option
 
         if self.complete and self.complete[0] != 'none':
-            r['complete'] = self.complete
+            r['complete'] = _thaw(self.complete)
 
         if self.when is not None:
             r['when'] = self.when
@@ -506,12 +791,7 @@ class Option:
         '''
         if not self.group:
             return []
-        r = []
-        for option in self.parent.options:
-            if option.group == self.group:
-                r.append(option)
-        r.remove(self)
-        return r
+        return [o for o in self.parent.get_group_options(self.group) if o is not self]
 
     def get_conflicting_option_strings(self):
         '''
@@ -542,6 +822,8 @@ class Option:
             self.option_strings, self.metavar, self.help)
 
 class SubCommandsOption(Positional):
+    __slots__ = ('subcommands',)
+
     def __init__(self, parent, name, help):
         self.subcommands = list()
 
@@ -551,13 +833,32 @@ class SubCommandsOption(Positional):
             metavar='command',
             help=help)
 
+    def _copy(self, parent):
+        copy = SubCommandsOption.__new__(SubCommandsOption)
+        copy.parent = parent
+        copy.number = self.number
+        copy.metavar = self.metavar
+        copy.help = self.help
+        copy.repeatable = self.repeatable
+        copy.when = self.when
+        copy.complete = self.complete
+        copy.subcommands = []
+        for subcommand in self.subcommands:
+            subcommand = subcommand.copy()
+            subcommand.parent = parent
+            copy.subcommands.append(subcommand)
+        return copy
+
     def add_commandline_object(self, commandline):
         commandline.parent = self.parent
         self.subcommands.append(commandline)
+        commandline._changed()
+        self.parent._changed()
 
     def add_commandline(self, name, help=''):
         commandline = CommandLine(name, help=help, parent=self.parent)
         self.subcommands.append(commandline)
+        self.parent._changed()
         return commandline
 
     def get_all_subcommands(self, with_aliases=True):
@@ -583,6 +884,8 @@ class SubCommandsOption(Positional):
             self.help, self.subcommands)
 
 class MutuallyExclusiveGroup:
+    __slots__ = ('parent', 'group')
+
     def __init__(self, parent, group):
         assert isinstance(parent, CommandLine), "MutuallyExclusiveGroup: parent: expected CommandLine, got %r" % parent
 
@@ -608,8 +911,11 @@ class MutuallyExclusiveGroup:
 
     def add_option(self, option):
         ''' Adds an option object '''
+        if option.group is not None:
+            option.parent._remove_option_from_group(option)
         option.parent = self.parent
         option.group = self.group
+        self.parent._add_option_to_group(option)
 
 def CommandLine_Apply_Config(commandline, config):
     '''
@@ -1,5 +1,94 @@
 #!/usr/bin/python3
 
+import hashlib
+
+# Changes whenever the validation rules change, so that fingerprints
+# written by older versions are no longer trusted
+FINGERPRINT_VERSION = '1'
+
+class FingerprintBuilder:
+    '''
+    Computes the fingerprint of a model that is serialized in chunks.
+
+    Trailing newlines are ignored, since they are added when writing the file.
+    '''
+
+    def __init__(self):
+        self.hash = hashlib.sha256(FINGERPRINT_VERSION.encode('utf-8'))
+        self.pending_newlines = ''
+
+    def update(self, data):
+        stripped = data.rstrip('\n')
+        if stripped:
+            self.hash.update((self.pending_newlines + stripped).encode('utf-8'))
+            self.pending_newlines = data[len(stripped):]
+        else:
+            self.pending_newlines += data
+
+    def hexdigest(self):
+        return self.hash.hexdigest()
+
+class FingerprintReader:
+    '''
+    Wraps a file object and computes the fingerprint of the data read from it.
+
+    The fingerprint is stored at the end of the file. Therefore the last
+    `TAIL_SIZE` characters are held back until the end of the file is
+    reached, where they are matched against `regex`. The match is replaced
+    by `replacement` before it is added to the fingerprint.
+    '''
+
+    TAIL_SIZE = 100
+
+    def __init__(self, fh, regex, replacement=''):
+        self.fh = fh
+        self.regex = regex
+        self.replacement = replacement
+        self.builder = FingerprintBuilder()
+        self.tail = ''
+        self.eof = False
+
+    def read(self, size=-1):
+        data = self.fh.read(size)
+        if not data and size != 0:
+            self.eof = True
+        self.tail += data
+        if len(self.tail) > self.TAIL_SIZE:
+            self.builder.update(self.tail[:-self.TAIL_SIZE])
+            self.tail = self.tail[-self.TAIL_SIZE:]
+        return data
+
+    def has_valid_fingerprint(self):
+        '''
+        Reads the remaining data and returns True if the file has a
+        fingerprint that matches its content.
+
+        Nothing is read if the parser has already reached the end of the file.
+        '''
+        while not self.eof:
+            self.read(65536)
+
+        m = self.regex.search(self.tail)
+        if not m:
+            return False
+
+        self.builder.update(self.tail[:m.start()] + self.replacement)
+        return m.group(1) == self.builder.hexdigest()
+
+def get_fingerprint(data):
+    '''
+    Returns the fingerprint of a model in serialized form.
+
+    Args:
+        data (str): The serialized model, e.g. in JSON format.
+
+    Returns:
+        str: A hex string.
+    '''
+    builder = FingerprintBuilder()
+    builder.update(data)
+    return builder.hexdigest()
+
 def get_required_arg(l, name):
     try:
         return l.pop(0)
@@ -48,6 +137,22 @@ class CompletionValidator:
             for subcommand in cmdline.get_subcommands_option().subcommands:
                 self.validate_commandlines(subcommand)
 
+        if cmdline.parent is None:
+            cmdline.set_validated()
+
+    def is_valid(self, cmdline):
+        '''
+        Returns True if `cmdline` passes validation.
+        '''
+        if cmdline.is_validated():
+            return True
+
+        try:
+            self.validate_commandlines(cmdline)
+            return True
+        except Exception:
+            return False
+
     def none(self, a):
         return a
 
@@ -18,6 +18,11 @@ class Config:
         self.zsh_compdef = True
         self.fish_fast = False
         self.fish_inline_conditions = False
+        self.bash_single_pass = False
+        self.bash_max_candidates = 0
+        self.cache_file_completions = False
+        self.trust_validated = False
+        self.minify = False
 
     def set_abbreviate_commands(self, enable):
         '''
@@ -165,8 +170,127 @@ class Config:
         self.include_files.extend(files)
 
     def set_fish_fast(self, enable):
+        '''
+        Sets whether fish conditions read the parsed command line directly.
+
+        The fish helper caches its parse of the command line, keyed on the
+        command line buffer and the option table. The command line is
+        therefore parsed once for each option table whose conditions are
+        evaluated during a completion. In fast mode each condition calls the
+        helper only to make sure the parse is up to date and then tests the
+        cached result using builtins, instead of calling the helper once for
+        every test.
+
+        Args:
+            enable (bool): If True, use fast conditions.
+
+        Notes:
+            This feature defaults to `False`.
+        '''
+        assert _is_bool(enable), "Config.set_fish_fast: enable: expected bool, got %r" % enable
+
         self.fish_fast = enable
 
     def set_fish_inline_conditions(self, enable):
         self.fish_inline_conditions = enable
 
+
+    def set_bash_single_pass(self, enable):
+        '''
+        Sets whether the command line is parsed only once in bash.
+
+        By default, every subcommand function parses the whole command line
+        again. If enabled, the function of the root command parses the words
+        up to the subcommand and then calls the subcommand function, which
+        continues parsing the remaining words.
+
+        Args:
+            enable (bool): If True, parse the command line only once.
+
+        Notes:
+            This feature defaults to `False`.
+        '''
+        assert _is_bool(enable), "Config.set_bash_single_pass: enable: expected bool, got %r" % enable
+
+        self.bash_single_pass = enable
+
+    def set_bash_max_candidates(self, count):
+        '''
+        Sets the maximum number of candidates offered by a bash completion.
+
+        If a completion produces more candidates, only the first `count`
+        candidates are kept and an entry reporting the number of omitted
+        candidates is appended. The entry also keeps readline from inserting
+        a common prefix that only the kept candidates share.
+
+        Candidates are always listed in the order they were produced, whether
+        the list was truncated or not, because sorting by readline is disabled
+        (`compopt -o nosort`, bash >= 4.4).
+
+        Args:
+            count (int): The maximum number of candidates, 0 means no limit.
+
+        Notes:
+            This feature defaults to `0`.
+        '''
+        assert isinstance(count, int) and not _is_bool(count) and count >= 0, \
+            "Config.set_bash_max_candidates: count: expected int >= 0, got %r" % count
+
+        self.bash_max_candidates = count
+
+    def set_cache_file_completions(self, enable):
+        '''
+        Sets whether file and directory listings are cached.
+
+        This only affects the `file` and `directory` completions that have
+        the `directory` option set. The listing of a directory is kept in
+        shell variables until the modification time of the directory changes.
+        In Bash an empty stamp file per cached directory is kept in a
+        temporary directory.
+
+        Args:
+            enable (bool): If True, cache directory listings.
+
+        Notes:
+            This feature defaults to `False`.
+        '''
+        assert _is_bool(enable), "Config.set_cache_file_completions: enable: expected bool, got %r" % enable
+
+        self.cache_file_completions = enable
+
+    def set_trust_validated(self, enable):
+        '''
+        Sets whether validation is skipped for already validated models.
+
+        A model is considered validated if it was loaded from a JSON or YAML
+        file that was written by this program with a matching fingerprint,
+        or if it has already passed validation and was not modified since.
+
+        Args:
+            enable (bool): If True, skip the validation of validated models.
+
+        Notes:
+            This feature defaults to `False`.
+        '''
+        assert _is_bool(enable), "Config.set_trust_validated: enable: expected bool, got %r" % enable
+
+        self.trust_validated = enable
+
+    def set_minify(self, enable):
+        '''
+        Sets whether the generated code is minified.
+
+        Comments, blank lines and indentation are removed from the generated
+        functions and shorter names are used for internal variables, so that
+        the shell has less code to read when loading the script. Included
+        files are not modified.
+
+        Args:
+            enable (bool): If True, minify the generated code.
+
+        Notes:
+            This feature defaults to `False`.
+        '''
+        assert _is_bool(enable), "Config.set_minify: enable: expected bool, got %r" % enable
+
+        self.minify = enable
@@ -7,12 +7,14 @@ import tempfile
 
 DEV_NULL_FH = open(os.devnull, 'w')
 
+_saved_output_streams = []
+
 def close_output_streams():
+    _saved_output_streams.append((sys.stdout, sys.stderr))
     sys.stdout = sys.stderr = DEV_NULL_FH
 
 def restore_output_streams():
-    sys.stdout = sys.__stdout__
-    sys.stderr = sys.__stderr__
+    sys.stdout, sys.stderr = _saved_output_streams.pop()
 
 def execute_file(file):
     ''' Import file using exec '''
@@ -54,5 +56,12 @@ def import_file(file):
     if directory not in sys.path:
         sys.path.append(directory)
 
+    # Import the file again if it has been imported before (e.g. by the
+    # server), it may have changed since
+    module = sys.modules.get(module_name, None)
+    module_file = getattr(module, '__file__', None)
+    if module_file and os.path.samefile(os.path.dirname(module_file), directory):
+        del sys.modules[module_name]
+
     return importlib.import_module(module_name)
 
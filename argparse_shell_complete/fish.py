@@ -1,12 +1,13 @@
 #!/usr/bin/python3
 
-from collections import namedtuple
+from collections import namedtuple, OrderedDict
 import subprocess
 
 from . import shell, utils
 from . import helpers, fish_helpers
 from . import modeline
 from . import generation_notice
+from . import when
 from .fish_utils import *
 
 def get_completions_file(program_name):
@@ -23,6 +24,10 @@ def get_completions_file(program_name):
 
     return '%s/%s.fish' % (directory, program_name)
 
+# Described choices longer than this are completed by a function instead
+# of being listed in the `complete` command
+MAX_STATIC_CHOICES_LENGTH = 4096
+
 class FishCompletionBase():
     def get_args(self):
         raise NotImplementedError
@@ -47,6 +52,10 @@ class FishCompleter(shell.ShellCompleter):
 
     def choices(self, ctxt, choices):
         if hasattr(choices, 'items'):
+            arguments = self._get_static_choices(choices)
+            if arguments is not None:
+                return FishCompletionFromArgs(['-f', '-a', arguments])
+
             funcname = shell.make_completion_funcname_for_context(ctxt)
             code = 'printf "%s\\t%s\\n" \\\n'
             for item, description in choices.items():
@@ -59,6 +68,27 @@ class FishCompleter(shell.ShellCompleter):
 
         return FishCompletionFromArgs(['-f', '-a', ' '.join(shell.escape(str(c)) for c in choices)])
 
+    def _get_static_choices(self, choices):
+        '''
+        Returns the `-a` argument that lists `choices` with their
+        descriptions as `ITEM\\tDESCRIPTION` words.
+
+        Returns None if the choices cannot be listed statically, because
+        they contain tabs or newlines, or because the list is too long.
+        '''
+        words = []
+        for item, description in choices.items():
+            item, description = str(item), str(description)
+            if any(c in item + description for c in '\t\n'):
+                return None
+            words.append('%s\\t%s' % (quote(item), quote(description)))
+
+        arguments = quote(' '.join(words))
+        if len(arguments) > MAX_STATIC_CHOICES_LENGTH:
+            return None
+
+        return FishString(arguments, raw=True)
+
     def command(self, ctxt):
         return FishCompletionCommand("__fish_complete_command")
 
@@ -66,6 +96,8 @@ class FishCompleter(shell.ShellCompleter):
         directory = opts.get('directory', None)
         if directory:
             funcname = ctxt.helpers.use_function('fish_complete_filedir')
+            if ctxt.config.cache_file_completions:
+                return FishCompletionCommand('%s -D -m -C %s' % (funcname, shell.escape(directory)))
             return FishCompletionCommand('%s -D -C %s' % (funcname, shell.escape(directory)))
         return FishCompletionCommand("__fish_complete_directories")
 
@@ -73,6 +105,8 @@ class FishCompleter(shell.ShellCompleter):
         directory = opts.get('directory', None)
         if directory:
             funcname = ctxt.helpers.use_function('fish_complete_filedir')
+            if ctxt.config.cache_file_completions:
+                return FishCompletionCommand('%s -m -C %s' % (funcname, shell.escape(directory)))
             return FishCompletionCommand('%s -C %s' % (funcname, shell.escape(directory)))
         return FishCompletionFromArgs(['-F'])
 
@@ -110,19 +144,31 @@ class FishCompleter(shell.ShellCompleter):
         return FishCompletionCommand(command)
 
     def value_list(self, ctxt, opts):
-        separator = opts.get('separator', ',')
+        helper = ctxt.helpers.use_function('fish_value_list')
+        args = [quote(opts.get('separator', ','))]
+        args.extend(quote(str(value)) for value in opts['values'])
+
+        argument = quote('(%s %s)' % (helper, ' '.join(args)))
+        if len(argument) <= MAX_STATIC_CHOICES_LENGTH:
+            return FishCompletionFromArgs(['-f', '-a', FishString(argument, raw=True)])
 
         funcname = shell.make_completion_funcname_for_context(ctxt)
-        code = 'printf "%s\\n" \\\n'
-        for value in opts['values']:
-            code += '  %s \\\n' % shell.escape(str(value))
-        code = code.rstrip(' \\\n')
+        code = '%s \\\n' % helper
+        code += ' \\\n'.join('  %s' % arg for arg in args)
 
         ctxt.helpers.add_function(helpers.FishFunction(funcname, code))
         funcname = ctxt.helpers.use_function(funcname)
-
-        cmd = '__fish_complete_list %s %s' % (shell.escape(separator), funcname)
-        return FishCompletionCommand(cmd)
+        return FishCompletionCommand(funcname)
+
+def _contains_any(words, variable):
+    '''
+    Returns a condition that checks if any of `words` is in the list
+    `variable` of the fish helper's parse cache.
+    '''
+    checks = ['contains -- %s \\$%s' % (shell.escape(w), variable) for w in words]
+    if len(checks) == 1:
+        return checks[0]
+    return 'begin; %s; end' % '; or '.join(checks)
 
 class Conditions:
     NumOfPositionals = namedtuple('NumOfPositionals', ['operator', 'value'])
@@ -131,63 +177,91 @@ class Conditions:
         self.positional_contains = dict()
         self.not_has_option = list()
         self.num_of_positionals = None
-
-    def get(self, unsafe=False):
+        self.when = None
+        self.option_table = None
+
+    def get(self, fast=False):
+        '''
+        Returns the condition for `complete -n`.
+
+        The checks refer to the options of `option_table`, which is the
+        variable that holds the ID of an option table.
+
+        By default every check is a call to the fish helper. If `fast` is
+        True, the helper is only called to make sure the command line has
+        been parsed with `option_table`, and the checks read the parsed
+        command line from the helper's cache using builtins. The cache holds
+        the parse of a single option table, so the command line is parsed
+        again whenever a condition of another option table is evaluated.
+        Each fast check is meant to do what the corresponding helper command
+        does, test/test_fish.py compares both forms.
+        '''
         conditions = []
 
         for num, words in self.positional_contains.items():
-            if unsafe:
-                guard = "__fish_seen_subcommand_from %s" % (' '.join(words))
+            if fast:
+                guard = "contains -- \\$__CACHE_POSITIONALS[%d] %s" % (num, ' '.join(words))
             else:
-                guard = "$helper '$options' positional_contains %d %s" % (num, ' '.join(words))
+                guard = "$helper %s positional_contains %d %s" % (self.option_table, num, ' '.join(words))
             conditions += [guard]
 
         if len(self.not_has_option):
-            use_helper = False
-            if unsafe:
-                guard = "__fish_not_contain_opt"
-                for opt in self.not_has_option:
-                    if opt.startswith('--'):
-                        guard += ' %s' % opt.lstrip('-')
-                    elif opt.startswith('-') and len(opt) == 2:
-                        guard += ' -s %s' % opt[1]
-                    else:
-                        # __fish_not_contain_opt does not support oldoptions
-                        use_helper = True
+            if fast:
+                guard = "not %s" % _contains_any(self.not_has_option, '__CACHE_HAVING_OPTIONS')
             else:
-                use_helper = True
-
-            if use_helper:
-                guard = "not $helper '$options' has_option %s" % ' '.join(self.not_has_option)
+                guard = "not $helper %s has_option %s" % (self.option_table, ' '.join(self.not_has_option))
             conditions += [guard]
 
         if self.num_of_positionals is not None:
-            if unsafe:
-                guard = "test (__fish_number_of_cmd_args_wo_opts) %s %d" % (
-                    self.num_of_positionals.operator, self.num_of_positionals.value) # TODO - 1)
+            if fast:
+                guard = "test (count \\$__CACHE_POSITIONALS) %s %d" % (
+                    self.num_of_positionals.operator, self.num_of_positionals.value - 1)
             else:
-                guard = "$helper '$options' num_of_positionals %s %d" % (
+                guard = "$helper %s num_of_positionals %s %d" % (self.option_table,
                     self.num_of_positionals.operator, self.num_of_positionals.value - 1)
             conditions += [guard]
 
         if self.when is not None:
-            guard = "$helper '$options' %s" % self.when
+            if fast:
+                guard = self._get_fast_when_condition()
+            else:
+                guard = "$helper %s %s" % (self.option_table, shell.make_when_condition(self.when))
             conditions += [guard]
 
         if not conditions:
             return None
 
+        if fast:
+            conditions.insert(0, "$helper %s parse" % self.option_table)
+
         return '"%s"' % ' && '.join(conditions)
 
+    def _get_fast_when_condition(self):
+        parsed = when.parse_when(self.when)
+
+        if isinstance(parsed, when.HasOption):
+            return _contains_any(sorted(set(parsed.options)), '__CACHE_HAVING_OPTIONS')
+
+        # The helper stores each option with its value as OPTION=VALUE.
+        # Option strings cannot contain '=', so the pairs are unambiguous.
+        pairs = ['%s=%s' % (option, value)
+                 for option in sorted(set(parsed.options))
+                 for value in sorted(set(parsed.values))]
+        return _contains_any(pairs, '__CACHE_OPTION_PAIRS')
+
 class FishCompletionGenerator:
     def __init__(self, ctxt, commandline):
         self.commandline = commandline
         self.ctxt = ctxt
         self.completer = FishCompleter()
         self.lines = []
-        self.conditions = VariableManager('guard')
         self.command_comment = '# command %s' % ' '.join(p.prog for p in self.commandline.get_parents(include_self=True))
-        self.options_for_helper = 'set -l options "%s"' % self._get_option_strings_for_helper()
+        self.option_table, self.option_variables = self._get_option_table()
+
+        # Guards are shared by all commands of the file. Only the guards
+        # that are first used by this command are defined in its section.
+        guards = self.ctxt.helpers.guards
+        first_guard = len(guards)
 
         complete_cmds = []
         for option in self.commandline.get_options():
@@ -205,20 +279,69 @@ class FishCompletionGenerator:
 
             if not self.ctxt.config.fish_inline_conditions:
                 if cmd.condition is not None:
-                    cmd.set_condition(self.conditions.add(cmd.condition.s), raw=True)
+                    cmd.set_condition(guards.add(cmd.condition.s), raw=True)
 
             self.lines.append(cmd.get())
 
-    def _get_option_strings_for_helper(self):
-        r = []
-        for option in self.commandline.get_options(with_parent_options=True):
+        self.guard_lines = guards.get_lines(first_guard)
+
+    def _get_option_table(self):
+        '''
+        Returns the variable that holds the ID of the option table of this
+        command, and the definitions of the table.
+
+        The fish helper reads the arrays by ID, so it does not have to
+        classify the options itself. Commands with the same options share
+        one table; the definitions are only returned for the first of them.
+        All arrays are defined, even empty ones, so that reloading the
+        completion file overrides old values.
+        '''
+        arrays = OrderedDict()
+        for kind in ('short', 'long', 'old'):
+            for type_ in ('with_arg', 'without_arg', 'with_optional_arg'):
+                arrays['%s_opts_%s' % (kind, type_)] = []
+
+        # Options of a subcommand shadow the options of its parents
+        seen = set()
+        options = []
+        for commandline in reversed(self.commandline.get_parents(include_self=True)):
+            options.extend(commandline.options)
+
+        for option in options:
             if option.takes_args == '?':
-                r.extend('%s=?' % s for s in option.option_strings)
+                type_ = 'with_optional_arg'
             elif option.takes_args:
-                r.extend('%s=' % s for s in option.option_strings)
+                type_ = 'with_arg'
             else:
-                r.extend(option.option_strings)
-        return ','.join(r)
+                type_ = 'without_arg'
+
+            for option_string in option.option_strings:
+                if option_string in seen:
+                    continue
+                seen.add(option_string)
+
+                if option_string.startswith('--'):
+                    kind = 'long'
+                elif len(option_string) == 2:
+                    kind = 'short'
+                else:
+                    kind = 'old'
+                arrays['%s_opts_%s' % (kind, type_)].append(option_string)
+
+        key = tuple(tuple(option_strings) for option_strings in arrays.values())
+        tables = self.ctxt.helpers.option_tables
+        if key in tables:
+            return tables[key], []
+
+        # The guards refer to the ID by a short local variable
+        table_id = shell.make_completion_funcname(self.commandline)
+        tables[key] = self.ctxt.helpers.table_variables.add(table_id)
+
+        r = self.ctxt.helpers.table_variables.get_lines(len(tables) - 1)
+        for name, option_strings in arrays.items():
+            r.append(' '.join(['set -g %s_%s' % (table_id, name)] +
+                              [shell.escape(o) for o in option_strings]))
+        return tables[key], r
 
     def _get_positional_contains(self, option):
         cmdlines = option.parent.get_parents(include_self=True)
@@ -273,14 +396,15 @@ class FishCompletionGenerator:
         conds.positional_contains = positional_contains
         conds.not_has_option = conflicting_options
         conds.when = when
+        conds.option_table = self.option_table
 
         if positional is not None:
             operator = '-eq'
             if repeatable:
                 operator = '-ge'
-            conds.num_of_positionals = Conditions.NumOfPositionals(operator, positional) # -1 TODO
+            conds.num_of_positionals = Conditions.NumOfPositionals(operator, positional)
 
-        cmd.set_condition(conds.get(unsafe=self.ctxt.config.fish_fast), raw=True)
+        cmd.set_condition(conds.get(fast=self.ctxt.config.fish_fast), raw=True)
 
         return cmd
 
@@ -338,35 +462,49 @@ class FishCompletionGenerator:
         )
 
 def generate_completion(commandline, program_name=None, config=None):
-    result = shell.CompletionGenerator(FishCompletionGenerator, fish_helpers.FISH_Helpers, commandline, program_name, config)
+    if config is not None and config.minify:
+        helpers_klass = lambda prefix: fish_helpers.FISH_Helpers(prefix, short_variable_names=True)
+    else:
+        helpers_klass = fish_helpers.FISH_Helpers
+
+    result = shell.CompletionGenerator(FishCompletionGenerator, helpers_klass, commandline, program_name, config)
+    config = result.ctxt.config
+
+    def finish(kind, name, code, may_minify=True):
+        return shell.finish_code(config, 'fish', kind, name, code, may_minify)
 
     output = []
 
     output.append(generation_notice.GENERATION_NOTICE)
     output.append('')
 
-    for code in result.include_files_content:
-        output.append(code)
+    for file, code in zip(config.include_files, result.include_files_content):
+        output.append(finish('include', file, code, False))
         output.append('')
 
-    for code in result.ctxt.helpers.get_used_functions_code():
-        output.append(code)
+    for funcname, code in result.ctxt.helpers.get_used_functions():
+        output.append(finish('helper', funcname, code))
         output.append('')
 
-    output.append('set -l prog "%s"'   % result.result[0].commandline.prog)
+    setup = []
+    setup.append('set -l prog "%s"'   % result.result[0].commandline.prog)
     if result.ctxt.helpers.is_used('fish_helper'):
-        output.append('set -l helper "%s"' % result.ctxt.helpers.use_function('fish_helper'))
+        setup.append('set -l helper "%s"' % result.ctxt.helpers.use_function('fish_helper'))
 
-    output.append('')
-    output.append('# Generally disable file completion')
-    output.append('complete -c $prog -x')
+    setup.append('')
+    setup.append('# Generally disable file completion')
+    setup.append('complete -c $prog -x')
+    output.append(finish('setup', '', '\n'.join(setup)))
 
     for generator in result.result:
+        lines = [generator.command_comment]
+        if result.ctxt.helpers.is_used('fish_helper'):
+            lines.extend(generator.option_variables)
+        lines.extend(generator.guard_lines)
+        lines.extend(generator.lines)
+
         output.append('')
-        output.append(generator.command_comment)
-        output.append(generator.options_for_helper)
-        output.extend(generator.conditions.get_lines())
-        output.extend(generator.lines)
+        output.append(finish('command', shell.get_command_path(generator.commandline), '\n'.join(lines)))
 
     if config.vim_modeline:
         output += ['']
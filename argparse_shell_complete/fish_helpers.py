@@ -1,6 +1,7 @@
 #!/usr/bin/python
 
 from . import helpers
+from .fish_utils import VariableManager
 
 # TODO?
 _FISH_HELPER = helpers.FishFunction('fish_helper', r'''
@@ -8,21 +9,27 @@ _FISH_HELPER = helpers.FishFunction('fish_helper', r'''
 #
 # This function implements the parsing of options and positionals in the Fish shell.
 #
-# Usage: __fish_helper <OPTIONS> <COMMAND> [ARGS...]
+# Usage: __fish_helper <COMMAND_ID> <COMMAND> [ARGS...]
 #
-# The first argument is a comma-seperated list of options that the parser should know about.
+# The first argument identifies the command whose options the parser should know about.
 # Short options (-o), long options (--option), and old-style options (-option) are supported.
 #
-# If an option takes an argument, it is suffixed by '='.
-# If an option takes an optional argument, it is suffixed by '=?'.
+# The options are read from global variables that are defined by the completion file.
+# For each kind of option (short, long, old) there are three lists:
+#   <COMMAND_ID>_<KIND>_opts_with_arg            Options that require an argument
+#   <COMMAND_ID>_<KIND>_opts_without_arg         Options that don't take an argument
+#   <COMMAND_ID>_<KIND>_opts_with_optional_arg   Options that take an optional argument
 #
 # For example:
-#   __fish_helper '-f,--flag,-old-style,--with-arg=,--with-optional=?'
-#
-#   Here, -f, --flag and -old-style don't take options, --with-arg requires an
-#   argument and --with-optional takes an optional argument.
+#   set -g _prog_long_opts_with_arg --with-arg
+#   __fish_helper _prog has_option --with-arg
 #
 # COMMANDS
+#   parse
+#     Only parses the command line. The result is cached in the global
+#     variables __CACHE_POSITIONALS, __CACHE_HAVING_OPTIONS, __CACHE_OPTION_VALUES
+#     and __CACHE_OPTION_PAIRS (OPTION=VALUE), which can then be read directly.
+#
 #   positional_contains <NUM> <WORDS...>
 #     Checks if the positional argument number NUM is one of WORDS.
 #     NUM counts from one.
@@ -51,20 +58,20 @@ set -l option_values
 
 switch (count $argv)
   case 0
-    echo "$func: missing OPTIONS argument" >&2
+    echo "$func: missing COMMAND_ID argument" >&2
     return 1
   case 1
     echo "$func: missing COMMAND" >&2
     return 1
 end
 
-set -l options $argv[1]
+set -l id $argv[1]
 set -e argv[1]
 
 set -l cmd $argv[1]
 set -e argv[1]
 
-set -l my_cache_key "$(commandline -b) $options"
+set -l my_cache_key "$(commandline -b) $id"
 
 if test "$__CACHE_KEY" = "$my_cache_key"
   set positionals    $__CACHE_POSITIONALS
@@ -72,45 +79,24 @@ if test "$__CACHE_KEY" = "$my_cache_key"
   set option_values  $__CACHE_OPTION_VALUES
 else
   # =========================================================================
-  # Parsing of OPTIONS argument
+  # Reading of the option lists
   # =========================================================================
 
-  set -l short_opts_with_arg
-  set -l long_opts_with_arg
-  set -l old_opts_with_arg
-
-  set -l short_opts_without_arg
-  set -l long_opts_without_arg
-  set -l old_opts_without_arg
+  set -l var
 
-  set -l short_opts_with_optional_arg
-  set -l long_opts_with_optional_arg
-  set -l old_opts_with_optional_arg
-
-  set -l option
+  set var {$id}_short_opts_with_arg;          set -l short_opts_with_arg          $$var
+  set var {$id}_long_opts_with_arg;           set -l long_opts_with_arg           $$var
+  set var {$id}_old_opts_with_arg;            set -l old_opts_with_arg            $$var
 
-  if test -n "$options"
-    for option in (string split -- ',' $options)
-      # Using one big switch case is the fastest way
-      switch $option
-        case '--?*=';   set -a long_opts_with_arg           (string replace -- '='  '' $option)
-        case '--?*=\?'; set -a long_opts_with_optional_arg  (string replace -- '=?' '' $option)
-        case '--?*';    set -a long_opts_without_arg        $option
+  set var {$id}_short_opts_without_arg;       set -l short_opts_without_arg       $$var
+  set var {$id}_long_opts_without_arg;        set -l long_opts_without_arg        $$var
+  set var {$id}_old_opts_without_arg;         set -l old_opts_without_arg         $$var
 
-        case '-?=';     set -a short_opts_with_arg          (string replace -- '='  '' $option)
-        case '-?=\?';   set -a short_opts_with_optional_arg (string replace -- '=?' '' $option)
-        case '-?';      set -a short_opts_with_arg          $option
+  set var {$id}_short_opts_with_optional_arg; set -l short_opts_with_optional_arg $$var
+  set var {$id}_long_opts_with_optional_arg;  set -l long_opts_with_optional_arg  $$var
+  set var {$id}_old_opts_with_optional_arg;   set -l old_opts_with_optional_arg   $$var
 
-        case '-??*=';   set -a old_opts_with_arg            (string replace -- '='  '' $option)
-        case '-??*=\?'; set -a old_opts_with_optional_arg   (string replace -- '=?' '' $option)
-        case '-??*';    set -a old_opts_without_arg         $option
-
-        case '*'
-          echo "$func: argv[1]: '$option' is not a short, long or old-style option" >&2
-          return 1
-      end
-    end
-  end
+  set -l option
 
   # =========================================================================
   # Parsing of options and positionals
@@ -229,9 +215,17 @@ else
     set argi (math $argi + 1)
   end
 
+  set -l option_pairs
+  set -l i 1
+  for option in $having_options
+    set -a option_pairs "$option=$option_values[$i]"
+    set i (math $i + 1)
+  end
+
   set -g __CACHE_POSITIONALS    $positionals
   set -g __CACHE_HAVING_OPTIONS $having_options
   set -g __CACHE_OPTION_VALUES  $option_values
+  set -g __CACHE_OPTION_PAIRS   $option_pairs
   set -g __CACHE_KEY            $my_cache_key
 end
 
@@ -240,6 +234,8 @@ end
 # ===========================================================================
 
 switch $cmd
+  case 'parse'
+    return 0
   case 'positional_contains'
     if test (count $argv) -eq 0
       echo "$func: positional_contains: argv[3]: missing number" >&2
@@ -319,10 +315,11 @@ _FISH_COMPLETE_FILEDIR = helpers.FishFunction('fish_complete_filedir', r'''
 #   -c|--comp=STR           Complete STR instead of current command line argument
 #   -D|--directories        Only complete directories
 #   -C|--cd=DIR             List contents in DIR
+#   -m|--cache              Cache the contents of DIR until its mtime changes
 #
 # This function is made out of /usr/share/fish/functions/__fish_complete_directories.fish
 
-argparse --max-args 0 'd/description=' 'c/comp=' 'D/directories' 'C/cd=' -- $argv || return 1
+argparse --max-args 0 'd/description=' 'c/comp=' 'D/directories' 'C/cd=' 'm/cache' -- $argv || return 1
 
 set -l comp
 set -l desc
@@ -339,14 +336,52 @@ else
   set comp (commandline -ct | string replace -r -- '^-[^=]*=' '')
 end
 
-if set -q _flag_cd[1]
-  pushd $_flag_cd || return 1
+set -l files
+set -l subdir
+set -l mtime
+set -l cache_files
+set -l cache_mtime
+
+if set -q _flag_cd[1]; and set -q _flag_cache[1]
+  # The listing of a directory is stored in global variables. Directories
+  # modified within the last second are not cached.
+  set subdir (string replace -r -- '[^/]*$' '' "$comp")
+  set -l key (string escape --style=var -- "$_flag_directories $PWD $_flag_cd $subdir")
+  set cache_files __argparse_shell_complete_files_$key
+  set cache_mtime __argparse_shell_complete_mtime_$key
+  set mtime (path mtime -- $_flag_cd/$subdir 2>/dev/null)
 end
 
-set -l files (complete -C"'' $comp")
+if set -q mtime[1]
+  if test "$$cache_mtime" != "$mtime"
+    pushd $_flag_cd || return 1
+    set -l escaped (string escape -- "$subdir")
+    set -g $cache_files (complete -C"'' $escaped") (complete -C"'' $escaped.")
+    popd
+
+    if test (path mtime --relative -- $_flag_cd/$subdir) -gt 0
+      set -g $cache_mtime $mtime
+    else
+      set -g $cache_mtime
+    end
+  end
+
+  set files $$cache_files
+
+  # Hidden files are only completed if the word starts with a dot
+  if not string match -q -- '.*' (string replace -r -- '.*/' '' "$comp")
+    set files (string match -rv -- '(^|/)\.[^/]*/?$' $files)
+  end
+else
+  if set -q _flag_cd[1]
+    pushd $_flag_cd || return 1
+  end
+
+  set files (complete -C"'' $comp")
 
-if set -q _flag_cd[1]
-  popd
+  if set -q _flag_cd[1]
+    popd
+  end
 end
 
 if set -q files[1]
@@ -358,8 +393,47 @@ if set -q files[1]
 end
 ''')
 
+_FISH_VALUE_LIST = helpers.FishFunction('fish_value_list', r'''
+# Function for completing a list of values
+#
+# Usage: fish_value_list SEPARATOR VALUES...
+#
+# Values that are already in the list are not completed again.
+
+set -l separator $argv[1]
+set -e argv[1]
+
+set -l token (commandline -ct | string replace -r -- '^-[^=]*=' '')
+set -l having (string split -- $separator "$token")
+set -l prefix ''
+
+if set -q having[2]
+  set prefix (string join -- $separator $having[1..-2])$separator
+
+  # Filter out the values that are already in the list using a single regex.
+  # The last value is the one being typed, so it is not filtered out.
+  set -l pattern (string join -- '|' (string escape --style=regex -- $having[1..-2]))
+  set argv (string match -rv -- '^(?:'"$pattern"')$' $argv)
+end
+
+if set -q argv[1]
+  printf '%s\n' $prefix$argv
+end
+''')
+
 class FISH_Helpers(helpers.GeneralHelpers):
-    def __init__(self, function_prefix):
+    def __init__(self, function_prefix, short_variable_names=False):
         super().__init__(function_prefix)
+
+        # Pools that are shared by all commands of a completion file
+        if short_variable_names:
+            self.guards = VariableManager('g')
+            self.table_variables = VariableManager('t')
+        else:
+            self.guards = VariableManager('guard')
+            self.table_variables = VariableManager('table')
+        self.option_tables = {}
+
         self.add_function(_FISH_HELPER)
         self.add_function(_FISH_COMPLETE_FILEDIR)
+        self.add_function(_FISH_VALUE_LIST)
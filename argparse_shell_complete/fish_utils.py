@@ -1,7 +1,32 @@
 #!/usr/bin/python3
 
+import re
+
 from . import shell
 
+def quote(string):
+    '''
+    Quotes a string for fish.
+
+    Unlike `shell.escape()`, this takes into account that fish also
+    interprets backslashes inside single quotes.
+
+    Args:
+        string (str): The string to quote.
+
+    Returns:
+        str: The quoted string.
+    '''
+    assert isinstance(string, str), "quote: string: expected str, got %r" % string
+
+    if re.fullmatch('[a-zA-Z0-9_+=:,./-]+', string):
+        return string
+
+    if "'" in string:
+        return '"%s"' % string.replace('\\', '\\\\').replace('"', '\\"').replace('$', '\\$')
+
+    return "'%s'" % string.replace('\\', '\\\\')
+
 class FishString:
     '''
     A utility class for handling command-line strings that may or may not require escaping.
@@ -103,6 +128,8 @@ class FishCompleteCommand:
     def set_arguments(self, arguments, raw=False):
         if arguments is None:
             self.arguments = None
+        elif isinstance(arguments, FishString):
+            self.arguments = arguments
         else:
             self.arguments = FishString(arguments, raw)
 
@@ -159,6 +186,7 @@ class VariableManager:
     def __init__(self, variable_name):
         self.variable_name = variable_name
         self.value_to_variable  = {}
+        self.definitions = []
         self.counter = 0
 
     def add(self, value):
@@ -167,12 +195,16 @@ class VariableManager:
 
         var = '%s%03d' % (self.variable_name, self.counter)
         self.value_to_variable[value] = var
+        self.definitions.append('set -l %s %s' % (var, value))
         self.counter += 1
         return '$%s' % var
 
-    def get_lines(self):
-        r = []
-        for value, variable in self.value_to_variable.items():
-            r.append('set -l %s %s' % (variable, value))
-        return r
+    def __len__(self):
+        return len(self.definitions)
 
+    def get_lines(self, start=0):
+        '''
+        Returns the definitions of the variables, beginning with the
+        `start`-th variable that has been added.
+        '''
+        return self.definitions[start:]
@@ -62,8 +62,15 @@ class GeneralHelpers():
     def is_used(self, function_name):
         return function_name in self.used_functions
 
-    def get_used_functions_code(self):
+    def get_used_functions(self):
+        '''
+        Returns the used functions as a list of (real_function_name, code) tuples.
+        '''
         r = []
         for funcname in self.used_functions:
-            r.append(self.functions[funcname].get_code(self.get_real_function_name(funcname)))
+            real_funcname = self.get_real_function_name(funcname)
+            r.append((real_funcname, self.functions[funcname].get_code(real_funcname)))
         return r
+
+    def get_used_functions_code(self):
+        return [code for funcname, code in self.get_used_functions()]
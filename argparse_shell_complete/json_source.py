@@ -1,8 +1,11 @@
+import io
+import re
 import json
 
 from collections import OrderedDict, namedtuple
 
 from .commandline import *
+from . import completion_validator
 
 def jsonToObject(json, prog):
     commandline = CommandLine(
@@ -72,60 +75,187 @@ def JSON_To_Commandline(json):
 
     commandline_tree = CommandlineTree()
 
-    for commandline in json:
-        commandline_tree.add_commandline(commandline)
+    with shared_complete_specs():
+        for commandline in json:
+            commandline_tree.add_commandline(commandline)
 
     visit(commandline_tree.get_root_commandline())
 
     return commandline_tree.get_root_commandline().commandline
 
 
-def CommandLine_To_JSON(commandline, config=None):
-    def get_CommandLine_Object(commandline):
-        commandline_json = OrderedDict()
+def get_CommandLine_Object(commandline):
+    commandline_json = OrderedDict()
 
-        prog = ' '.join(c.prog for c in commandline.get_parents(include_self=True))
+    prog = ' '.join(c.prog for c in commandline.get_parents(include_self=True))
 
-        commandline_json['prog'] = prog
+    commandline_json['prog'] = prog
 
-        if commandline.aliases:
-            commandline_json['aliases'] = commandline.aliases
+    if commandline.aliases:
+        commandline_json['aliases'] = commandline.aliases
 
-        if commandline.help:
-            commandline_json['help'] = commandline.help
+    if commandline.help:
+        commandline_json['help'] = commandline.help
 
-        if commandline.abbreviate_commands != ExtendedBool.INHERIT:
-            commandline_json['abbreviate_commands'] = commandline.abbreviate_commands
+    if commandline.abbreviate_commands != ExtendedBool.INHERIT:
+        commandline_json['abbreviate_commands'] = commandline.abbreviate_commands
 
-        if commandline.abbreviate_options != ExtendedBool.INHERIT:
-            commandline_json['abbreviate_options'] = commandline.abbreviate_options
+    if commandline.abbreviate_options != ExtendedBool.INHERIT:
+        commandline_json['abbreviate_options'] = commandline.abbreviate_options
 
-        if commandline.inherit_options != ExtendedBool.INHERIT:
-            commandline_json['inherit_options'] = commandline.inherit_options
+    if commandline.inherit_options != ExtendedBool.INHERIT:
+        commandline_json['inherit_options'] = commandline.inherit_options
 
-        if commandline.options:
-            commandline_json['options'] = []
-            for option in commandline.options:
-                commandline_json['options'].append(option.OrderedDict())
+    if commandline.options:
+        commandline_json['options'] = []
+        for option in commandline.options:
+            commandline_json['options'].append(option.OrderedDict())
 
-        if commandline.positionals:
-            commandline_json['positionals'] = []
-            for positional in commandline.positionals:
-                commandline_json['positionals'].append(positional.OrderedDict())
+    if commandline.positionals:
+        commandline_json['positionals'] = []
+        for positional in commandline.positionals:
+            commandline_json['positionals'].append(positional.OrderedDict())
 
-        return commandline_json
+    return commandline_json
 
-    def get_CommandLine_Objects(commandline, out_list):
-        out_list.append(get_CommandLine_Object(commandline))
-        if commandline.subcommands is not None:
-            for parser in commandline.subcommands.subcommands:
-                get_CommandLine_Objects(parser, out_list)
+def iter_CommandLine_Objects(commandline):
+    '''
+    Yields the JSON object of `commandline` and of all its subcommands.
+    '''
+    yield get_CommandLine_Object(commandline)
+    if commandline.subcommands is not None:
+        for parser in commandline.subcommands.subcommands:
+            yield from iter_CommandLine_Objects(parser)
 
-    commandline_json = []
-    get_CommandLine_Objects(commandline, commandline_json)
-    return commandline_json
+def CommandLine_To_JSON(commandline, config=None):
+    return list(iter_CommandLine_Objects(commandline))
+
+def CommandLine_To_JSON_Chunks(commandline, fingerprint=False):
+    '''
+    Yields the JSON representation of `commandline`, one command line at a time.
+
+    The concatenated chunks are equal to `json.dumps(CommandLine_To_JSON(commandline))`.
+
+    Args:
+        commandline (CommandLine): The command line.
+        fingerprint (bool): If True, the fingerprint of the output is stored
+            in the "validated" key of the last object. Only pass True for
+            validated command lines.
+
+    Yields:
+        str: Parts of the JSON string.
+    '''
+    builder = completion_validator.FingerprintBuilder()
+    previous = None
+
+    # The last object is held back, since the fingerprint is added to it
+    for obj in iter_CommandLine_Objects(commandline):
+        if previous is None:
+            chunk = '[' + json.dumps(obj)
+        else:
+            chunk = ', ' + json.dumps(obj)
+
+        if previous is not None:
+            builder.update(previous)
+            yield previous
+
+        previous = chunk
+
+    builder.update(previous + ']')
+
+    if fingerprint:
+        yield '%s, "validated": "%s"}]' % (previous[:-1], builder.hexdigest())
+    else:
+        yield previous + ']'
+
+# The fingerprint is stored as the last key of the last object
+_FINGERPRINT_REGEX = re.compile(r', "validated": "([0-9a-f]{64})"\}\]\s*$')
+
+def has_valid_fingerprint(json_string):
+    '''
+    Returns True if `json_string` has a fingerprint that matches its content.
+    '''
+    reader = completion_validator.FingerprintReader(
+        io.StringIO(json_string), _FINGERPRINT_REGEX, '}]')
+    return reader.has_valid_fingerprint()
+
+_WHITESPACE = ' \t\r\n'
+
+def iter_JSON_Array(fh, chunk_size=65536):
+    '''
+    Yields the objects of a JSON array one by one.
+
+    The file is read in chunks, so that neither the whole file nor the
+    whole decoded array have to be held in memory.
+
+    Args:
+        fh (file): A file object that contains a JSON array of objects.
+        chunk_size (int): Number of characters to read at once.
+    '''
+    decoder = json.JSONDecoder()
+    buf, pos, eof = '', 0, False
+
+    def read_more():
+        nonlocal buf, pos, eof
+        data = fh.read(max(chunk_size, len(buf) - pos))
+        if not data:
+            eof = True
+        buf, pos = buf[pos:] + data, 0
+
+    def next_char():
+        nonlocal pos
+        while True:
+            while pos < len(buf) and buf[pos] in _WHITESPACE:
+                pos += 1
+            if pos < len(buf):
+                return buf[pos]
+            if eof:
+                raise ValueError('Unexpected end of JSON data')
+            read_more()
+
+    if next_char() != '[':
+        raise ValueError('Expected a JSON array')
+    pos += 1
+
+    if next_char() == ']':
+        return
+
+    while True:
+        if next_char() != '{':
+            raise ValueError('Expected a JSON object at position %d' % pos)
+
+        # An object ends with '}', so a successful decode cannot be
+        # caused by a truncated buffer
+        while True:
+            try:
+                obj, pos = decoder.raw_decode(buf, pos)
+                break
+            except json.JSONDecodeError:
+                if eof:
+                    raise
+                read_more()
+
+        yield obj
+
+        c = next_char()
+        pos += 1
+        if c == ']':
+            break
+        if c != ',':
+            raise ValueError('Expected "," or "]" in JSON array')
+
+    while True:
+        if buf[pos:].strip(_WHITESPACE):
+            raise ValueError('Extra data after JSON array')
+        if eof:
+            return
+        pos = len(buf)
+        read_more()
 
 def load_from_file(file):
     with open(file, 'r') as fh:
-        return JSON_To_Commandline(json.load(fh))
-
+        reader = completion_validator.FingerprintReader(fh, _FINGERPRINT_REGEX, '}]')
+        commandline = JSON_To_Commandline(iter_JSON_Array(reader))
+        if reader.has_valid_fingerprint():
+            commandline.set_validated()
+    return commandline
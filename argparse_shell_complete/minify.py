@@ -0,0 +1,165 @@
+#!/usr/bin/python3
+
+'''
+Reduces the size of generated shell code.
+
+Full-line comments and blank lines are removed and indentation is
+collapsed. A line is only changed if it does not start inside a quoted
+string or a here-document. Quoting is followed using a simplified model of
+the quoting rules of the shell. If the quoting of the code can't be
+followed to its end, the code is returned unchanged.
+
+Trailing comments are kept, since finding them requires parsing the code.
+'''
+
+# Quoting state of a line that can't be followed
+_UNKNOWN = 'unknown'
+
+# Characters after which an unquoted '#' may start a comment
+_COMMENT_PRECEDERS = ' \t;&|()<>'
+
+def _get_heredoc_delimiter(line, i):
+    '''
+    Returns the delimiter of the here-document operator at `line[i]`, and
+    whether leading tabs are stripped (`<<-`).
+
+    Returns None if the delimiter can't be determined.
+    '''
+    strip_tabs = line[i:i + 1] == '-'
+    if strip_tabs:
+        i += 1
+
+    while line[i:i + 1] in (' ', '\t'):
+        i += 1
+
+    delimiter = ''
+    quote = None
+    while i < len(line):
+        c = line[i]
+        if quote is not None:
+            if c == quote:
+                quote = None
+            else:
+                delimiter += c
+        elif c in ('"', "'"):
+            quote = c
+        elif c == '\\':
+            i += 1
+            delimiter += line[i:i + 1]
+        elif c in ' \t;&|()<>':
+            break
+        else:
+            delimiter += c
+        i += 1
+
+    if quote is not None or not delimiter:
+        return None
+
+    return (delimiter, strip_tabs)
+
+def _get_quoting_state(line, state, shell, heredocs=None):
+    '''
+    Returns the quoting state at the end of `line`.
+
+    Args:
+        line (str): The line.
+        state (str): The quoting state at the start of the line. This is
+            None if the line does not start inside a quoted string,
+            otherwise the opening quote.
+        shell (str): Either 'bash', 'fish' or 'zsh'.
+        heredocs (list): If given, the (delimiter, strip_tabs) pairs of the
+            here-documents started on the line are appended.
+
+    Returns:
+        str: The quoting state at the end of the line, or `_UNKNOWN` if it
+            can't be determined.
+    '''
+    i = 0
+    while i < len(line):
+        c = line[i]
+
+        if state is None:
+            if c == '\\':
+                i += 1
+            elif c == '#' and (i == 0 or line[i - 1] in _COMMENT_PRECEDERS):
+                # Whether this is a comment depends on the context, e.g. it
+                # is not inside `[[ ]]` in zsh. It only matters if the rest
+                # of the line contains quotes or here-documents.
+                rest = line[i:]
+                if "'" in rest or '"' in rest or '<<' in rest:
+                    return _UNKNOWN
+                return None
+            elif c in ('"', "'"):
+                state = c
+            elif c == '$' and shell != 'fish' and line[i + 1:i + 2] == "'":
+                state = "$'"
+                i += 1
+            elif c == '<' and shell != 'fish' and line[i:i + 2] == '<<':
+                if line[i + 2:i + 3] == '<':
+                    # Here-string
+                    i += 2
+                else:
+                    heredoc = _get_heredoc_delimiter(line, i + 2)
+                    if heredoc is None or heredocs is None:
+                        return _UNKNOWN
+                    heredocs.append(heredoc)
+                    i += 1
+        elif state == "'":
+            if c == '\\' and shell == 'fish':
+                i += 1
+            elif c == "'":
+                state = None
+        else:
+            if c == '\\':
+                i += 1
+            elif c == state[-1]:
+                state = None
+
+        i += 1
+
+    return state
+
+def minify(code, shell):
+    '''
+    Removes comments, blank lines and indentation from `code`.
+
+    Args:
+        code (str): The code.
+        shell (str): Either 'bash', 'fish' or 'zsh'.
+
+    Returns:
+        str: The minified code.
+    '''
+    assert shell in ('bash', 'fish', 'zsh'), "minify: shell: expected 'bash', 'fish' or 'zsh', got %r" % shell
+
+    lines = []
+    state = None
+    heredocs = []
+
+    for line in code.split('\n'):
+        # Lines of here-documents are kept as they are
+        if heredocs:
+            lines.append(line)
+            delimiter, strip_tabs = heredocs[0]
+            if (line.lstrip('\t') if strip_tabs else line) == delimiter:
+                del heredocs[0]
+            continue
+
+        if state is None:
+            line = line.lstrip()
+
+            # Lines following a line continuation are kept
+            continued = lines and lines[-1].endswith('\\')
+            if not continued and (not line or line.startswith('#')):
+                continue
+
+        lines.append(line)
+        state = _get_quoting_state(line, state, shell, heredocs)
+
+        if state is _UNKNOWN or (heredocs and state is not None):
+            return code
+
+    if state is not None or heredocs:
+        return code
+
+    return '\n'.join(lines)
@@ -0,0 +1,164 @@
+#!/usr/bin/python3
+
+'''
+Timing spans for profiling the completion generator.
+
+Spans are only recorded after `enable()` has been called. Otherwise
+`span()` returns a shared no-op context manager, so the instrumentation
+costs next to nothing during normal operation.
+
+Example:
+    with profiler.span('validate'):
+        validate(commandline)
+'''
+
+import time
+import json
+
+class Span():
+    def __init__(self, name, start=None, end=None):
+        self.name = name
+        self.start = start
+        self.end = end
+        self.children = []
+
+    def get_duration(self):
+        return self.end - self.start
+
+class _NullSpan():
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *a):
+        return False
+
+class _ActiveSpan():
+    def __init__(self, name):
+        self.span = Span(name)
+
+    def __enter__(self):
+        global _current_span
+        self.parent = _current_span
+        self.parent.children.append(self.span)
+        _current_span = self.span
+        self.span.start = time.perf_counter()
+        return self.span
+
+    def __exit__(self, *a):
+        global _current_span
+        self.span.end = time.perf_counter()
+        _current_span = self.parent
+        return False
+
+_NULL_SPAN = _NullSpan()
+_root_span = None
+_current_span = None
+
+def enable():
+    '''
+    Enables the recording of spans and discards any previously recorded spans.
+    '''
+    global _root_span, _current_span
+    _root_span = Span('total', start=time.perf_counter())
+    _current_span = _root_span
+
+def disable():
+    '''
+    Disables the recording of spans and discards the recorded spans.
+    '''
+    global _root_span, _current_span
+    _root_span = None
+    _current_span = None
+
+def is_enabled():
+    return _root_span is not None
+
+def span(name):
+    '''
+    Returns a context manager that records the time spent in its block.
+
+    Args:
+        name (str): The name of the span.
+
+    Returns:
+        A context manager.
+    '''
+    if _root_span is None:
+        return _NULL_SPAN
+
+    return _ActiveSpan(name)
+
+def add_span(name, start, end):
+    '''
+    Adds an already finished span to the current span.
+
+    This is used for code that ran before profiling could be enabled,
+    e.g. module imports.
+
+    Args:
+        name (str): The name of the span.
+        start (float): The start time as returned by `time.perf_counter()`.
+        end (float): The end time as returned by `time.perf_counter()`.
+    '''
+    if _root_span is None:
+        return
+
+    _current_span.children.append(Span(name, start, end))
+    _root_span.start = min(_root_span.start, start)
+
+def _finish():
+    if _root_span.end is None:
+        _root_span.end = time.perf_counter()
+    return _root_span
+
+def format_tree():
+    '''
+    Returns the recorded spans as an indented tree.
+
+    Each line shows the duration of a span and its share of the total time.
+    '''
+    root = _finish()
+    total = root.get_duration() or 1e-9
+    lines = []
+
+    def format_span(span, level):
+        lines.append('%10.3f ms %6.1f%%  %s%s' % (
+            span.get_duration() * 1000,
+            span.get_duration() / total * 100,
+            '  ' * level,
+            span.name))
+
+        for child in span.children:
+            format_span(child, level + 1)
+
+    format_span(root, 0)
+    return '\n'.join(lines)
+
+def get_chrome_trace():
+    '''
+    Returns the recorded spans in the Chrome trace event format.
+
+    The result can be loaded into chrome://tracing or https://ui.perfetto.dev.
+    '''
+    root = _finish()
+    events = []
+
+    def add_event(span):
+        events.append({
+            'name': span.name,
+            'ph':   'X',
+            'ts':   round((span.start - root.start) * 1000000, 3),
+            'dur':  round(span.get_duration() * 1000000, 3),
+            'pid':  1,
+            'tid':  1
+        })
+
+        for child in span.children:
+            add_event(child)
+
+    add_event(root)
+    return {'traceEvents': events, 'displayTimeUnit': 'ms'}
+
+def write_chrome_trace(file):
+    with open(file, 'w') as fh:
+        json.dump(get_chrome_trace(), fh)
@@ -0,0 +1,223 @@
+#!/usr/bin/python3
+
+'''
+Generator daemon and client.
+
+The daemon keeps the package imported and the loaded models cached. It
+accepts requests over a Unix socket. A request contains the command line
+arguments and the working directory of a client. The response contains
+the exit code and the output of the request.
+
+Messages are JSON objects. The sending side shuts down its writing end
+of the connection after the message has been sent.
+
+This module only imports modules from the standard library, so that the
+client stays cheap to start.
+'''
+
+import io
+import os
+import sys
+import json
+import signal
+import socket
+import contextlib
+
+# Environment variable for the socket path of a running daemon. If it is
+# set, the command line program acts as a client of the daemon.
+SOCKET_ENVIRONMENT_VARIABLE = 'ARGPARSE_SHELL_COMPLETE_SERVER'
+
+def get_default_socket():
+    '''
+    Returns the default socket path of the daemon.
+    '''
+    directory = os.environ.get('XDG_RUNTIME_DIR') or '/tmp'
+    return os.path.join(directory, 'argparse-shell-complete-%d.sock' % os.getuid())
+
+def _send_message(sock, obj):
+    sock.sendall(json.dumps(obj).encode('utf-8'))
+    sock.shutdown(socket.SHUT_WR)
+
+def _receive_message(sock):
+    chunks = []
+    while True:
+        chunk = sock.recv(65536)
+        if not chunk:
+            break
+        chunks.append(chunk)
+    return json.loads(b''.join(chunks).decode('utf-8'))
+
+def _get_file_state(file):
+    try:
+        st = os.stat(file)
+        return (st.st_mtime_ns, st.st_size)
+    except OSError:
+        return None
+
+class ModelCache:
+    '''
+    Caches loaded models by file path and the modification times and sizes
+    of the file and of the files it depends on.
+
+    The cached models are shared between requests and must not be modified.
+    '''
+
+    def __init__(self, get_dependencies=None, forget=None):
+        '''
+        Args:
+            get_dependencies (callable): Function that takes the path of a
+                source file and returns the files its model depends on, e.g.
+                the local modules imported by a Python source.
+            forget (callable): Function that takes a list of files and drops
+                everything that was loaded from them, so that `load()` reads
+                them again.
+        '''
+        self.models = {}
+        self.get_dependencies = get_dependencies or (lambda path: [])
+        self.forget = forget or (lambda files: None)
+
+    def get(self, file, key, load):
+        '''
+        Returns the cached model of `file`, or loads it using `load()`.
+
+        Args:
+            file (str): The source file.
+            key (tuple): Additional parameters the model depends on.
+            load (callable): Function that loads the model.
+
+        Returns:
+            CommandLine: The model.
+        '''
+        path = os.path.realpath(file)
+        key = (path,) + tuple(key)
+
+        try:
+            states, model = self.models[key]
+            if all(_get_file_state(f) == state for f, state in states.items()):
+                return model
+        except KeyError:
+            pass
+
+        # The state of the source file is taken before loading it, so that
+        # a change made while loading is not missed
+        states = {path: _get_file_state(path)}
+
+        self.forget(self.get_dependencies(path))
+        model = load()
+
+        for dependency in self.get_dependencies(path):
+            states.setdefault(os.path.realpath(dependency), _get_file_state(dependency))
+
+        self.models[key] = (states, model)
+        return model
+
+def _handle_connection(conn, handler):
+    # stdout, stderr and the working directory are process-wide. They are
+    # replaced for the duration of the request, so requests must be handled
+    # strictly one after another, never in parallel threads.
+    request = _receive_message(conn)
+    stdout, stderr = io.StringIO(), io.StringIO()
+    cwd = os.getcwd()
+
+    try:
+        os.chdir(request['cwd'])
+        with contextlib.redirect_stdout(stdout), contextlib.redirect_stderr(stderr):
+            try:
+                exit_code = handler(request['argv'])
+            except SystemExit as e:
+                if e.code is None:
+                    exit_code = 0
+                elif isinstance(e.code, int):
+                    exit_code = e.code
+                else:
+                    print(e.code, file=sys.stderr)
+                    exit_code = 1
+            except Exception as e:
+                print('%s: %s' % (type(e).__name__, e), file=sys.stderr)
+                exit_code = 1
+    finally:
+        os.chdir(cwd)
+
+    _send_message(conn, {
+        'exit_code': exit_code,
+        'stdout':    stdout.getvalue(),
+        'stderr':    stderr.getvalue()
+    })
+
+def _is_running(socket_path):
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        sock.connect(socket_path)
+        return True
+    except OSError:
+        return False
+    finally:
+        sock.close()
+
+def serve(socket_path, handler):
+    '''
+    Runs the daemon until it is interrupted.
+
+    Requests are handled one after another. A request must not block, e.g.
+    by watching files, since no other request is served in the meantime.
+
+    Args:
+        socket_path (str): The path of the Unix socket.
+        handler (callable): Function that takes the command line arguments
+            of a request and returns the exit code. Its output to stdout and
+            stderr is sent back to the client.
+    '''
+    if os.path.exists(socket_path):
+        if _is_running(socket_path):
+            raise Exception('Server already running on %s' % socket_path)
+        os.unlink(socket_path)
+
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    old_umask = os.umask(0o077)
+    try:
+        sock.bind(socket_path)
+    finally:
+        os.umask(old_umask)
+
+    sock.listen()
+    signal.signal(signal.SIGTERM, lambda *a: sys.exit(0))
+    print('Listening on %s' % socket_path, file=sys.stderr)
+    print('Use `export %s=%s` to enable the client' % (SOCKET_ENVIRONMENT_VARIABLE, socket_path), file=sys.stderr)
+
+    try:
+        while True:
+            conn, _ = sock.accept()
+            with conn:
+                try:
+                    _handle_connection(conn, handler)
+                except Exception as e:
+                    print('Failed to handle request: %s' % e, file=sys.stderr)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        sock.close()
+        os.unlink(socket_path)
+
+def request(socket_path, argv):
+    '''
+    Sends a request to the daemon.
+
+    Args:
+        socket_path (str): The path of the Unix socket.
+        argv (list of str): The command line arguments.
+
+    Returns:
+        tuple: (exit_code, stdout, stderr), or None if the daemon is not running.
+    '''
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        try:
+            sock.connect(socket_path)
+        except OSError:
+            return None
+
+        _send_message(sock, {'argv': argv, 'cwd': os.getcwd()})
+        response = _receive_message(sock)
+        return (response['exit_code'], response['stdout'], response['stderr'])
+    finally:
+        sock.close()
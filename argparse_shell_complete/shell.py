@@ -7,6 +7,10 @@ import collections
 from . import completion_validator
 from . import commandline as _commandline
 from . import config as _config
+from . import when
+from . import profiler
+from . import minify
+from . import size_report
 
 def make_identifier(string):
     '''
@@ -59,6 +63,21 @@ def escape(string, escape_empty_string=True):
 
     return "'%s'" % string.replace("'", '\'"\'"\'')
 
+def make_when_condition(when_):
+    '''
+    Returns `when_` in its canonical form, e.g. `has_option --foo -f`.
+
+    Conditions that only differ in quoting or whitespace result in the same
+    string, so they can be deduplicated by the generators.
+
+    Args:
+        when_ (str): The condition as given by Option.when or Positional.when.
+
+    Returns:
+        str: The condition with each argument escaped by `escape()`.
+    '''
+    return ' '.join(escape(arg) for arg in when.parse_when(when_).get_args())
+
 def make_completion_funcname(cmdline, prefix='_', suffix=''):
     '''
     Generates a function name for auto-completing a program or subcommand.
@@ -101,6 +120,34 @@ def make_completion_funcname_for_context(ctxt):
     elif isinstance(ctxt.option, _commandline.Positional):
         return '%s_%s' % (funcname, ctxt.option.metavar)
 
+def get_command_path(commandline):
+    '''
+    Returns the names of `commandline` and its parents, separated by spaces.
+    '''
+    return ' '.join(p.prog for p in commandline.get_parents(include_self=True))
+
+def finish_code(config, shell, kind, name, code, may_minify=True):
+    '''
+    Minifies a part of a generated script if enabled in `config` and
+    records its size in the size report.
+
+    Args:
+        config (Config): The configuration.
+        shell (str): Either 'bash', 'fish' or 'zsh'.
+        kind (str): The kind of the part, e.g. 'helper' or 'command'.
+        name (str): The name of the part, e.g. the function name.
+        code (str): The code of the part.
+        may_minify (bool): If False, the code is never minified.
+
+    Returns:
+        str: The code.
+    '''
+    if config.minify and may_minify:
+        code = minify.minify(code, shell)
+
+    size_report.add(kind, name, code)
+    return code
+
 class ShellCompleter():
     def complete(self, ctxt, completion, *a):
         if not hasattr(self, completion):
@@ -198,16 +245,23 @@ class OptionGenerationContext(GenerationContext):
 
 class CompletionGenerator():
     def __init__(self, completion_klass, helpers_klass, commandline, program_name, config):
-        commandline = commandline.copy()
+        if config is None:
+            config = _config.Config()
+
+        trusted = config.trust_validated and commandline.is_validated()
+
+        with profiler.span('copy'):
+            commandline = commandline.copy()
 
         if program_name is not None:
             commandline.prog = program_name
 
-        if config is None:
-            config = _config.Config()
+        with profiler.span('apply_config'):
+            _commandline.CommandLine_Apply_Config(commandline, config)
 
-        _commandline.CommandLine_Apply_Config(commandline, config)
-        completion_validator.CompletionValidator().validate_commandlines(commandline)
+        if not trusted:
+            with profiler.span('validate'):
+                completion_validator.CompletionValidator().validate_commandlines(commandline)
 
         self.include_files_content = []
         for file in config.include_files:
@@ -220,7 +274,10 @@ class CompletionGenerator():
         self._call_generator(commandline)
 
     def _call_generator(self, commandline):
-        self.result.append(self.completion_klass(self.ctxt, commandline))
+        name = get_command_path(commandline)
+
+        with profiler.span('generate %s' % name):
+            self.result.append(self.completion_klass(self.ctxt, commandline))
 
         if commandline.get_subcommands_option():
             for subcommand in commandline.get_subcommands_option().subcommands:
@@ -0,0 +1,74 @@
+#!/usr/bin/python3
+
+'''
+Size report of generated completion scripts.
+
+The backends record the parts of a script they generate, e.g. the helper
+functions and the completion code of each command. Parts are only recorded
+after `enable()` has been called.
+
+Example:
+    size_report.enable()
+    script = bash.generate_completion(commandline)
+    print(size_report.format_report(script))
+'''
+
+_parts = None
+
+def enable():
+    '''
+    Enables the recording of parts and discards any previously recorded parts.
+    '''
+    global _parts
+    _parts = []
+
+def disable():
+    '''
+    Disables the recording of parts and discards the recorded parts.
+    '''
+    global _parts
+    _parts = None
+
+def is_enabled():
+    return _parts is not None
+
+def add(kind, name, code):
+    '''
+    Records a part of the generated script.
+
+    Args:
+        kind (str): The kind of the part, e.g. 'helper' or 'command'.
+        name (str): The name of the part, e.g. the function name.
+        code (str): The code of the part.
+    '''
+    if _parts is None:
+        return
+
+    _parts.append((kind, name, len(code.encode('utf-8'))))
+
+def format_report(script):
+    '''
+    Returns the recorded parts sorted by size.
+
+    Each line shows the size of a part and its share of the size of
+    `script`. Code that is not part of a recorded part, e.g. separating
+    newlines, is summarized in the last line.
+
+    Args:
+        script (str): The whole generated script.
+
+    Returns:
+        str: The report.
+    '''
+    total = len(script.encode('utf-8'))
+    lines = []
+
+    def add_line(size, kind, name):
+        lines.append('%10d B %6.1f%%  %-10s %s' % (size, size / (total or 1) * 100, kind, name))
+
+    add_line(total, 'total', '')
+    for kind, name, size in sorted(_parts, key=lambda part: part[2], reverse=True):
+        add_line(size, kind, name)
+    add_line(total - sum(part[2] for part in _parts), 'other', '')
+
+    return '\n'.join(lines)
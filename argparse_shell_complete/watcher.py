@@ -0,0 +1,186 @@
+#!/usr/bin/python3
+
+'''
+Waits for changes of files.
+
+On Linux inotify is used. Since editors often replace a file instead of
+writing to it, the directories of the files are watched. On other systems
+the modification times of the files are polled.
+'''
+
+import os
+import time
+import errno
+import select
+import struct
+import ctypes
+import ctypes.util
+
+# Time in seconds to wait for more changes after a change has been detected
+DEFAULT_DEBOUNCE = 0.2
+
+# Interval in seconds for polling file modification times
+POLL_INTERVAL = 0.5
+
+_IN_MODIFY      = 0x00000002
+_IN_ATTRIB      = 0x00000004
+_IN_CLOSE_WRITE = 0x00000008
+_IN_MOVED_FROM  = 0x00000040
+_IN_MOVED_TO    = 0x00000080
+_IN_CREATE      = 0x00000100
+_IN_DELETE      = 0x00000200
+_IN_NONBLOCK    = 0o4000
+_IN_CLOEXEC     = 0o2000000
+
+_IN_MASK = (_IN_MODIFY | _IN_ATTRIB | _IN_CLOSE_WRITE | _IN_MOVED_FROM |
+            _IN_MOVED_TO | _IN_CREATE | _IN_DELETE)
+
+_EVENT_HEADER = struct.Struct('iIII')
+
+def _load_libc():
+    try:
+        libc = ctypes.CDLL(ctypes.util.find_library('c') or 'libc.so.6', use_errno=True)
+        libc.inotify_init1
+        libc.inotify_add_watch
+        return libc
+    except (OSError, AttributeError):
+        return None
+
+class PollingWatcher:
+    '''
+    Detects changes by comparing the modification time, size and inode of files.
+    '''
+
+    def __init__(self, files, debounce=DEFAULT_DEBOUNCE):
+        self.files = [os.path.abspath(f) for f in files]
+        self.debounce = debounce
+        self.states = {f: self._get_state(f) for f in self.files}
+
+    def _get_state(self, file):
+        try:
+            st = os.stat(file)
+            return (st.st_mtime_ns, st.st_size, st.st_ino)
+        except OSError:
+            return None
+
+    def _get_changes(self):
+        changed = set()
+        for file in self.files:
+            state = self._get_state(file)
+            if state != self.states[file]:
+                self.states[file] = state
+                changed.add(file)
+        return changed
+
+    def wait(self):
+        '''
+        Blocks until at least one file has changed.
+
+        Returns:
+            set: The absolute paths of the changed files.
+        '''
+        changed = set()
+        while not changed:
+            time.sleep(POLL_INTERVAL)
+            changed = self._get_changes()
+
+        while True:
+            time.sleep(self.debounce)
+            more = self._get_changes()
+            if not more:
+                return changed
+            changed |= more
+
+    def close(self):
+        pass
+
+class InotifyWatcher:
+    '''
+    Detects changes using inotify.
+    '''
+
+    def __init__(self, files, libc, debounce=DEFAULT_DEBOUNCE):
+        self.files = set(os.path.abspath(f) for f in files)
+        self.debounce = debounce
+        self.directories = {}
+
+        self.fd = libc.inotify_init1(_IN_NONBLOCK | _IN_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), 'inotify_init1 failed')
+
+        for directory in set(os.path.dirname(f) for f in self.files):
+            wd = libc.inotify_add_watch(self.fd, directory.encode(), _IN_MASK)
+            if wd < 0:
+                err = ctypes.get_errno()
+                os.close(self.fd)
+                raise OSError(err, 'inotify_add_watch failed: %s' % directory)
+            self.directories[wd] = directory
+
+    def _read_changes(self, timeout):
+        changed = set()
+
+        if not select.select([self.fd], [], [], timeout)[0]:
+            return changed
+
+        try:
+            data = os.read(self.fd, 65536)
+        except OSError as e:
+            if e.errno == errno.EAGAIN:
+                return changed
+            raise
+
+        offset = 0
+        while offset < len(data):
+            wd, mask, cookie, length = _EVENT_HEADER.unpack_from(data, offset)
+            offset += _EVENT_HEADER.size
+            name = data[offset:offset + length].rstrip(b'\0').decode(errors='replace')
+            offset += length
+
+            path = os.path.join(self.directories.get(wd, ''), name)
+            if path in self.files:
+                changed.add(path)
+
+        return changed
+
+    def wait(self):
+        '''
+        Blocks until at least one file has changed.
+
+        Returns:
+            set: The absolute paths of the changed files.
+        '''
+        changed = set()
+        while not changed:
+            changed = self._read_changes(None)
+
+        while True:
+            more = self._read_changes(self.debounce)
+            if not more:
+                return changed
+            changed |= more
+
+    def close(self):
+        os.close(self.fd)
+
+def make_watcher(files, debounce=DEFAULT_DEBOUNCE):
+    '''
+    Returns a watcher for `files`.
+
+    An InotifyWatcher is returned if inotify is available, otherwise
+    a PollingWatcher.
+
+    Args:
+        files (list of str): The files to watch.
+        debounce (float): Time in seconds to wait for more changes.
+
+    Returns:
+        InotifyWatcher or PollingWatcher: The watcher.
+    '''
+    libc = _load_libc()
+    if libc is not None:
+        try:
+            return InotifyWatcher(files, libc, debounce)
+        except OSError:
+            pass
+
+    return PollingWatcher(files, debounce)
@@ -1,6 +1,7 @@
 #!/usr/bin/python3
 
 import shlex
+import functools
 
 class OptionIs:
     def __init__(self, args):
@@ -22,6 +23,10 @@ class OptionIs:
         if not self.values:
             raise Exception('OptionIs: Empty values')
 
+    def get_args(self):
+        ''' Returns the arguments in canonical (sorted) order '''
+        return ['option_is'] + sorted(set(self.options)) + ['--'] + sorted(set(self.values))
+
 class HasOption:
     def __init__(self, args):
         self.options = args
@@ -29,6 +34,15 @@ class HasOption:
         if not self.options:
             raise Exception('HasOption: Empty options')
 
+    def get_args(self):
+        ''' Returns the arguments in canonical (sorted) order '''
+        return ['has_option'] + sorted(set(self.options))
+
+# Maximum number of parsed conditions that are kept
+PARSE_CACHE_SIZE = 1024
+
+# Parsed conditions are shared, so callers must not modify them.
+@functools.lru_cache(maxsize=PARSE_CACHE_SIZE)
 def parse_when(s):
     splitted = shlex.split(s)
 
@@ -39,9 +53,11 @@ def parse_when(s):
     del splitted[0]
 
     if cmd == 'option_is':
-        return OptionIs(splitted)
+        parsed = OptionIs(splitted)
     elif cmd == 'has_option':
-        return HasOption(splitted)
+        parsed = HasOption(splitted)
     else:
         raise Exception("parse_when: Invalid command: %r" % cmd)
 
+    return parsed
+
@@ -1,8 +1,11 @@
+import io
+import re
 import json
 
 import yaml
 
 from . import utils
+from . import completion_validator
 from .json_source import *
 from .commandline import *
 
@@ -13,99 +16,137 @@ def bool_to_yaml(b):
     return {True: 'true', False: 'false'}[b]
 
 def option_to_yaml(obj):
-    r = ''
-    r += '- option_strings: %s\n' % json.dumps(obj['option_strings'])
+    r = []
+    r.append('- option_strings: %s\n' % json.dumps(obj['option_strings']))
 
     if 'metavar' in obj:
-        r += '  metavar: %s\n' % str_to_yaml(obj['metavar'])
+        r.append('  metavar: %s\n' % str_to_yaml(obj['metavar']))
 
     if 'help' in obj:
-        r += '  help: %s\n' % str_to_yaml(obj['help'])
+        r.append('  help: %s\n' % str_to_yaml(obj['help']))
 
     if obj.get('takes_args', True) != True:
         try:
-            r += '  takes_args: %s\n' % bool_to_yaml(obj['takes_args'])
+            r.append('  takes_args: %s\n' % bool_to_yaml(obj['takes_args']))
         except: # takes_args may be "?"
-            r += '  takes_args: %s\n' % str_to_yaml(obj['takes_args'])
+            r.append('  takes_args: %s\n' % str_to_yaml(obj['takes_args']))
 
     if 'group' in obj:
-        r += '  group: %s\n' % str_to_yaml(obj['group'])
+        r.append('  group: %s\n' % str_to_yaml(obj['group']))
 
     if obj.get('multiple_option', ExtendedBool.INHERIT) !=  ExtendedBool.INHERIT:
-        r += '  multiple_option: %s\n' % bool_to_yaml(obj['multiple_option'])
+        r.append('  multiple_option: %s\n' % bool_to_yaml(obj['multiple_option']))
 
     if 'complete' in obj:
-        r += '  complete: %s\n' % json.dumps(obj['complete'])
+        r.append('  complete: %s\n' % json.dumps(obj['complete']))
 
     if 'when' in obj:
-        r += '  when: %s\n' % str_to_yaml(obj['when'])
+        r.append('  when: %s\n' % str_to_yaml(obj['when']))
 
-    return r
+    return ''.join(r)
 
 def positional_to_yaml(obj):
-    r = ''
-    r += '- number: %d\n' % obj['number']
+    r = []
+    r.append('- number: %d\n' % obj['number'])
 
     if 'metavar' in obj:
-        r += '  metavar: %s\n' % str_to_yaml(obj['metavar'])
+        r.append('  metavar: %s\n' % str_to_yaml(obj['metavar']))
 
     if 'help' in obj:
-        r += '  help: %s\n' % str_to_yaml(obj['help'])
+        r.append('  help: %s\n' % str_to_yaml(obj['help']))
 
     if obj.get('repeatable', False) != False:
-        r += '  repeatable: %s\n' % bool_to_yaml(obj['repeatable'])
+        r.append('  repeatable: %s\n' % bool_to_yaml(obj['repeatable']))
 
     if 'complete' in obj:
-        r += '  complete: %s\n' % json.dumps(obj['complete'])
+        r.append('  complete: %s\n' % json.dumps(obj['complete']))
 
     if 'when' in obj:
-        r += '  when: %s\n' % str_to_yaml(obj['when'])
+        r.append('  when: %s\n' % str_to_yaml(obj['when']))
 
-    return r
+    return ''.join(r)
 
 def to_yaml(obj):
-    r = ''
-    r += 'prog: %s\n' % str_to_yaml(obj['prog'])
+    r = []
+    r.append('prog: %s\n' % str_to_yaml(obj['prog']))
 
     if 'aliases' in obj:
-        r += 'aliases: %s\n' % json.dumps(obj['aliases'])
+        r.append('aliases: %s\n' % json.dumps(obj['aliases']))
 
     if 'help' in obj:
-        r += 'help: %s\n' % str_to_yaml(obj['help'])
+        r.append('help: %s\n' % str_to_yaml(obj['help']))
 
     if obj.get('abbreviate_commands', ExtendedBool.INHERIT) != ExtendedBool.INHERIT:
-        r += 'abbreviate_commands: %s\n' % bool_to_yaml(obj['abbreviate_commands'])
+        r.append('abbreviate_commands: %s\n' % bool_to_yaml(obj['abbreviate_commands']))
 
     if obj.get('abbreviate_options', ExtendedBool.INHERIT) != ExtendedBool.INHERIT:
-        r += 'abbreviate_options: %s\n' % bool_to_yaml(obj['abbreviate_options'])
+        r.append('abbreviate_options: %s\n' % bool_to_yaml(obj['abbreviate_options']))
 
     if obj.get('inherit_options', ExtendedBool.INHERIT) != ExtendedBool.INHERIT:
-        r += 'inherit_options: %s\n' % bool_to_yaml(obj['inherit_options'])
+        r.append('inherit_options: %s\n' % bool_to_yaml(obj['inherit_options']))
 
     if 'options' in obj:
-        r += 'options:\n'
+        r.append('options:\n')
         for option in obj['options']:
-            r += utils.indent(option_to_yaml(option), 2)
-            r += '\n'
+            r.append(utils.indent(option_to_yaml(option), 2))
+            r.append('\n')
 
     if 'positionals' in obj:
-        r += 'positionals:\n'
+        r.append('positionals:\n')
         for positional in obj['positionals']:
-            r += utils.indent(positional_to_yaml(positional), 2)
-            r += '\n'
+            r.append(utils.indent(positional_to_yaml(positional), 2))
+            r.append('\n')
+
+    return ''.join(r)
+
+def CommandLine_To_YAML_Chunks(commandline, fingerprint=False):
+    '''
+    Yields the YAML representation of `commandline`, one document per command line.
+
+    The concatenated chunks are equal to `CommandLine_To_YAML(commandline)`.
 
-    return r
+    Args:
+        commandline (CommandLine): The command line.
+        fingerprint (bool): If True, the fingerprint of the output is stored
+            in the "validated" key of the last document. Only pass True for
+            validated command lines.
+
+    Yields:
+        str: Parts of the YAML string.
+    '''
+    builder = completion_validator.FingerprintBuilder()
+    separator = ''
+
+    for obj in iter_CommandLine_Objects(commandline):
+        chunk = separator + to_yaml(obj)
+        separator = '---\n'
+        builder.update(chunk)
+        yield chunk
+
+    if fingerprint:
+        yield 'validated: "%s"\n' % builder.hexdigest()
 
 def CommandLine_To_YAML(commandline):
-    objects = CommandLine_To_JSON(commandline)
-    r = []
+    return ''.join(CommandLine_To_YAML_Chunks(commandline))
+
+# The fingerprint is stored in the last line of the last document
+_FINGERPRINT_REGEX = re.compile(r'validated: "([0-9a-f]{64})"\n*$')
 
-    for obj in objects:
-        r.append(to_yaml(obj))
+# Use the faster libyaml based loader if it is available
+_SafeLoader = getattr(yaml, 'CSafeLoader', yaml.SafeLoader)
 
-    return '---\n'.join(r)
+def has_valid_fingerprint(yaml_string):
+    '''
+    Returns True if `yaml_string` has a fingerprint that matches its content.
+    '''
+    reader = completion_validator.FingerprintReader(
+        io.StringIO(yaml_string), _FINGERPRINT_REGEX)
+    return reader.has_valid_fingerprint()
 
 def load_from_file(file):
     with open(file, 'r') as fh:
-        return JSON_To_Commandline(list(yaml.safe_load_all(fh)))
-
+        reader = completion_validator.FingerprintReader(fh, _FINGERPRINT_REGEX)
+        commandline = JSON_To_Commandline(yaml.load_all(reader, Loader=_SafeLoader))
+        if reader.has_valid_fingerprint():
+            commandline.set_validated()
+    return commandline
@@ -1,5 +1,9 @@
 #!/usr/bin/python3
 
+import os
+import subprocess
+from collections import OrderedDict
+
 from . import shell, utils
 from . import zsh_helpers, helpers
 from . import modeline
@@ -9,6 +13,47 @@ def get_completions_file(program_name):
     dir = '/usr/share/zsh/site-functions'
     return '%s/_%s' % (dir, program_name)
 
+def get_compiled_file(file):
+    '''
+    Returns the path of the compiled form of the completion file `file`.
+
+    zsh prefers `FILE.zwc` over `FILE` if it is newer, both when autoloading
+    a function from $fpath and when sourcing a file.
+    '''
+    return '%s.zwc' % file
+
+def compile_completion_file(file):
+    '''
+    Compiles the completion file `file` into zsh wordcode using `zcompile`.
+
+    The functions are compiled for zsh-style autoloading without alias
+    expansion (`zcompile -Uz`), which is how compinit loads them.
+
+    Args:
+        file (str): The completion file.
+
+    Returns:
+        str: The path of the compiled file.
+
+    Raises:
+        Exception: If zsh is not installed, `zcompile` fails or the compiled
+            file has not been written to `get_compiled_file(file)`.
+    '''
+    command = ['zsh', '-f', '-c', 'zcompile -Uz -- "$1"', 'zsh', file]
+    try:
+        result = subprocess.run(command, stderr=subprocess.PIPE, stdout=subprocess.PIPE, text=True)
+    except FileNotFoundError:
+        raise Exception('program `zsh` not found')
+
+    if result.returncode != 0:
+        raise Exception('%s failed: %s' % (' '.join(command), result.stderr.strip()))
+
+    compiled_file = get_compiled_file(file)
+    if not os.path.exists(compiled_file) or os.path.getmtime(compiled_file) < os.path.getmtime(file):
+        raise Exception('zcompile did not write %s' % compiled_file)
+
+    return compiled_file
+
 class ZshCompleter(shell.ShellCompleter):
     def none(self, ctxt, *a):
         return "' '"
@@ -33,13 +78,19 @@ class ZshCompleter(shell.ShellCompleter):
 
     def directory(self, ctxt, opts={}):
         directory = opts.get('directory', None)
-        if directory:
+        if directory and ctxt.config.cache_file_completions:
+            funcname = ctxt.helpers.use_function('cached_files')
+            return '"%s %s -/"' % (funcname, directory)
+        elif directory:
             return '"_directories -W %s"' % directory
         return '_directories'
 
     def file(self, ctxt, opts={}):
         directory = opts.get('directory', None)
-        if directory:
+        if directory and ctxt.config.cache_file_completions:
+            funcname = ctxt.helpers.use_function('cached_files')
+            return '"%s %s"' % (funcname, directory)
+        elif directory:
             return '"_files -W %s"' % directory
         return '_files'
 
@@ -75,7 +126,7 @@ class ZshCompleter(shell.ShellCompleter):
         return shell.escape('{%s %s}' % (funcname, shell.escape(command)))
 
     def value_list(self, ctxt, opts):
-        values = ' '.join(shell.escape(i) for i in opts['values'])
+        values = ' '.join(shell.escape(escape_colon(escape_square_brackets(str(i)))) for i in opts['values'])
         descr = ctxt.option.metavar or ''
         cmd = '_values -s %s %s %s' % (shell.escape(opts.get('separator', ',')), descr, values)
         return shell.escape(cmd)
@@ -241,9 +292,9 @@ class ZshCompletionGenerator():
         else:
             abbrevs = utils.DummyAbbreviationGenerator()
 
+        # The positionals have been parsed by `zsh_helper setup`
         self.helper_used = True
-        zsh_helper = self.ctxt.helpers.use_function('zsh_helper')
-        r =  'case "$(%s get_positional %d)" in\n' % (zsh_helper, self.subcommands.get_positional_num())
+        r =  'case "${POSITIONALS[%d]}" in\n' % self.subcommands.get_positional_num()
         for subcommand in self.subcommands.subcommands:
             sub_funcname = shell.make_completion_funcname(subcommand)
             cmds = abbrevs.get_abbreviations(subcommand.prog)
@@ -256,15 +307,22 @@ class ZshCompletionGenerator():
         return r
 
     def _generate_option_parsing(self):
-        args = []
+        # The specs are grouped into blocks: one block for the options of
+        # each command and one block for the positionals and subcommands.
+        # Inherited options are taken from the blocks of the parents.
+        blocks = []
 
         if self.commandline.inherit_options:
-            options = self.commandline.get_options(with_parent_options=True)
+            commandlines = self.commandline.get_parents(include_self=True)
         else:
-            options = self.commandline.get_options()
+            commandlines = [self.commandline]
+
+        for cmdline in commandlines:
+            blocks.append((
+                '%s_options' % shell.make_completion_funcname(cmdline),
+                [self.complete_option(option) for option in cmdline.options]))
 
-        for option in options:
-            args.append(self.complete_option(option))
+        args = []
 
         # TODO: describe why we need this
         for cmdline in self.commandline.get_parents():
@@ -280,40 +338,58 @@ class ZshCompletionGenerator():
         if self.subcommands:
             args.append(self.complete_subcommands(self.subcommands))
 
-        if not len(args):
+        blocks.append(('%s_args' % self.funcname, args))
+
+        # The static specs are stored in global arrays that are only
+        # initialized once. Only the specs with a `when` condition are
+        # added on each completion.
+        #
+        # `_arguments` keeps the parsed form of a few recently used spec
+        # lists (in the `comparguments` builtin). A command with `when`
+        # conditions passes a different list for every combination of
+        # condition results, so each combination is parsed again until it
+        # is in that cache. This has not been measured.
+        spec_arrays = []
+        args_with_when = []
+        for name, block in blocks:
+            specs = [option_spec for when, option_spec in block if when is None]
+            if specs:
+                spec_arrays.append(self.ctxt.helpers.add_spec_array(name, specs))
+            args_with_when.extend(arg for arg in block if arg[0] is not None)
+
+        if not spec_arrays and not args_with_when:
             return ''
 
-        args_with_when = []
-        args_without_when = []
-        for arg in args:
-            if arg[0] is None:
-                args_without_when.append(arg)
-            else:
-                args_with_when.append(arg)
+        expansions = ' '.join('"${%s[@]}"' % name for name in spec_arrays)
 
-        r = ''
+        if not args_with_when:
+            return '_arguments -S -s -w %s' % expansions
 
-        if not args_without_when:
-            r += 'local -a args=()\n'
-        else:
-            r += 'local -a args=(\n'
-            for when, option_spec in args_without_when:
-                r += '  %s\n' % option_spec
-            r += ')\n'
+        r = 'local -a args=(%s)\n' % expansions
 
+        # Evaluate each distinct condition only once
+        conditions = OrderedDict()
         for when, option_spec in args_with_when:
+            condition = shell.make_when_condition(when)
+            conditions.setdefault(condition, []).append(option_spec)
+
+        for condition, option_specs in conditions.items():
             self.helper_used = True
             zsh_helper = self.ctxt.helpers.use_function('zsh_helper')
-            r += '%s %s &&\\\n' % (zsh_helper, when)
-            r += '  args+=(%s)\n' % option_spec
+            r += '%s %s &&\\\n' % (zsh_helper, condition)
+            r += '  args+=(%s)\n' % ' '.join(option_specs)
 
         r += '_arguments -S -s -w "${args[@]}"'
         return r
 
 def generate_completion(commandline, program_name=None, config=None):
     result = shell.CompletionGenerator(ZshCompletionGenerator, zsh_helpers.ZSH_Helpers, commandline, program_name, config)
+    config = result.ctxt.config
     functions = result.result
 
+    def finish(kind, name, code, may_minify=True):
+        return shell.finish_code(config, 'zsh', kind, name, code, may_minify)
+
     output = []
 
     if config.zsh_compdef:
@@ -321,12 +397,17 @@ def generate_completion(commandline, program_name=None, config=None):
 
     output.append(generation_notice.GENERATION_NOTICE)
 
-    output.extend(result.include_files_content)
+    for file, code in zip(config.include_files, result.include_files_content):
+        output.append(finish('include', file, code, False))
+
+    for funcname, code in result.ctxt.helpers.get_used_functions():
+        output.append(finish('helper', funcname, code))
 
-    for code in result.ctxt.helpers.get_used_functions_code():
-        output.append(code)
+    for name, specs in result.ctxt.helpers.get_spec_arrays():
+        code = 'typeset -ga %s=(\n%s\n)' % (name, '\n'.join('  %s' % spec for spec in specs))
+        output.append(finish('specs', name, code))
 
-    output += [r.result for r in functions]
+    output += [finish('command', shell.get_command_path(r.commandline), r.result) for r in functions]
 
     if config.zsh_compdef:
         output += ['%s "$@"' % functions[0].funcname]
@@ -22,8 +22,10 @@ _GET_POSITIONAL_FUNC = helpers.ShellFunction('zsh_helper', r'''
 #     If an option takes an argument, it is suffixed by '='.
 #     If an option takes an optional argument, it is suffixed by '=?'.
 #
-#   get_positional <NUM>
-#     Prints out the positional argument number NUM (starting from 1)
+#   get_positional <NUM> [VARIABLE]
+#     Prints out the positional argument number NUM (starting from 1).
+#     If VARIABLE is given, the positional is stored in VARIABLE instead,
+#     which avoids a subshell for capturing the output.
 #
 #   has_option <OPTIONS...>
 #     Checks if a option given in OPTIONS is passed on commandline.
@@ -63,8 +65,8 @@ shift
 
 case "$CMD" in
   get_positional)
-    if test $# -ne 1; then
-      echo "$FUNC: get_positional: takes exactly one argument" >&2
+    if test $# -ne 1 -a $# -ne 2; then
+      echo "$FUNC: get_positional: takes one or two arguments" >&2
       return 1;
     fi
 
@@ -73,7 +75,11 @@ case "$CMD" in
       return 1
     fi
 
-    printf "%s" "${POSITIONALS[$1]}"
+    if test $# -eq 2; then
+      typeset -g "$2=${POSITIONALS[$1]}"
+    else
+      printf "%s" "${POSITIONALS[$1]}"
+    fi
     return 0
     ;;
   has_option)
@@ -180,15 +186,14 @@ OPTION_VALUES=()
 local ARGI=2 # ARGI[1] is program name
 while [[ $ARGI -le $# ]]; do
   local ARG="${@[$ARGI]}"
-  local HAVE_TRAILING_ARG=$(test $ARGI -lt $# && echo true || echo false)
+  local HAVE_TRAILING_ARG=false
+  (( ARGI < $# )) && HAVE_TRAILING_ARG=true
 
   case "$ARG" in
     (-)
       POSITIONALS+=(-);;
     (--)
-      for ARGI in $(seq $((ARGI + 1)) $#); do
-        POSITIONALS+=("${@[$ARGI]}")
-      done
+      POSITIONALS+=("${@[$((ARGI + 1)),-1]}")
       break;;
     (--*)
       for OPTION in $LONG_OPTS_WITH_ARG $LONG_OPTS_WITHOUT_ARG $LONG_OPTS_WITH_OPTIONAL_ARG; do
@@ -242,7 +247,8 @@ while [[ $ARGI -le $# ]]; do
         local IS_END=false
         while ! $IS_END && test $I -lt $ARG_LENGTH; do
           local ARG_CHAR="${ARG:$I:1}"
-          local HAVE_TRAILING_CHARS=$(test $((I+1)) -lt $ARG_LENGTH && echo true || echo false)
+          local HAVE_TRAILING_CHARS=false
+          (( I + 1 < ARG_LENGTH )) && HAVE_TRAILING_CHARS=true
 
           for OPTION in $SHORT_OPTS_WITH_ARG $SHORT_OPTS_WITHOUT_ARG $SHORT_OPTS_WITH_OPTIONAL_ARG; do
             local OPTION_CHAR="${OPTION:1:1}"
@@ -305,8 +311,108 @@ done
 _describe '' DESCRIBE
 ''')
 
+_CACHED_FILES = helpers.ShellFunction('cached_files', r'''
+# Completes files inside directory $1, or only directories if $2 is `-/`.
+#
+# The listing of a directory is cached in global variables until the
+# modification time of the directory changes. Directories modified within
+# the current second are not cached, since the change could go unnoticed.
+
+local dir=$1 type=${2:--f} subdir= key= expl ret=1
+local -a mtime dirs files
+
+# Words containing quotes or expansions are left to _files
+if [[ $PREFIX == *[\'\"\\$~]* ]] || ! zmodload -F zsh/stat b:zstat 2>/dev/null; then
+  _files -W $1 $2
+  return
+fi
+
+zmodload -F zsh/datetime p:EPOCHSECONDS 2>/dev/null
+
+[[ $dir == /* ]] || dir=$PWD/$dir
+[[ $PREFIX == */* ]] && subdir=${PREFIX%/*}/
+key="$type $dir/$subdir"
+
+zstat -A mtime +mtime -- $dir/$subdir 2>/dev/null || return 1
+
+typeset -gA _argparse_shell_complete_dirs _argparse_shell_complete_files _argparse_shell_complete_mtime
+
+if [[ ${_argparse_shell_complete_mtime[$key]} != $mtime[1] ]]; then
+  dirs=( $dir/$subdir*(ND-/:t) )
+  [[ $type == -/ ]] || files=( $dir/$subdir*(ND^-/:t) )
+
+  _argparse_shell_complete_dirs[$key]=${(pj:\0:)dirs}
+  _argparse_shell_complete_files[$key]=${(pj:\0:)files}
+
+  if (( mtime[1] < EPOCHSECONDS )); then
+    _argparse_shell_complete_mtime[$key]=$mtime[1]
+  else
+    _argparse_shell_complete_mtime[$key]=
+  fi
+else
+  dirs=( ${(ps:\0:)_argparse_shell_complete_dirs[$key]} )
+  files=( ${(ps:\0:)_argparse_shell_complete_files[$key]} )
+fi
+
+compset -P '*/'
+
+# Hidden files are only completed if the word starts with a dot
+if [[ $PREFIX != .* ]]; then
+  dirs=( ${dirs:#.*} )
+  files=( ${files:#.*} )
+fi
+
+_description files expl file
+compadd "$expl[@]" -q -S / -- $dirs && ret=0
+compadd "$expl[@]" -- $files && ret=0
+return ret
+''')
+
 class ZSH_Helpers(helpers.GeneralHelpers):
     def __init__(self, function_prefix):
         super().__init__(function_prefix)
         self.add_function(_GET_POSITIONAL_FUNC)
         self.add_function(_EXEC)
+        self.add_function(_CACHED_FILES)
+
+        # Global arrays of static `_arguments` specs, shared by all commands
+        # of a completion file. Maps the specs to the name of the array.
+        self.spec_arrays = {}
+        self.spec_array_names = set()
+
+    def add_spec_array(self, name, specs):
+        '''
+        Adds a global array of `_arguments` specs.
+
+        If an array with the same specs has already been added, its name is
+        returned. Otherwise `name` is used, prefixed with
+        `_argparse_shell_complete` so that it does not clash with the global
+        variables of other completions. A number is appended if another
+        array already has this name.
+
+        Args:
+            name (str): The preferred name of the array, e.g. `_prog_options`.
+            specs (list of str): The specs.
+
+        Returns:
+            str: The name of the array.
+        '''
+        specs = tuple(specs)
+        if specs in self.spec_arrays:
+            return self.spec_arrays[specs]
+
+        name = '_argparse_shell_complete%s' % name
+        unique_name, number = name, 1
+        while unique_name in self.spec_array_names:
+            number += 1
+            unique_name = '%s%d' % (name, number)
+
+        self.spec_arrays[specs] = unique_name
+        self.spec_array_names.add(unique_name)
+        return unique_name
+
+    def get_spec_arrays(self):
+        '''
+        Returns a list of (name, specs) of all added arrays.
+        '''
+        return [(name, specs) for specs, name in self.spec_arrays.items()]
@@ -0,0 +1,174 @@
+#!/usr/bin/python3
+
+'''
+Benchmarks the completion generator using synthetic command line trees.
+
+Every stage of the generation is timed separately:
+  - load_json, load_yaml: Loading the tree from a file
+  - copy:                 CommandLine.copy()
+  - apply_config:         CommandLine_Apply_Config()
+  - validate:             CompletionValidator.validate_commandlines()
+  - bash, fish, zsh:      generate_completion() of the backend
+
+Each stage is run several times and the minimum and median times are
+reported. The peak memory of a stage is measured in a separate run using
+tracemalloc, since tracing slows down the execution.
+
+Results can be saved as a baseline and compared against later runs:
+
+    ./generator.py -o baseline.json
+    ./generator.py --compare baseline.json
+'''
+
+import os
+import sys
+import time
+import argparse
+import platform
+import tempfile
+import statistics
+import tracemalloc
+
+from utils import *
+
+import synthetic
+
+from argparse_shell_complete import commandline as _commandline
+from argparse_shell_complete import json_source, yaml_source
+from argparse_shell_complete import bash, fish, zsh
+from argparse_shell_complete.completion_validator import CompletionValidator
+
+def get_stages(commandline, conf, tempdir):
+    '''
+    Returns a list of (name, setup, function) tuples.
+
+    `setup` prepares the argument for `function` and is not measured.
+    '''
+    json_file = os.path.join(tempdir, 'commandline.json')
+    yaml_file = os.path.join(tempdir, 'commandline.yaml')
+
+    with open(json_file, 'w') as fh:
+        fh.write(json.dumps(json_source.CommandLine_To_JSON(commandline)))
+
+    with open(yaml_file, 'w') as fh:
+        fh.write(yaml_source.CommandLine_To_YAML(commandline))
+
+    def make_copy():
+        return commandline.copy()
+
+    def make_configured_copy():
+        copy = commandline.copy()
+        _commandline.CommandLine_Apply_Config(copy, conf)
+        return copy
+
+    return [
+        ('load_json',    None,                 lambda _: json_source.load_from_file(json_file)),
+        ('load_yaml',    None,                 lambda _: yaml_source.load_from_file(yaml_file)),
+        ('copy',         None,                 lambda _: commandline.copy()),
+        ('apply_config', make_copy,            lambda c: _commandline.CommandLine_Apply_Config(c, conf)),
+        ('validate',     make_configured_copy, lambda c: CompletionValidator().validate_commandlines(c)),
+        ('bash',         None,                 lambda _: bash.generate_completion(commandline, None, conf)),
+        ('fish',         None,                 lambda _: fish.generate_completion(commandline, None, conf)),
+        ('zsh',          None,                 lambda _: zsh.generate_completion(commandline, None, conf)),
+    ]
+
+def measure_time(setup, function, repeat):
+    times = []
+
+    for i in range(repeat):
+        arg = setup() if setup else None
+        start = time.perf_counter()
+        function(arg)
+        times.append(time.perf_counter() - start)
+
+    return {
+        'min_ms':    round(min(times) * 1000, 3),
+        'median_ms': round(statistics.median(times) * 1000, 3)
+    }
+
+def measure_memory(setup, function):
+    tracemalloc.start()
+    try:
+        arg = setup() if setup else None
+        tracemalloc.reset_peak()
+        before = tracemalloc.get_traced_memory()[0]
+        function(arg)
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+    return {
+        'peak_kib': round((peak - before) / 1024, 1)
+    }
+
+def benchmark_profile(name, opts):
+    commandline, conf = synthetic.make_profile(name)
+
+    result = {
+        'commands': synthetic.count_commands(commandline),
+        'stages':   {}
+    }
+
+    with tempfile.TemporaryDirectory() as tempdir:
+        for stage, setup, function in get_stages(commandline, conf, tempdir):
+            if opts.stages and stage not in opts.stages:
+                continue
+
+            stats = measure_time(setup, function, opts.repeat)
+            stats.update(measure_memory(setup, function))
+            result['stages'][stage] = stats
+
+            print('%-15s %-12s %10.3f ms %10.1f KiB' % (
+                name, stage, stats['median_ms'], stats['peak_kib']), file=sys.stderr)
+
+    return result
+
+def benchmark(opts):
+    return {
+        'benchmark': 'generator',
+        'python':    platform.python_version(),
+        'repeat':    opts.repeat,
+        'profiles':  {name: benchmark_profile(name, opts) for name in opts.profiles}
+    }
+
+def compare(baseline, current, opts):
+    regressions  = find_regressions(baseline, current, ['median_ms'], opts.threshold, opts.min_delta_ms)
+    regressions += find_regressions(baseline, current, ['peak_kib'], opts.threshold)
+
+    for path, old, new in regressions:
+        print('REGRESSION: %s: %s -> %s (%.2fx)' % (path, old, new, new / old if old else float('inf')), file=sys.stderr)
+
+    return len(regressions) == 0
+
+p = argparse.ArgumentParser('generator.py',
+    description='Benchmark the completion generator')
+
+p.add_argument('--profiles', nargs='+', choices=synthetic.PROFILES.keys(),
+    default=list(synthetic.PROFILES.keys()),
+    help='Synthetic trees to benchmark [default: all]')
+
+p.add_argument('--stages', nargs='+', default=None,
+    help='Only run these stages [default: all]')
+
+p.add_argument('-r', '--repeat', type=int, default=5,
+    help='Number of timed runs per stage')
+
+p.add_argument('-o', '--output', default=None,
+    help='Write JSON results to file, e.g. to save a baseline [default: stdout]')
+
+p.add_argument('--compare', default=None, metavar='BASELINE',
+    help='Compare results against a saved baseline and exit with 1 on regressions')
+
+p.add_argument('--threshold', type=float, default=1.25,
+    help='Factor by which a value may exceed the baseline [default: 1.25]')
+
+p.add_argument('--min-delta-ms', type=float, default=1.0,
+    help='Ignore time differences smaller than this [default: 1.0]')
+
+if __name__ == '__main__':
+    opts = p.parse_args()
+    result = benchmark(opts)
+    write_json(result, opts.output)
+
+    if opts.compare and not compare(load_json(opts.compare), result, opts):
+        sys.exit(1)
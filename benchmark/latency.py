@@ -0,0 +1,291 @@
+#!/usr/bin/python3
+
+'''
+Measures the latency of the generated completion functions.
+
+The completion scripts for `test/argparse-shell-complete-test` are generated
+and sourced into a non-interactive shell. For every scenario of `test/tests.py`
+the shell state of a completion request is synthesized and the completion
+function is called many times in a row.
+
+Notes:
+  - Bash: COMP_WORDS, COMP_CWORD, COMP_LINE and COMP_POINT are set and the
+    function registered by `complete -F` is called. This requires the
+    bash-completion library, because the generated code uses `_init_completion`.
+    Time is measured using $EPOCHREALTIME (bash >= 5.0).
+
+  - Zsh: `words` and `CURRENT` are set and the function registered by
+    `compdef` is called. Completion builtins (compadd, compset) and
+    completion system functions (_arguments, _describe, ...) are replaced
+    by no-ops, since they only work inside a completion widget. The numbers
+    therefore only cover the generated code up to the hand-over to compsys.
+
+  - Fish: `complete -C LINE` is timed using the `time` keyword (fish >= 3.1).
+
+Shells that are not installed are skipped.
+'''
+
+import os
+import re
+import sys
+import shlex
+import argparse
+import tempfile
+
+from utils import *
+
+SHELLS = ['bash', 'fish', 'zsh']
+
+TEST_PROGRAM = os.path.join(TEST_DIR, 'argparse-shell-complete-test')
+
+BASH_COMPLETION = '/usr/share/bash-completion/bash_completion'
+
+# Characters of bash's default COMP_WORDBREAKS that split words
+BASH_WORDBREAKS = '=:><;|&('
+
+ZSH_STUBS = [
+    'compadd', 'compset', '_arguments', '_describe', '_values', '_files',
+    '_directories', '_message', '_description', '_wanted', '_users',
+    '_groups', '_hosts', '_pids', '_process_names', '_command_names',
+    '_parameters', '_vars', 'compdef'
+]
+
+def split_bash_words(line):
+    '''
+    Splits `line` into words like readline does for COMP_WORDS.
+
+    Consecutive word break characters form a word of their own. Quoting
+    is not supported.
+    '''
+    words = []
+    word = ''
+
+    for c in line:
+        if c in ' \t':
+            if word:
+                words.append(word)
+            word = ''
+            continue
+
+        if word and (c in BASH_WORDBREAKS) != (word[-1] in BASH_WORDBREAKS):
+            words.append(word)
+            word = ''
+
+        word += c
+
+    words.append(word)
+    return words
+
+def split_zsh_words(line):
+    words = shlex.split(line)
+    if line.endswith(' '):
+        words.append('')
+    return words
+
+def fish_quote(s):
+    return "'%s'" % s.replace('\\', '\\\\').replace("'", "\\'")
+
+def get_function_name(script, regex):
+    with open(script, 'r') as fh:
+        m = re.search(regex, fh.read(), re.MULTILINE)
+    if not m:
+        raise Exception('%s: completion function not found' % script)
+    return m.group(1)
+
+def get_version(program):
+    return run([program, '--version']).split('\n')[0].strip()
+
+# =============================================================================
+# Shell drivers
+# =============================================================================
+
+def run_bash(script, scenarios, opts):
+    funcname = get_function_name(script, r'^complete -F (\S+) ')
+
+    code  = '[[ -n "$EPOCHREALTIME" ]] || { echo "bash >= 5.0 required" >&2; exit 1; }\n'
+    code += 'source %s || exit 1\n' % shlex.quote(opts.bash_completion)
+    code += 'source %s || exit 1\n' % shlex.quote(script)
+    code += r'''
+__benchmark() {
+  local ITERATIONS=$1 WARMUP=$2; shift 2
+  local -a TIMES=()
+  local I START END
+
+  COMP_WORDS=("$@")
+  COMP_CWORD=$(( $# - 1 ))
+  COMP_LINE="$BENCHMARK_LINE"
+  COMP_POINT=${#COMP_LINE}
+
+  {
+    for ((I = 0; I < WARMUP + ITERATIONS; ++I)); do
+      COMPREPLY=()
+      START=$EPOCHREALTIME
+      %FUNC% "${COMP_WORDS[0]}" "${COMP_WORDS[COMP_CWORD]}" "${COMP_WORDS[COMP_CWORD-1]}"
+      END=$EPOCHREALTIME
+      (( I < WARMUP )) || TIMES+=($(( 10#${END/./} - 10#${START/./} )))
+    done
+  } &>/dev/null
+
+  echo "${TIMES[*]}"
+}
+'''.replace('%FUNC%', funcname)
+
+    for scenario in scenarios:
+        words = split_bash_words(scenario['send'])
+        code += 'BENCHMARK_LINE=%s __benchmark %d %d %s\n' % (
+            shlex.quote(scenario['send']), opts.iterations, opts.warmup,
+            ' '.join(shlex.quote(w) for w in words))
+
+    output = run(['bash', '--norc', '--noprofile', '-c', code], env=dict(os.environ, LC_ALL='C'))
+    return [list(map(float, line.split())) for line in output.split('\n')[:len(scenarios)]]
+
+def run_zsh(script, scenarios, opts):
+    funcname = get_function_name(script, r'^compdef (\S+) ')
+
+    code  = 'zmodload zsh/datetime || exit 1\n'
+    for stub in ZSH_STUBS:
+        code += 'functions[%s]=:\n' % stub
+    code += 'source %s || exit 1\n' % shlex.quote(script)
+    code += r'''
+__benchmark() {
+  local ITERATIONS=$1 WARMUP=$2; shift 2
+  local -a TIMES=() START END
+  local I
+  local -a words=("$@")
+  local CURRENT=$#
+  local PREFIX="$words[CURRENT]" IPREFIX='' SUFFIX='' ISUFFIX=''
+
+  {
+    for ((I = 0; I < WARMUP + ITERATIONS; ++I)); do
+      START=($epochtime)
+      %FUNC%
+      END=($epochtime)
+      (( I < WARMUP )) || TIMES+=($(( ((END[1] - START[1]) * 1000000000 + END[2] - START[2]) / 1000.0 )))
+    done
+  } &>/dev/null
+
+  echo "${TIMES[*]}"
+}
+'''.replace('%FUNC%', funcname)
+
+    for scenario in scenarios:
+        words = split_zsh_words(scenario['send'])
+        code += '__benchmark %d %d %s\n' % (
+            opts.iterations, opts.warmup, ' '.join(shlex.quote(w) for w in words))
+
+    output = run(['zsh', '--no-rcs', '-c', code], env=dict(os.environ, LC_ALL='C'))
+    return [list(map(float, line.split())) for line in output.split('\n')[:len(scenarios)]]
+
+def run_fish(script, scenarios, opts):
+    units = {'micros': 1, 'millis': 1000, 'secs': 1000000, 'mins': 60000000}
+
+    with tempfile.NamedTemporaryFile('r', suffix='.times') as times_file:
+        code  = 'source %s; or exit 1\n' % fish_quote(script)
+        code += 'function __benchmark -a iterations warmup line\n'
+        code += '  for i in (seq $warmup)\n'
+        code += '    complete -C $line >/dev/null\n'
+        code += '  end\n'
+        code += '  echo "### $line" >> %s\n' % fish_quote(times_file.name)
+        code += '  for i in (seq $iterations)\n'
+        code += '    begin; time complete -C $line >/dev/null; end 2>> %s\n' % fish_quote(times_file.name)
+        code += '  end\n'
+        code += 'end\n'
+
+        for scenario in scenarios:
+            code += '__benchmark %d %d %s\n' % (opts.iterations, opts.warmup, fish_quote(scenario['send']))
+
+        run(['fish', '--no-config', '-c', code], env=dict(os.environ, LC_ALL='C'))
+
+        result = []
+        for line in times_file.read().split('\n'):
+            if line.startswith('### '):
+                result.append([])
+            m = re.match(r'Executed in\s+([0-9.]+)\s+(\w+)', line)
+            if m:
+                result[-1].append(float(m.group(1)) * units[m.group(2)])
+        return result
+
+RUNNERS = {
+    'bash': run_bash,
+    'fish': run_fish,
+    'zsh':  run_zsh
+}
+
+# =============================================================================
+# Main
+# =============================================================================
+
+def get_available_shells(opts):
+    shells = []
+
+    for shell in opts.shells:
+        if not find_program(shell):
+            warn('%s not found, skipping' % shell)
+        elif shell == 'bash' and not os.path.isfile(opts.bash_completion):
+            warn('%s not found, skipping bash (see --bash-completion)' % opts.bash_completion)
+        else:
+            shells.append(shell)
+
+    return shells
+
+def benchmark(opts):
+    result = {
+        'benchmark':      'latency',
+        'unit':           'us',
+        'iterations':     opts.iterations,
+        'generator_args': opts.generator_arg,
+        'shells':         {}
+    }
+
+    shells = get_available_shells(opts)
+
+    with tempfile.TemporaryDirectory() as tempdir:
+        for shell in shells:
+            scenarios_result = {}
+
+            for i, (args, scenarios) in enumerate(load_test_scenarios()):
+                script = os.path.join(tempdir, 'completion%d.%s' % (i, shell))
+                generate_completion(shell, TEST_PROGRAM, script,
+                    ['--zsh-compdef=False'] + args + opts.generator_arg)
+
+                for scenario, times in zip(scenarios, RUNNERS[shell](script, scenarios, opts)):
+                    stats = summarize(times)
+                    stats['description'] = scenario['description']
+                    stats['line'] = scenario['send']
+                    scenarios_result['%02d' % scenario['number']] = stats
+
+            all_p50 = sorted(s['p50'] for s in scenarios_result.values() if s['n'])
+            result['shells'][shell] = {
+                'version':   get_version(shell),
+                'p50_total': round(sum(all_p50), 3),
+                'scenarios': scenarios_result
+            }
+
+            print('%-4s: sum of p50 = %.0f us' % (shell, sum(all_p50)), file=sys.stderr)
+
+    return result
+
+p = argparse.ArgumentParser('latency.py',
+    description='Measure the latency of generated completion functions')
+
+p.add_argument('--shells', nargs='+', choices=SHELLS, default=SHELLS,
+    help='Shells to benchmark [default: all installed]')
+
+p.add_argument('-n', '--iterations', type=int, default=1000,
+    help='Number of timed completion calls per scenario')
+
+p.add_argument('--warmup', type=int, default=10,
+    help='Number of untimed completion calls per scenario')
+
+p.add_argument('-a', '--generator-arg', action='append', default=[],
+    help='Pass argument to argparse-shell-complete (e.g. -a=--inherit-options=true)')
+
+p.add_argument('--bash-completion', default=BASH_COMPLETION,
+    help='Path to the bash-completion library [default: %s]' % BASH_COMPLETION)
+
+p.add_argument('-o', '--output', default=None,
+    help='Write JSON results to file [default: stdout]')
+
+if __name__ == '__main__':
+    opts = p.parse_args()
+    write_json(benchmark(opts), opts.output)
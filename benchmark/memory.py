@@ -0,0 +1,122 @@
+#!/usr/bin/python3
+
+'''
+Measures the memory footprint of CommandLine trees.
+
+Trees with an increasing number of options are synthesized, and the memory
+that is still allocated after building the tree is measured using
+tracemalloc. The tree is built in two ways:
+  - synthetic: Using the CommandLine API directly
+  - json:      By loading the tree from a JSON file. Every option then has
+               its own copy of the completion spec, which is the common case
+               for machine-generated definitions.
+'''
+
+import os
+import gc
+import sys
+import json
+import argparse
+import tempfile
+import tracemalloc
+
+from utils import *
+
+import synthetic
+
+from argparse_shell_complete import json_source
+
+OPTIONS_PER_COMMAND = 100
+
+def build_synthetic(num_options, opts):
+    fanout = max(1, num_options // OPTIONS_PER_COMMAND - 1)
+    return synthetic.make_commandline(depth=1, fanout=fanout,
+        options=OPTIONS_PER_COMMAND, choices=opts.choices)
+
+def count_options(commandline):
+    r = len(commandline.options)
+    if commandline.get_subcommands_option():
+        for subcommand in commandline.get_subcommands_option().subcommands:
+            r += count_options(subcommand)
+    return r
+
+def measure(build):
+    gc.collect()
+    tracemalloc.start()
+    try:
+        commandline = build()
+        gc.collect()
+        size = tracemalloc.get_traced_memory()[0]
+    finally:
+        tracemalloc.stop()
+
+    return commandline, size
+
+def benchmark(opts):
+    result = {
+        'benchmark': 'memory',
+        'choices':   opts.choices,
+        'sizes':     {}
+    }
+
+    with tempfile.TemporaryDirectory() as tempdir:
+        for num_options in opts.options:
+            template = build_synthetic(num_options, opts)
+            json_file = os.path.join(tempdir, 'commandline.json')
+            with open(json_file, 'w') as fh:
+                fh.write(json.dumps(json_source.CommandLine_To_JSON(template)))
+            del template
+
+            sources = {
+                'synthetic': lambda: build_synthetic(num_options, opts),
+                'json':      lambda: json_source.load_from_file(json_file)
+            }
+
+            size_result = {}
+            for source, build in sources.items():
+                commandline, size = measure(build)
+                count = count_options(commandline)
+                del commandline
+
+                size_result[source] = {
+                    'options':          count,
+                    'total_kib':        round(size / 1024, 1),
+                    'bytes_per_option': round(size / count, 1)
+                }
+
+                print('%-9s %8d options %12.1f KiB %8.1f bytes/option' % (
+                    source, count, size / 1024, size / count), file=sys.stderr)
+
+            result['sizes'][str(num_options)] = size_result
+
+    return result
+
+p = argparse.ArgumentParser('memory.py',
+    description='Measure the memory footprint of CommandLine trees')
+
+p.add_argument('--options', nargs='+', type=int, default=[1000, 10000, 100000],
+    help='Approximate number of options of the trees')
+
+p.add_argument('--choices', type=int, default=20,
+    help='Number of items of each choices list')
+
+p.add_argument('-o', '--output', default=None,
+    help='Write JSON results to file, e.g. to save a baseline [default: stdout]')
+
+p.add_argument('--compare', default=None, metavar='BASELINE',
+    help='Compare results against a saved baseline and exit with 1 on regressions')
+
+p.add_argument('--threshold', type=float, default=1.1,
+    help='Factor by which a value may exceed the baseline [default: 1.1]')
+
+if __name__ == '__main__':
+    opts = p.parse_args()
+    result = benchmark(opts)
+    write_json(result, opts.output)
+
+    if opts.compare:
+        regressions = find_regressions(load_json(opts.compare), result, ['bytes_per_option'], opts.threshold)
+        for path, old, new in regressions:
+            print('REGRESSION: %s: %s -> %s' % (path, old, new), file=sys.stderr)
+        if regressions:
+            sys.exit(1)
@@ -0,0 +1,131 @@
+#!/usr/bin/python3
+
+'''
+Synthesizes CommandLine trees for benchmarking.
+
+When run as a script, the tree is written to stdout in JSON or YAML format.
+'''
+
+import json
+import string
+import argparse
+
+from utils import *
+
+from argparse_shell_complete.commandline import CommandLine
+from argparse_shell_complete import config, json_source, yaml_source
+
+# Parameters of the predefined trees
+PROFILES = {
+    'small':          dict(depth=1, fanout=3, options=5,  choices=5),
+    'medium':         dict(depth=2, fanout=5, options=20, choices=20),
+    'medium-abbrev':  dict(depth=2, fanout=5, options=20, choices=20, abbreviate=True),
+    'medium-inherit': dict(depth=2, fanout=5, options=20, choices=20, inherit=True),
+    'large':          dict(depth=3, fanout=6, options=30, choices=50),
+}
+
+def _add_options(commandline, level, num_options, num_choices):
+    choices = ['%s-value%d' % (commandline.prog, i) for i in range(num_choices)]
+
+    for i in range(num_options):
+        option_strings = ['--%s-opt%d' % (commandline.prog, i)]
+
+        # Short options are only added to the root command, since they
+        # would collide with the options of the parent commands.
+        if level == 0 and i < len(string.ascii_letters):
+            option_strings.insert(0, '-%s' % string.ascii_letters[i])
+
+        kind = i % 4
+        if kind == 0:
+            commandline.add_option(option_strings, takes_args=False,
+                help='Flag %d' % i, group='group' if i < 8 else None)
+        elif kind == 1:
+            commandline.add_option(option_strings, metavar='CHOICE',
+                help='Option %d with choices' % i, complete=('choices', choices))
+        elif kind == 2:
+            commandline.add_option(option_strings, metavar='FILE',
+                help='Option %d with files' % i, complete=('file',))
+        else:
+            commandline.add_option(option_strings, metavar='VALUE',
+                help='Option %d with a condition' % i, complete=('choices', choices),
+                when='has_option %s' % commandline.options[0].option_strings[-1])
+
+def _add_commands(commandline, level, depth, fanout, num_options, num_choices):
+    _add_options(commandline, level, num_options, num_choices)
+
+    if level < depth:
+        subcommands = commandline.add_subcommands(help='Subcommands')
+        for i in range(fanout):
+            subcommand = subcommands.add_commandline('cmd%d' % i, help='Command %d' % i)
+            _add_commands(subcommand, level + 1, depth, fanout, num_options, num_choices)
+    else:
+        commandline.add_positional(1, metavar='ARG', help='Positional',
+            complete=('choices', ['arg%d' % i for i in range(num_choices)]))
+
+def make_commandline(depth=2, fanout=3, options=10, choices=10, prog='synthetic'):
+    '''
+    Creates a CommandLine tree.
+
+    Args:
+        depth (int): Number of subcommand levels below the root command.
+        fanout (int): Number of subcommands per command.
+        options (int): Number of options per command.
+        choices (int): Number of items of each choices list.
+        prog (str): The program name.
+
+    Returns:
+        CommandLine: The root command.
+    '''
+    commandline = CommandLine(prog, help='Synthetic program')
+    _add_commands(commandline, 0, depth, fanout, options, choices)
+    return commandline
+
+def make_config(abbreviate=False, inherit=False):
+    '''
+    Creates the Config for a tree.
+
+    Args:
+        abbreviate (bool): Enable abbreviation of commands and options.
+        inherit (bool): Make parent options visible to subcommands.
+
+    Returns:
+        Config: The configuration.
+    '''
+    conf = config.Config()
+    conf.set_abbreviate_commands(abbreviate)
+    conf.set_abbreviate_options(abbreviate)
+    conf.set_inherit_options(inherit)
+    conf.set_vim_modeline(False)
+    return conf
+
+def make_profile(name):
+    '''
+    Returns the CommandLine tree and the Config of a predefined profile.
+    '''
+    params = dict(PROFILES[name])
+    conf = make_config(params.pop('abbreviate', False), params.pop('inherit', False))
+    return make_commandline(**params), conf
+
+def count_commands(commandline):
+    r = 1
+    if commandline.get_subcommands_option():
+        for subcommand in commandline.get_subcommands_option().subcommands:
+            r += count_commands(subcommand)
+    return r
+
+p = argparse.ArgumentParser('synthetic.py',
+    description='Write a synthetic command line definition to stdout')
+
+p.add_argument('format', choices=('json', 'yaml'),
+    help='Output format')
+
+p.add_argument('--profile', choices=PROFILES.keys(), default='medium',
+    help='Use the parameters of a predefined tree')
+
+if __name__ == '__main__':
+    opts = p.parse_args()
+    commandline, _ = make_profile(opts.profile)
+    if opts.format == 'json':
+        print(json.dumps(json_source.CommandLine_To_JSON(commandline)))
+    else:
+        print(yaml_source.CommandLine_To_YAML(commandline))
@@ -0,0 +1,129 @@
+#!/usr/bin/python3
+
+import os
+import sys
+import json
+import math
+import subprocess
+
+BENCHMARK_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT_DIR      = os.path.dirname(BENCHMARK_DIR)
+TEST_DIR      = os.path.join(ROOT_DIR, 'test')
+
+# Benchmark the package of this source tree, not an installed one
+sys.path.insert(0, ROOT_DIR)
+
+def run(args, env=None, input=None):
+    result = subprocess.run(args, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True, env=env, input=input)
+
+    if result.returncode != 0:
+        raise Exception("Cmd %r failed: %s" % (args, result.stderr))
+
+    return result.stdout
+
+def find_program(name):
+    for directory in os.environ.get('PATH', '').split(os.pathsep):
+        path = os.path.join(directory, name)
+        if os.path.isfile(path) and os.access(path, os.X_OK):
+            return path
+    return None
+
+def warn(*a):
+    print('Warning:', *a, file=sys.stderr)
+
+def percentile(sorted_samples, p):
+    '''
+    Returns the p-th percentile of `sorted_samples` using the nearest-rank method.
+    '''
+    if not sorted_samples:
+        return None
+    rank = max(1, math.ceil(p / 100 * len(sorted_samples)))
+    return sorted_samples[rank - 1]
+
+def summarize(samples):
+    '''
+    Returns a dictionary with the count, mean, minimum and the
+    50th, 95th and 99th percentile of `samples`.
+    '''
+    samples = sorted(samples)
+    return {
+        'n':    len(samples),
+        'mean': round(sum(samples) / len(samples), 3) if samples else None,
+        'min':  samples[0] if samples else None,
+        'p50':  percentile(samples, 50),
+        'p95':  percentile(samples, 95),
+        'p99':  percentile(samples, 99),
+    }
+
+def write_json(obj, file=None):
+    r = json.dumps(obj, indent=2, sort_keys=True)
+    if file is None or file == '-':
+        print(r)
+    else:
+        with open(file, 'w') as fh:
+            fh.write(r + '\n')
+
+def generate_completion(shell, source_file, outfile, args=[]):
+    '''
+    Runs `argparse-shell-complete` from this source tree.
+    '''
+    env = os.environ.copy()
+    env['PYTHONPATH'] = ROOT_DIR + os.pathsep + env.get('PYTHONPATH', '')
+    run([sys.executable, os.path.join(ROOT_DIR, 'argparse-shell-complete'),
+         '--allow-python', shell, source_file, '-o', outfile] + args, env=env)
+
+def load_test_scenarios():
+    '''
+    Returns the scenarios of `test/tests.py` as a list of blocks.
+
+    Each block is a tuple of (generator_args, tests), where `tests` is a
+    list of dictionaries with the keys `number`, `description` and `send`.
+    '''
+    sys.path.insert(0, TEST_DIR)
+    try:
+        import tests
+    finally:
+        sys.path.remove(TEST_DIR)
+
+    blocks = []
+    number = 1
+    for test in tests.tests:
+        if 'generate-scripts' in test:
+            blocks.append((test['generate-scripts'], []))
+        elif 'send' in test:
+            blocks[-1][1].append({
+                'number':      number,
+                'description': test['description'],
+                'send':        test['send']
+            })
+            number += 1
+    return blocks
+
+def load_json(file):
+    with open(file, 'r') as fh:
+        return json.load(fh)
+
+def find_regressions(baseline, current, keys, threshold, min_delta=0, path=()):
+    '''
+    Compares two benchmark results.
+
+    Walks both dictionaries recursively and compares the values of `keys`
+    that exist in both. A value is a regression if it exceeds the baseline
+    by the factor `threshold` and by at least `min_delta`.
+
+    Returns:
+        list: A list of (path, baseline_value, current_value) tuples.
+    '''
+    r = []
+
+    for key, value in current.items():
+        if key not in baseline:
+            continue
+
+        if isinstance(value, dict) and isinstance(baseline[key], dict):
+            r.extend(find_regressions(baseline[key], value, keys, threshold, min_delta, path + (key,)))
+        elif key in keys and isinstance(value, (int, float)) and isinstance(baseline[key], (int, float)):
+            if value > baseline[key] * threshold and value - baseline[key] >= min_delta:
+                r.append(('.'.join(path + (key,)), baseline[key], value))
+
+    return r
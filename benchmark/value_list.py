@@ -0,0 +1,111 @@
+#!/usr/bin/python3
+
+'''
+Measures the latency of the `value_list` completion with many values.
+
+A program with a single option that completes a list of `--values` values
+is generated. The completion is timed with `--typed` values already in the
+list, once with a trailing separator (all remaining values are completed)
+and once with a partial last value.
+
+The shells are driven like in `latency.py`, shells that are not installed
+are skipped.
+'''
+
+import os
+import sys
+import argparse
+import tempfile
+
+from utils import *
+
+import synthetic
+
+from argparse_shell_complete.commandline import CommandLine
+from argparse_shell_complete import bash, fish, zsh
+
+from latency import SHELLS, RUNNERS, BASH_COMPLETION, get_available_shells, get_version
+
+GENERATORS = {
+    'bash': bash.generate_completion,
+    'fish': fish.generate_completion,
+    'zsh':  zsh.generate_completion
+}
+
+def make_commandline(num_values):
+    commandline = CommandLine('value-list-benchmark', help='Program with a long value list')
+    values = ['value%d' % i for i in range(num_values)]
+    commandline.add_option(['--list'], metavar='VALUES', help='List of values',
+        complete=('value_list', {'values': values}))
+    return commandline
+
+def get_scenarios(num_typed):
+    typed = ','.join('value%d' % i for i in range(num_typed))
+    return [
+        {'description': 'after separator', 'send': 'value-list-benchmark --list %s,' % typed},
+        {'description': 'partial value',   'send': 'value-list-benchmark --list %s,value9' % typed},
+    ]
+
+def benchmark(opts):
+    result = {
+        'benchmark':  'value_list',
+        'unit':       'us',
+        'iterations': opts.iterations,
+        'values':     opts.values,
+        'typed':      opts.typed,
+        'shells':     {}
+    }
+
+    commandline = make_commandline(opts.values)
+    conf = synthetic.make_config()
+    conf.set_zsh_compdef(False)
+    scenarios = get_scenarios(opts.typed)
+
+    with tempfile.TemporaryDirectory() as tempdir:
+        for shell in get_available_shells(opts):
+            script = os.path.join(tempdir, 'completion.%s' % shell)
+            with open(script, 'w') as fh:
+                fh.write(GENERATORS[shell](commandline, None, conf))
+
+            scenarios_result = {}
+            for scenario, times in zip(scenarios, RUNNERS[shell](script, scenarios, opts)):
+                stats = summarize(times)
+                stats['description'] = scenario['description']
+                scenarios_result[scenario['description']] = stats
+
+                print('%-4s: %-16s p50 = %.0f us' % (shell, scenario['description'], stats['p50']), file=sys.stderr)
+
+            result['shells'][shell] = {
+                'version':   get_version(shell),
+                'scenarios': scenarios_result
+            }
+
+    return result
+
+p = argparse.ArgumentParser('value_list.py',
+    description='Measure the latency of value_list completions')
+
+p.add_argument('--shells', nargs='+', choices=SHELLS, default=SHELLS,
+    help='Shells to benchmark [default: all installed]')
+
+p.add_argument('--values', type=int, default=1000,
+    help='Number of possible values [default: 1000]')
+
+p.add_argument('--typed', type=int, default=100,
+    help='Number of values already in the list [default: 100]')
+
+p.add_argument('-n', '--iterations', type=int, default=100,
+    help='Number of timed completion calls per scenario')
+
+p.add_argument('--warmup', type=int, default=5,
+    help='Number of untimed completion calls per scenario')
+
+p.add_argument('--bash-completion', default=BASH_COMPLETION,
+    help='Path to the bash-completion library [default: %s]' % BASH_COMPLETION)
+
+p.add_argument('-o', '--output', default=None,
+    help='Write JSON results to file [default: stdout]')
+
+if __name__ == '__main__':
+    opts = p.parse_args()
+    write_json(benchmark(opts), opts.output)
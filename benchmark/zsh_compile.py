@@ -0,0 +1,186 @@
+#!/usr/bin/python3
+
+'''
+Measures the effect of compiling a zsh completion file with `zcompile`.
+
+A synthetic tree is generated in #compdef layout and placed in a directory
+that is prepended to $fpath. For every run a new zsh is started, which
+
+  - runs `compinit` (without a dump file, so that $fpath is scanned), and
+  - calls the completion function once, like the first TAB press does.
+
+The first call autoloads the completion file. Without compilation the file
+is parsed, with compilation the wordcode of `_PROG.zwc` is loaded instead.
+
+As in `latency.py`, the completion builtins and the completion system
+functions are replaced by no-ops, since they only work inside a completion
+widget. The numbers therefore only cover the generated code.
+
+Requires a stock zsh, no network access is needed.
+'''
+
+import os
+import re
+import sys
+import shlex
+import argparse
+import tempfile
+import statistics
+
+from utils import *
+
+import synthetic
+
+from argparse_shell_complete import zsh
+
+from latency import ZSH_STUBS, get_version
+
+VARIANTS = ['source', 'compiled']
+
+def get_function_name(script):
+    with open(script, 'r') as fh:
+        m = re.search(r'^(\S+) "\$@"$', fh.read(), re.MULTILINE)
+    if not m:
+        raise Exception('%s: completion function not found' % script)
+    return m.group(1)
+
+def write_completion(directory, opts):
+    commandline = synthetic.make_commandline(depth=opts.depth, fanout=opts.fanout,
+        options=opts.options, choices=opts.choices)
+    conf = synthetic.make_config()
+    conf.set_zsh_compdef(True)
+
+    os.mkdir(directory)
+    script = os.path.join(directory, '_%s' % commandline.prog)
+    with open(script, 'w') as fh:
+        fh.write(zsh.generate_completion(commandline, None, conf))
+
+    return script, synthetic.count_commands(commandline)
+
+def run_zsh(directory, funcname):
+    '''
+    Returns the time of `compinit` and of the first completion call in microseconds.
+    '''
+    code  = 'zmodload zsh/datetime || exit 1\n'
+    code += 'fpath=(%s $fpath)\n' % shlex.quote(directory)
+    code += 'START=$EPOCHREALTIME\n'
+    code += 'autoload -Uz compinit && compinit -D -u\n'
+    code += 'END=$EPOCHREALTIME\n'
+    for stub in ZSH_STUBS:
+        code += 'functions[%s]=:\n' % stub
+    code += r'''
+words=(synthetic cmd0 '')
+CURRENT=3 PREFIX='' IPREFIX='' SUFFIX='' ISUFFIX=''
+FIRST_TAB_START=$EPOCHREALTIME
+%FUNC% &>/dev/null
+FIRST_TAB_END=$EPOCHREALTIME
+print $(( (END - START) * 1e6 )) $(( (FIRST_TAB_END - FIRST_TAB_START) * 1e6 ))
+'''.replace('%FUNC%', funcname)
+
+    output = run(['zsh', '-f', '-c', code], env=dict(os.environ, LC_ALL='C'))
+    return tuple(map(float, output.split()[:2]))
+
+def get_stats(times):
+    return {
+        'min_ms':    round(min(times) / 1000, 3),
+        'median_ms': round(statistics.median(times) / 1000, 3)
+    }
+
+def benchmark_variant(directory, funcname, opts):
+    compinit_times, first_tab_times = [], []
+
+    for i in range(opts.warmup + opts.repeat):
+        compinit_time, first_tab_time = run_zsh(directory, funcname)
+        if i >= opts.warmup:
+            compinit_times.append(compinit_time)
+            first_tab_times.append(first_tab_time)
+
+    return {
+        'compinit':  get_stats(compinit_times),
+        'first_tab': get_stats(first_tab_times),
+        'total':     get_stats([a + b for a, b in zip(compinit_times, first_tab_times)])
+    }
+
+def benchmark(opts):
+    result = {
+        'benchmark': 'zsh_compile',
+        'version':   get_version('zsh'),
+        'repeat':    opts.repeat,
+        'variants':  {}
+    }
+
+    with tempfile.TemporaryDirectory() as tempdir:
+        directory = os.path.join(tempdir, 'functions')
+        script, result['commands'] = write_completion(directory, opts)
+        funcname = get_function_name(script)
+
+        for variant in VARIANTS:
+            if variant == 'compiled':
+                compiled_file = zsh.compile_completion_file(script)
+                size = os.path.getsize(compiled_file)
+            else:
+                size = os.path.getsize(script)
+
+            stats = benchmark_variant(directory, funcname, opts)
+            stats['size_kib'] = round(size / 1024, 1)
+            result['variants'][variant] = stats
+
+            print('%-8s compinit %8.3f ms, first TAB %8.3f ms, %8.1f KiB' % (
+                variant, stats['compinit']['median_ms'], stats['first_tab']['median_ms'],
+                stats['size_kib']), file=sys.stderr)
+
+    return result
+
+def compare(baseline, current, opts):
+    regressions = find_regressions(baseline, current, ['median_ms'], opts.threshold, opts.min_delta_ms)
+
+    for path, old, new in regressions:
+        print('REGRESSION: %s: %s -> %s (%.2fx)' % (path, old, new, new / old if old else float('inf')), file=sys.stderr)
+
+    return len(regressions) == 0
+
+p = argparse.ArgumentParser('zsh_compile.py',
+    description='Compare compinit and first TAB time of a compiled and a non-compiled zsh completion')
+
+p.add_argument('--depth', type=int, default=2,
+    help='Number of subcommand levels [default: 2]')
+
+p.add_argument('--fanout', type=int, default=22,
+    help='Number of subcommands per command [default: 22, about 500 functions]')
+
+p.add_argument('--options', type=int, default=10,
+    help='Number of options per command [default: 10]')
+
+p.add_argument('--choices', type=int, default=10,
+    help='Number of items of each choices list [default: 10]')
+
+p.add_argument('-r', '--repeat', type=int, default=20,
+    help='Number of timed zsh runs per variant')
+
+p.add_argument('--warmup', type=int, default=2,
+    help='Number of untimed zsh runs per variant')
+
+p.add_argument('-o', '--output', default=None,
+    help='Write JSON results to file, e.g. to save a baseline [default: stdout]')
+
+p.add_argument('--compare', default=None, metavar='BASELINE',
+    help='Compare results against a saved baseline and exit with 1 on regressions')
+
+p.add_argument('--threshold', type=float, default=1.25,
+    help='Factor by which a value may exceed the baseline [default: 1.25]')
+
+p.add_argument('--min-delta-ms', type=float, default=1.0,
+    help='Ignore time differences smaller than this [default: 1.0]')
+
+if __name__ == '__main__':
+    opts = p.parse_args()
+
+    if not find_program('zsh'):
+        warn('zsh not found, skipping')
+        sys.exit(0)
+
+    result = benchmark(opts)
+    write_json(result, opts.output)
+
+    if opts.compare and not compare(load_json(opts.compare), result, opts):
+        sys.exit(1)
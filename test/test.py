@@ -13,6 +13,10 @@ SHELLS = ['bash', 'fish', 'zsh']
 TMUX_SESSION_NAME = 'argparse-shell-complete-test'
 TESTS_OUTFILE = 'tests.new.py'
 
+# Additional arguments for argparse-shell-complete, e.g. `./test.py --fish-fast=true`.
+# The expected results are the same for all generator options.
+GENERATOR_ARGS = sys.argv[1:]
+
 os.chdir(os.path.dirname(os.path.abspath(__file__)))
 
 def generate_completion(shell, outfile, args):
@@ -26,6 +30,10 @@ def find_test_by_number(num):
     raise Exception("No test with number %r found" % num)
 
 def write_tests_file():
+    def get_result(test, shell):
+        # Skipped tests have no result, keep their expected output
+        return test.get(shell+'_result', test[shell+'_expected'])
+
     def test_to_str(test):
         r  = "{\n"
         r += " 'number': %d,\n" % test['number']
@@ -35,13 +43,19 @@ def write_tests_file():
         r += " 'send': %r,\n" % test['send']
         if test.get('bash_tabs', 1) != 1:
             r += " 'bash_tabs': %d,\n" % test['bash_tabs']
-        r += " 'bash_expected': '''\\\n%s\\\n''',\n" % test['bash_result'].replace('\\', '\\\\')
+        if 'bash_skip' in test:
+            r += " 'bash_skip': %r,\n" % test['bash_skip']
+        r += " 'bash_expected': '''\\\n%s\\\n''',\n" % get_result(test, 'bash').replace('\\', '\\\\')
         if test.get('fish_tabs', 1) != 1:
             r += " 'fish_tabs': %d,\n" % test['fish_tabs']
-        r += " 'fish_expected': '''\\\n%s\\\n''',\n" % test['fish_result'].replace('\\', '\\\\')
+        if 'fish_skip' in test:
+            r += " 'fish_skip': %r,\n" % test['fish_skip']
+        r += " 'fish_expected': '''\\\n%s\\\n''',\n" % get_result(test, 'fish').replace('\\', '\\\\')
         if test.get('zsh_tabs', 1) != 1:
             r += " 'zsh_tabs': %d,\n" % test['zsh_tabs']
-        r += " 'zsh_expected': '''\\\n%s\\\n'''\n" % test['zsh_result'].replace('\\', '\\\\')
+        if 'zsh_skip' in test:
+            r += " 'zsh_skip': %r,\n" % test['zsh_skip']
+        r += " 'zsh_expected': '''\\\n%s\\\n'''\n" % get_result(test, 'zsh').replace('\\', '\\\\')
         r += '}'
         return r
 
@@ -80,7 +94,7 @@ def do_tests(shell, result_queue):
             try:    tmux_shell.stop()
             except: pass
             completion_file = 'out.%s' % shell
-            generate_completion(shell, completion_file, ['--zsh-compdef=False'] + test['generate-scripts'])
+            generate_completion(shell, completion_file, ['--zsh-compdef=False'] + GENERATOR_ARGS + test['generate-scripts'])
             tmux_shell.start()
             tmux.resize_window(80, 100)
             tmux_shell.set_prompt()
@@ -88,6 +102,10 @@ def do_tests(shell, result_queue):
             tmux_shell.load_completion(completion_file)
             time.sleep(0.5)
 
+        elif shell+'_skip' in test:
+            test[shell+'_skipped'] = True
+            result_queue.put(test)
+
         else:
             test[shell+'_result'] = complete(tmux, test['send'], test.get(shell+'_tabs', 1))
             result_queue.put(test)
@@ -130,6 +148,10 @@ class Tester():
             shell_result_key   = '%s_result' % shell
             shell_expected_key = '%s_expected' % shell
 
+            if '%s_skipped' % shell in result:
+                print("Test #%02d (%-4s - %s) skipped: %s" % (test['number'], shell, test['description'], test[shell+'_skip']))
+                break
+
             if shell_result_key in result:
                 test[shell_result_key] = result[shell_result_key]
 
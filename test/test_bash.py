@@ -0,0 +1,82 @@
+#!/usr/bin/python3
+
+import os
+import sys
+import shutil
+import tempfile
+import unittest
+import subprocess
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from argparse_shell_complete import bash, bash_helpers
+
+def run_bash(code, env=None):
+    return subprocess.check_output(['bash', '--norc', '-c', code], env=env, universal_newlines=True)
+
+@unittest.skipUnless(shutil.which('bash'), 'bash not installed')
+class MaxCandidatesTest(unittest.TestCase):
+    def complete(self, num_candidates, max_candidates):
+        code  = 'compopt() { COMPOPT+=("$*"); }\n'
+        code += '_complete() { COMPREPLY=(); for ((i = 1; i <= %d; ++i)); do COMPREPLY+=(c$i); done; }\n' % num_candidates
+        code += bash._get_max_candidates_function('_complete', max_candidates) + '\n'
+        code += '_complete_max_candidates\n'
+        code += 'printf "%s\\n" "${COMPREPLY[@]}" "compopt ${COMPOPT[*]}"'
+        return run_bash(code).splitlines()
+
+    def test_truncated(self):
+        self.assertEqual(self.complete(10, 4),
+            ['c1', 'c2', 'c3', 'c4', '(6 more not shown)', 'compopt -o nosort'])
+
+    def test_not_truncated(self):
+        self.assertEqual(self.complete(4, 4), ['c1', 'c2', 'c3', 'c4', 'compopt -o nosort'])
+        self.assertEqual(self.complete(2, 4), ['c1', 'c2', 'compopt -o nosort'])
+
+@unittest.skipUnless(shutil.which('bash'), 'bash not installed')
+class CachedFiledirTest(unittest.TestCase):
+    def setUp(self):
+        self.tempdir = tempfile.TemporaryDirectory()
+        self.dir = os.path.join(self.tempdir.name, 'dir')
+        os.mkdir(self.dir)
+        for file in ('a1', 'a2', 'b1'):
+            open(os.path.join(self.dir, file), 'w').close()
+
+    def tearDown(self):
+        self.tempdir.cleanup()
+
+    def complete(self, steps):
+        # Runs all steps in the same shell, so that the cache is kept between them
+        code  = 'compopt() { :; }\n'
+        code += bash_helpers._CACHED_FILEDIR.get_code() + '\n'
+        code += 'complete() { cur="$1"; COMPREPLY=(); cached_filedir "$DIR"; printf "%s\\n" "${COMPREPLY[*]}"; }\n'
+        code += '\n'.join(steps)
+
+        env = dict(os.environ, DIR=self.dir, TMPDIR=self.tempdir.name)
+        env.pop('XDG_RUNTIME_DIR', None)
+        return run_bash(code, env).splitlines()
+
+    def test_listing(self):
+        self.assertEqual(self.complete(['complete a', 'complete b', 'complete c']), ['a1 a2', 'b1', ''])
+
+    def test_cache_hit(self):
+        # Going back in time keeps the stamp newer than the directory
+        self.assertEqual(self.complete([
+            'complete a',
+            ': > "$DIR/a3"',
+            'touch -d "1 hour ago" "$DIR"',
+            'complete a']), ['a1 a2', 'a1 a2'])
+
+    def test_added_file(self):
+        self.assertEqual(self.complete([
+            'complete a',
+            ': > "$DIR/a3"',
+            'complete a']), ['a1 a2', 'a1 a2 a3'])
+
+    def test_removed_file(self):
+        self.assertEqual(self.complete([
+            'complete a',
+            'rm "$DIR/a1"',
+            'complete a']), ['a1 a2', 'a2'])
+
+if __name__ == '__main__':
+    unittest.main()
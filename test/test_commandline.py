@@ -0,0 +1,163 @@
+#!/usr/bin/python3
+
+import os
+import sys
+import json
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from argparse_shell_complete.commandline import CommandLine, shared_complete_specs
+from argparse_shell_complete import commandline as _commandline
+from argparse_shell_complete import json_source, bash, config, profiler
+
+class CompleteSpecTest(unittest.TestCase):
+    def test_spec_is_immutable(self):
+        choices = ['a', 'b']
+        commandline = CommandLine('prog')
+        option = commandline.add_option(['--opt'], complete=['choices', choices])
+        choices.append('c')
+
+        self.assertEqual(option.complete, ('choices', ('a', 'b')))
+
+        option = commandline.add_option(['--desc'], complete=('choices', {'a': 'A'}))
+        with self.assertRaises(TypeError):
+            option.complete[1]['b'] = 'B'
+
+    def test_specs_are_shared_inside_block(self):
+        commandline = CommandLine('prog')
+        with shared_complete_specs():
+            a = commandline.add_option(['-a'], complete=['choices', ['x', 'y']])
+            b = commandline.add_option(['-b'], complete=['choices', ['x', 'y']])
+            c = commandline.add_option(['-c'], complete=['choices', [1, True]])
+            d = commandline.add_option(['-d'], complete=['choices', [True, 1]])
+        e = commandline.add_option(['-e'], complete=['choices', ['x', 'y']])
+
+        self.assertIs(a.complete, b.complete)
+        self.assertIsNot(c.complete, d.complete)
+        self.assertIsNot(a.complete, e.complete)
+        self.assertIsNone(_commandline._complete_specs)
+
+    def test_json_roundtrip(self):
+        commandline = CommandLine('prog')
+        commandline.add_option(['--opt'], complete=('choices', {'a': 'A', 'b': 'B'}))
+        commandline.add_positional(1, complete=('choices', ['x', 'y']))
+
+        objects = json.loads(json.dumps(json_source.CommandLine_To_JSON(commandline)))
+        self.assertEqual(objects[0]['options'][0]['complete'], ['choices', {'a': 'A', 'b': 'B'}])
+        loaded = json_source.JSON_To_Commandline(objects)
+        self.assertEqual(json_source.CommandLine_To_JSON(loaded), objects)
+
+class CachedViewsTest(unittest.TestCase):
+    def test_views_follow_modifications(self):
+        root = CommandLine('prog')
+        root.add_option(['-a'])
+        sub = root.add_subcommands().add_commandline('sub')
+        sub.add_option(['-b'], takes_args=False)
+
+        self.assertEqual(sub.get_option_strings(with_parent_options=True), ('-a', '-b'))
+        self.assertEqual(sub.get_options(only_with_arguments=True), ())
+
+        root.add_option(['-c'])
+        sub.add_option(['-d'])
+
+        self.assertEqual(sub.get_option_strings(with_parent_options=True), ('-a', '-c', '-b', '-d'))
+        self.assertEqual(sub.get_option_strings(), ('-b', '-d'))
+        self.assertEqual(sub.get_options(only_with_arguments=True), (sub.options[1],))
+        self.assertEqual(sub.get_parents(), [root])
+
+    def test_option_index(self):
+        root = CommandLine('prog')
+        a = root.add_option(['-a', '--all'])
+        sub = root.add_subcommands().add_commandline('sub')
+
+        self.assertIs(sub.get_option_by_string('-a', with_parent_options=True), a)
+        self.assertIs(root.get_option_by_string('--all'), a)
+        index = root._cache[('option_index', False)]
+
+        # The index is updated when an option is added
+        self.assertIsNone(root.get_option_by_string('-b'))
+        b = root.add_option(['-b', '--all'])
+        self.assertIs(root.get_option_by_string('-b'), b)
+        self.assertIs(root.get_option_by_string('--all'), a)
+        self.assertIs(root._cache[('option_index', False)][1], index[1])
+
+        # Options of a parent are visible in the index of a subcommand
+        self.assertIs(sub.get_option_by_string('-b', with_parent_options=True), b)
+
+        # Mutually exclusive groups do not affect the index
+        root.add_mutually_exclusive_group('group').add_option(b)
+        self.assertIs(root._cache[('option_index', False)][1], index[1])
+
+    def test_modifying_one_tree_keeps_the_views_of_another(self):
+        tree1 = CommandLine('prog1')
+        tree1.add_option(['-a'])
+        options = tree1.get_options()
+
+        tree2 = CommandLine('prog2')
+        tree2.add_option(['-b'])
+
+        self.assertIs(tree1.get_options(), options)
+
+class CopyTest(unittest.TestCase):
+    def test_copy_does_not_share_option_strings(self):
+        root = CommandLine('prog')
+        option = root.add_option(['-a', '--all'])
+        copy = root.copy()
+
+        copy.options[0].option_strings.append('--everything')
+        self.assertEqual(option.option_strings, ['-a', '--all'])
+        self.assertEqual(copy.options[0].option_strings, ['-a', '--all', '--everything'])
+
+class ValidatedMarkTest(unittest.TestCase):
+    def make_commandline(self):
+        root = CommandLine('prog')
+        root.add_mutually_exclusive_group('group').add(['-a'], takes_args=False)
+        sub = root.add_subcommands().add_commandline('sub')
+        sub.add_option(['--opt'], complete=('choices', ['x', 'y']))
+        root.set_validated()
+        return root, sub
+
+    def test_modification_drops_mark(self):
+        root, sub = self.make_commandline()
+        self.assertTrue(root.is_validated())
+
+        sub.add_option(['--new'])
+        self.assertFalse(root.is_validated())
+
+        root.set_validated()
+        root.add_mutually_exclusive_group('group').add(['-b'], takes_args=False)
+        self.assertFalse(root.is_validated())
+
+    def test_copy_keeps_mark(self):
+        root, sub = self.make_commandline()
+        other = CommandLine('other')
+        other.set_validated()
+
+        copy = root.copy()
+        self.assertTrue(copy.is_validated())
+        self.assertTrue(root.is_validated())
+        self.assertTrue(other.is_validated())
+
+        copy.get_subcommands_option().subcommands[0].add_option(['--new'])
+        self.assertFalse(copy.is_validated())
+        self.assertTrue(root.is_validated())
+
+    def test_cached_model_stays_trusted(self):
+        root, sub = self.make_commandline()
+        conf = config.Config()
+        conf.set_trust_validated(True)
+
+        for generation in range(2):
+            profiler.enable()
+            try:
+                bash.generate_completion(root, None, conf)
+                tree = profiler.format_tree()
+            finally:
+                profiler.disable()
+
+            self.assertNotIn('validate', tree)
+            self.assertTrue(root.is_validated())
+
+if __name__ == '__main__':
+    unittest.main()
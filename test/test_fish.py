@@ -0,0 +1,473 @@
+#!/usr/bin/python3
+
+import os
+import re
+import sys
+import shlex
+import shutil
+import functools
+import random
+import tempfile
+import unittest
+import subprocess
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from argparse_shell_complete.fish_utils import quote
+from argparse_shell_complete.fish import FishCompleter
+from argparse_shell_complete.fish_helpers import _FISH_VALUE_LIST
+
+import tests
+
+TEST_DIR = os.path.dirname(os.path.abspath(__file__))
+PROGRAM = os.path.join(TEST_DIR, '..', 'argparse-shell-complete')
+
+# Words of the conditions that are not arguments
+FISH_WORDS = set(['$helper', 'parse', 'contains', 'not', 'begin', 'or', 'end', 'test', 'count'])
+
+def generate_fish(args):
+    env = dict(os.environ, PYTHONHASHSEED='0')
+    env.pop('ARGPARSE_SHELL_COMPLETE_SERVER', None)
+    return subprocess.check_output([sys.executable, PROGRAM, '--allow-python'] + args +
+        ['fish', 'argparse-shell-complete-test'], cwd=TEST_DIR, env=env, universal_newlines=True)
+
+def get_conditions(script):
+    '''
+    Returns the condition of every `complete` command, in order.
+    '''
+    guards = dict(re.findall(r'^set -l (guard\d+) "(.*)"$', script, re.MULTILINE))
+    conditions = []
+    for line in script.split('\n'):
+        m = re.match(r'complete -c \$prog -n \$(guard\d+) ', line)
+        if m:
+            conditions.append(guards[m.group(1)].replace('\\$', '$'))
+    return conditions
+
+class ParseState:
+    '''
+    The parsed command line, as stored by the fish helper.
+    '''
+
+    def __init__(self, positionals, options):
+        self.positionals = positionals
+        self.having_options = [option for option, value in options]
+        self.option_values = [value for option, value in options]
+        self.option_pairs = ['%s=%s' % pair for pair in options]
+
+    def expand(self, word):
+        # Expands the cache variables like fish does
+        if word == '$__CACHE_HAVING_OPTIONS':
+            return self.having_options
+        if word == '$__CACHE_OPTION_PAIRS':
+            return self.option_pairs
+        m = re.fullmatch(r'\$__CACHE_POSITIONALS\[(\d+)\]', word)
+        if m:
+            return self.get_positional(int(m.group(1)))
+        return [word]
+
+    def get_positional(self, num):
+        # An index that is out of range expands to nothing
+        return self.positionals[num - 1:num]
+
+def compare(count, operator, value):
+    return {
+        '-lt': count <  value,
+        '-le': count <= value,
+        '-eq': count == value,
+        '-ne': count != value,
+        '-gt': count >  value,
+        '-ge': count >= value,
+    }[operator]
+
+def contains(words):
+    return len(words) > 0 and words[0] in words[1:]
+
+def run_helper(state, command, args):
+    # Mirrors the commands of the fish helper (see fish_helpers.py)
+    if command == 'parse':
+        return True
+    if command == 'positional_contains':
+        return contains(state.get_positional(int(args[0])) + args[1:])
+    if command == 'has_option':
+        return any(option in args for option in state.having_options)
+    if command == 'num_of_positionals':
+        return compare(len(state.positionals), args[0], int(args[1]))
+    if command == 'option_is':
+        separator = args.index('--')
+        options, values = args[:separator], args[separator + 1:]
+        return any(option in options and value in values
+                   for option, value in zip(state.having_options, state.option_values))
+    raise Exception('Unknown helper command: %r' % command)
+
+def run_command(state, words):
+    if words[0] == '$helper':
+        return run_helper(state, words[2], words[3:])
+
+    if words[0] == 'contains' and words[1] == '--':
+        expanded = []
+        for word in words[2:]:
+            expanded.extend(state.expand(word))
+        return contains(expanded)
+
+    if words[0] == 'test' and len(words) == 4:
+        count = len(state.positionals) if words[1] == '$__COUNT_POSITIONALS' else int(words[1])
+        return compare(count, words[2], int(words[3]))
+
+    raise Exception('Unknown command: %r' % words)
+
+@functools.lru_cache(maxsize=None)
+def parse_condition(condition):
+    # Returns a list of (negate, commands) tuples, one for each term
+    terms = []
+    for term in condition.split(' && '):
+        negate = term.startswith('not ')
+        if negate:
+            term = term[4:]
+
+        if term.startswith('begin; ') and term.endswith('; end'):
+            commands = term[7:-5].split('; or ')
+        else:
+            commands = [term]
+
+        commands = [shlex.split(command.replace('(count $__CACHE_POSITIONALS)', '$__COUNT_POSITIONALS'))
+                    for command in commands]
+        terms.append((negate, commands))
+    return terms
+
+def evaluate(state, condition):
+    result = True
+    for negate, commands in parse_condition(condition):
+        value = any(run_command(state, words) for words in commands)
+        result = result and (value != negate)
+    return result
+
+def complete_in_fish(script, commandlines):
+    # `complete -C` evaluates the conditions like completing the command line does
+    with tempfile.TemporaryDirectory() as tempdir:
+        file = os.path.join(tempdir, 'argparse-shell-complete-test.fish')
+        with open(file, 'w') as fh:
+            fh.write(script)
+
+        code = 'source %s' % quote(file)
+        for commandline in commandlines:
+            code += '\necho %s\ncomplete -C %s' % (quote('### ' + commandline), quote(commandline))
+
+        return subprocess.check_output(['fish', '--no-config', '-c', code], cwd=TEST_DIR, universal_newlines=True)
+
+class FastConditionsTest(unittest.TestCase):
+    def test_fast_conditions_match_helper_conditions(self):
+        helper_conditions = get_conditions(generate_fish([]))
+        fast_conditions = get_conditions(generate_fish(['--fish-fast=true']))
+        self.assertEqual(len(helper_conditions), len(fast_conditions))
+        self.assertGreater(len(helper_conditions), 0)
+
+        # The words used by the conditions, plus some that are not used
+        words, options, values = set(['other']), set(['--other']), set(['', 'other'])
+        for condition in fast_conditions:
+            for word in shlex.split(condition.replace(';', ' ')):
+                if word.startswith('-') and '=' in word:
+                    option, value = word.split('=', 1)
+                    options.add(option)
+                    values.add(value)
+                elif word.startswith('-') and len(word) > 1 and word != '--':
+                    options.add(word)
+                elif re.fullmatch(r'[\w.-]+', word) and word not in FISH_WORDS:
+                    words.add(word)
+
+        words, options, values = sorted(words), sorted(options), sorted(values)
+        rand = random.Random(0)
+
+        for i in range(400):
+            positionals = [rand.choice(words) for j in range(rand.randint(0, 4))]
+            state_options = [(rand.choice(options), rand.choice(values)) for j in range(rand.randint(0, 3))]
+            state = ParseState(positionals, state_options)
+
+            for helper_condition, fast_condition in zip(helper_conditions, fast_conditions):
+                self.assertEqual(
+                    evaluate(state, helper_condition), evaluate(state, fast_condition),
+                    'positionals=%r options=%r\n%s\n%s' % (positionals, state_options, helper_condition, fast_condition))
+
+    @unittest.skipUnless(shutil.which('fish'), 'fish not installed')
+    def test_fast_conditions_in_fish(self):
+        commandlines = []
+        for test in tests.tests:
+            if 'send' in test and test['send'] not in commandlines:
+                commandlines.append(test['send'])
+
+        helper_output = complete_in_fish(generate_fish([]), commandlines)
+        fast_output = complete_in_fish(generate_fish(['--fish-fast=true']), commandlines)
+        self.assertIn('--exclusive-flag', helper_output)
+        self.assertEqual(helper_output, fast_output)
+
+# Characters that have a special meaning outside of quotes
+FISH_SPECIAL = set(' \t\n$()*?{}[]~#;&|<>"\'\\')
+
+FISH_ESCAPES = {'a': '\a', 'b': '\b', 'e': '\x1b', 'f': '\f', 'n': '\n', 'r': '\r', 't': '\t', 'v': '\v'}
+
+def fish_split(string):
+    '''
+    Splits `string` into words and removes the quoting like fish does.
+
+    Only the quoting rules are implemented. Expansions (variables, command
+    substitutions, wildcards) are not, so an unescaped special character
+    raises an exception.
+    '''
+    words = []
+    word = None
+    i = 0
+
+    while i < len(string):
+        c = string[i]
+
+        if c in ' \n':
+            if word is not None:
+                words.append(word)
+                word = None
+            i += 1
+            continue
+
+        word = word or ''
+
+        if c == "'":
+            i += 1
+            while string[i] != "'":
+                if string[i] == '\\' and string[i + 1] in "'\\":
+                    i += 1
+                word += string[i]
+                i += 1
+        elif c == '"':
+            i += 1
+            while string[i] != '"':
+                if string[i] == '$':
+                    raise Exception('Expansion in %r' % string)
+                if string[i] == '\\' and string[i + 1] in '"$\\':
+                    i += 1
+                word += string[i]
+                i += 1
+        elif c == '\\':
+            i += 1
+            word += FISH_ESCAPES.get(string[i], string[i])
+            if string[i] in 'xXuUc01234567':
+                raise Exception('Unsupported escape in %r' % string)
+        elif c in FISH_SPECIAL:
+            raise Exception('Unquoted %r in %r' % (c, string))
+        else:
+            word += c
+
+        i += 1
+
+    if word is not None:
+        words.append(word)
+
+    return words
+
+STRINGS = [
+    'simple', '', 'with space', 'tab\there', 'dollar $HOME', '$(cmd)', '(cmd)',
+    "single'quote", 'double"quote', 'both\'"quotes', 'back\\slash', 'trailing\\',
+    "\\'", '\\"', 'glob*?', '{brace}', '~home', '#comment', 'semi;colon', 'a|b&c',
+    'new\nline', 'mixed $\'"\\(\t',
+]
+
+class QuoteTest(unittest.TestCase):
+    def test_quote(self):
+        for string in STRINGS:
+            self.assertEqual(fish_split(quote(string)), [string], 'quote(%r) = %r' % (string, quote(string)))
+
+    def test_static_choices(self):
+        # The `-a` argument is unquoted once by `complete` and then split
+        # into words that are unquoted again
+        choices = {string: 'Description of %s' % string for string in STRINGS}
+        choices = {item: description for item, description in choices.items()
+                   if '\t' not in item and '\n' not in item}
+
+        argument = FishCompleter()._get_static_choices(choices)
+        self.assertIsNotNone(argument)
+
+        words = fish_split(argument.escape())
+        self.assertEqual(len(words), 1)
+
+        expected = ['%s\t%s' % (item, description) for item, description in choices.items()]
+        self.assertEqual(fish_split(words[0]), expected)
+
+    def test_static_choices_with_tabs(self):
+        self.assertIsNone(FishCompleter()._get_static_choices({'a\tb': 'desc'}))
+        self.assertIsNone(FishCompleter()._get_static_choices({'a': 'new\nline'}))
+
+class FishFunctionModel:
+    """
+    Runs the body of a fish helper function in Python.
+
+    Only the commands and expansions used by the helpers are implemented.
+    Like fish, a word made of several parts expands to the cartesian
+    product of the parts, so an empty list makes the whole word empty.
+    """
+
+    def __init__(self, token):
+        self.token = token
+        self.variables = {}
+
+    def run(self, code, args):
+        self.variables = {'argv': list(args)}
+        output = []
+        skipping = []
+
+        for line in code.split('\n'):
+            line = line.strip()
+            if not line or line.startswith('#'):
+                continue
+
+            if line == 'end':
+                skipping.pop()
+            elif line.startswith('if '):
+                skip = any(skipping) or not self.run_command(self.split(line[3:]), [])
+                skipping.append(skip)
+            elif not any(skipping):
+                self.run_command(self.split(line), output)
+
+        return output
+
+    def split(self, line):
+        # Returns the expanded arguments of a command line
+        words, parts, i = [], [], 0
+
+        while i < len(line):
+            c = line[i]
+            if c == ' ':
+                if parts:
+                    words.extend(self.combine(parts))
+                    parts = []
+            elif c == "'":
+                end = line.index("'", i + 1)
+                parts.append([line[i + 1:end]])
+                i = end
+            elif c == '"':
+                end = line.index('"', i + 1)
+                text = re.sub(r'\$(\w+)', lambda m: ' '.join(self.variables.get(m.group(1), [])), line[i + 1:end])
+                parts.append([text])
+                i = end
+            elif c == '$':
+                m = re.compile(r'\$(\w+)(?:\[(-?\d+)(?:\.\.(-?\d+))?\])?').match(line, i)
+                parts.append(self.get_variable(*m.groups()))
+                i = m.end() - 1
+            elif c == '(':
+                end = self.find_closing_paren(line, i)
+                output = []
+                self.run_pipeline(line[i + 1:end], output)
+                parts.append(output)
+                i = end
+            else:
+                parts.append([c])
+            i += 1
+
+        if parts:
+            words.extend(self.combine(parts))
+        return words
+
+    def combine(self, parts):
+        result = ['']
+        for part in parts:
+            result = [a + b for a in result for b in part]
+        return result
+
+    def find_closing_paren(self, line, i):
+        depth, quote = 0, None
+        for j in range(i, len(line)):
+            if quote:
+                if line[j] == quote:
+                    quote = None
+            elif line[j] in '\'"':
+                quote = line[j]
+            elif line[j] == '(':
+                depth += 1
+            elif line[j] == ')':
+                depth -= 1
+                if depth == 0:
+                    return j
+        raise Exception('Unbalanced parentheses in %r' % line)
+
+    def get_variable(self, name, start, stop):
+        values = self.variables.get(name, [])
+        if start is None:
+            return values
+
+        def index(i):
+            i = int(i)
+            return i if i > 0 else len(values) + 1 + i
+
+        start = index(start)
+        stop = index(stop) if stop is not None else start
+        if not 1 <= start <= stop <= len(values):
+            raise Exception('Unsupported index %s..%s of %r' % (start, stop, values))
+        return values[start - 1:stop]
+
+    def run_pipeline(self, commandline, output):
+        input_lines = None
+        for command in commandline.split(' | '):
+            lines = []
+            args = self.split(command)
+            if input_lines is not None:
+                args += input_lines
+            self.run_command(args, lines)
+            input_lines = lines
+        output.extend(input_lines)
+
+    def run_command(self, args, output):
+        # Returns the exit status as a bool
+        if args[0] == 'commandline' and args[1:] == ['-ct']:
+            output.append(self.token)
+        elif args[0] == 'set' and args[1] == '-q':
+            m = re.fullmatch(r'(\w+)\[(\d+)\]', args[2])
+            return len(self.variables.get(m.group(1), [])) >= int(m.group(2))
+        elif args[0] == 'set' and args[1] == '-e':
+            m = re.fullmatch(r'(\w+)\[(\d+)\]', args[2])
+            del self.variables[m.group(1)][int(m.group(2)) - 1]
+        elif args[0] == 'set':
+            args = args[2:] if args[1] == '-l' else args[1:]
+            self.variables[args[0]] = args[1:]
+        elif args[0] == 'printf':
+            for value in args[2:] or ['']:
+                output.extend((args[1].replace('\\n', '\n') % value).split('\n')[:-1])
+        elif args[:2] == ['string', 'split'] and args[2] == '--':
+            output.extend(args[4].split(args[3]))
+        elif args[:2] == ['string', 'join'] and args[2] == '--':
+            if len(args) > 4:
+                output.append(args[3].join(args[4:]))
+        elif args[:3] == ['string', 'escape', '--style=regex'] and args[3] == '--':
+            output.extend(re.escape(arg) for arg in args[4:])
+        elif args[:3] == ['string', 'match', '-rv'] and args[3] == '--':
+            output.extend(arg for arg in args[5:] if not re.search(args[4], arg))
+        elif args[:3] == ['string', 'replace', '-r'] and args[3] == '--':
+            output.extend(re.sub(args[4], args[5], arg, count=1) for arg in args[6:])
+        else:
+            raise Exception('Unknown command: %r' % args)
+        return True
+
+VALUES = ['a', 'b', 'bar', 'x.y']
+
+VALUE_LIST_CASES = [
+    ('',            ['a', 'b', 'bar', 'x.y']),
+    ('b',           ['a', 'b', 'bar', 'x.y']),
+    ('a,',          ['a,b', 'a,bar', 'a,x.y']),
+    ('a,b',         ['a,b', 'a,bar', 'a,x.y']),
+    ('b,a,',        ['b,a,bar', 'b,a,x.y']),
+    ('--opt=a,',    ['a,b', 'a,bar', 'a,x.y']),
+    ('xzy,',        ['xzy,a', 'xzy,b', 'xzy,bar', 'xzy,x.y']),
+]
+
+class ValueListTest(unittest.TestCase):
+    def test_value_list(self):
+        for token, expected in VALUE_LIST_CASES:
+            model = FishFunctionModel(token)
+            self.assertEqual(model.run(_FISH_VALUE_LIST.code, [','] + VALUES), expected, 'token=%r' % token)
+
+    @unittest.skipUnless(shutil.which('fish'), 'fish not installed')
+    def test_value_list_in_fish(self):
+        # `commandline` only works while completing, so the token is passed in a variable
+        code = _FISH_VALUE_LIST.get_code('value_list').replace('commandline -ct', 'printf %s\\n $TOKEN')
+        for token, expected in VALUE_LIST_CASES:
+            script = '%s\nset TOKEN %s\nvalue_list , %s' % (code, quote(token), ' '.join(map(quote, VALUES)))
+            output = subprocess.check_output(['fish', '--no-config', '-c', script], universal_newlines=True)
+            self.assertEqual(output.split('\n')[:-1], expected, 'token=%r' % token)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,184 @@
+#!/usr/bin/python3
+
+import io
+import os
+import sys
+import json
+import yaml
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from argparse_shell_complete.commandline import CommandLine
+from argparse_shell_complete.completion_validator import FingerprintReader
+from argparse_shell_complete import json_source, yaml_source
+
+def make_commandline():
+    commandline = CommandLine('prog', help='A "program" with {braces} and [brackets]')
+    commandline.add_option(['--opt'], help='Option ending with "}]"', complete=('choices', ['a"}', '\\]']))
+    subcommands = commandline.add_subcommands()
+    for i in range(3):
+        sub = subcommands.add_commandline('sub%d' % i, help='Subcommand ä %d' % i)
+        sub.add_option(['--sub-opt%d' % i], help='x' * 50)
+    commandline.set_validated()
+    return commandline
+
+class CountingReader(io.StringIO):
+    def __init__(self, data):
+        super().__init__(data)
+        self.reads_after_eof = 0
+        self.eof = False
+
+    def read(self, size=-1):
+        data = super().read(size)
+        if self.eof:
+            self.reads_after_eof += 1
+        if not data:
+            self.eof = True
+        return data
+
+class ChunkReader():
+    '''
+    Returns the chunks one by one, never more than one chunk per read.
+    '''
+
+    def __init__(self, chunks):
+        self.chunks = list(chunks)
+
+    def read(self, size=-1):
+        if not self.chunks:
+            return ''
+        chunk = self.chunks.pop(0)
+        if size >= 0 and len(chunk) > size:
+            self.chunks.insert(0, chunk[size:])
+            chunk = chunk[:size]
+        return chunk
+
+def split_every(data, length):
+    return [data[i:i + length] for i in range(0, len(data), length)]
+
+class IterJSONArrayTest(unittest.TestCase):
+    def setUp(self):
+        self.data = json.dumps(json_source.CommandLine_To_JSON(make_commandline()), indent=1)
+        self.objects = json.loads(self.data)
+
+    def test_chunk_boundaries(self):
+        # Every position of the data, including positions inside strings
+        # and escape sequences, becomes a chunk boundary
+        for chunk_size in range(1, 40):
+            objects = list(json_source.iter_JSON_Array(io.StringIO(self.data), chunk_size))
+            self.assertEqual(objects, self.objects, 'chunk_size=%d' % chunk_size)
+
+    def test_empty_array(self):
+        self.assertEqual(list(json_source.iter_JSON_Array(io.StringIO(' [ ] \n'), 1)), [])
+
+    def test_truncated_file(self):
+        for length in range(len(self.data)):
+            with self.assertRaises(ValueError, msg='length=%d' % length):
+                list(json_source.iter_JSON_Array(io.StringIO(self.data[:length]), 16))
+
+    def test_extra_data(self):
+        with self.assertRaises(ValueError):
+            list(json_source.iter_JSON_Array(io.StringIO(self.data + ' []'), 16))
+
+class FingerprintReaderTest(unittest.TestCase):
+    def setUp(self):
+        chunks = json_source.CommandLine_To_JSON_Chunks(make_commandline(), fingerprint=True)
+        self.data = ''.join(chunks)
+
+    def read(self, data, chunk_size):
+        fh = CountingReader(data)
+        reader = FingerprintReader(fh, json_source._FINGERPRINT_REGEX, '}]')
+        objects = list(json_source.iter_JSON_Array(reader, chunk_size))
+        return objects, reader.has_valid_fingerprint(), fh
+
+    def test_chunk_boundaries(self):
+        # Chunk sizes around TAIL_SIZE put the boundaries inside the tail
+        tail_size = FingerprintReader.TAIL_SIZE
+        for chunk_size in list(range(1, 20)) + list(range(tail_size - 20, tail_size + 20)) + [len(self.data)]:
+            objects, valid, fh = self.read(self.data, chunk_size)
+            self.assertEqual(objects, json.loads(self.data), 'chunk_size=%d' % chunk_size)
+            self.assertTrue(valid, 'chunk_size=%d' % chunk_size)
+            self.assertEqual(fh.reads_after_eof, 0)
+
+    def test_modified_content(self):
+        data = self.data.replace('Subcommand', 'Subcommamd', 1)
+        for chunk_size in (1, 7, 100, 65536):
+            objects, valid, fh = self.read(data, chunk_size)
+            self.assertFalse(valid, 'chunk_size=%d' % chunk_size)
+
+    def test_truncated_fingerprint(self):
+        reader = FingerprintReader(io.StringIO(self.data[:-3]), json_source._FINGERPRINT_REGEX, '}]')
+        self.assertFalse(reader.has_valid_fingerprint())
+
+    def test_no_fingerprint(self):
+        data = ''.join(json_source.CommandLine_To_JSON_Chunks(make_commandline()))
+        objects, valid, fh = self.read(data, 10)
+        self.assertFalse(valid)
+
+    def test_yaml(self):
+        data = ''.join(yaml_source.CommandLine_To_YAML_Chunks(make_commandline(), fingerprint=True))
+        self.assertTrue(yaml_source.has_valid_fingerprint(data))
+        self.assertFalse(yaml_source.has_valid_fingerprint(data.replace('sub1', 'sub9')))
+
+class RoundTripTest(unittest.TestCase):
+    def setUp(self):
+        self.commandline = make_commandline()
+        self.json = ''.join(json_source.CommandLine_To_JSON_Chunks(self.commandline, fingerprint=True))
+        self.yaml = ''.join(yaml_source.CommandLine_To_YAML_Chunks(self.commandline, fingerprint=True))
+
+    def load_json(self, fh, chunk_size):
+        # Same as json_source.load_from_file()
+        reader = FingerprintReader(fh, json_source._FINGERPRINT_REGEX, '}]')
+        commandline = json_source.JSON_To_Commandline(json_source.iter_JSON_Array(reader, chunk_size))
+        self.assertTrue(reader.has_valid_fingerprint())
+        return commandline
+
+    def load_yaml(self, fh):
+        # Same as yaml_source.load_from_file()
+        reader = FingerprintReader(fh, yaml_source._FINGERPRINT_REGEX)
+        commandline = json_source.JSON_To_Commandline(yaml.load_all(reader, Loader=yaml_source._SafeLoader))
+        self.assertTrue(reader.has_valid_fingerprint())
+        return commandline
+
+    def assertExportsEqual(self, commandline, msg=None):
+        self.assertEqual(''.join(json_source.CommandLine_To_JSON_Chunks(commandline, fingerprint=True)), self.json, msg)
+        self.assertEqual(''.join(yaml_source.CommandLine_To_YAML_Chunks(commandline, fingerprint=True)), self.yaml, msg)
+
+    def test_chunks_equal_unstreamed_output(self):
+        self.assertEqual(''.join(json_source.CommandLine_To_JSON_Chunks(self.commandline)),
+            json.dumps(json_source.CommandLine_To_JSON(self.commandline)))
+
+    def test_json(self):
+        for chunk_size in range(1, 40):
+            commandline = self.load_json(io.StringIO(self.json), chunk_size)
+            self.assertExportsEqual(commandline, 'chunk_size=%d' % chunk_size)
+
+    def test_json_export_chunks(self):
+        # The reads end exactly where the exported chunks end
+        chunks = json_source.CommandLine_To_JSON_Chunks(self.commandline, fingerprint=True)
+        self.assertExportsEqual(self.load_json(ChunkReader(chunks), 65536))
+
+    def test_yaml(self):
+        for read_size in list(range(1, 20)) + [len(self.yaml)]:
+            commandline = self.load_yaml(ChunkReader(split_every(self.yaml, read_size)))
+            self.assertExportsEqual(commandline, 'read_size=%d' % read_size)
+
+    def test_yaml_export_chunks(self):
+        chunks = yaml_source.CommandLine_To_YAML_Chunks(self.commandline, fingerprint=True)
+        self.assertExportsEqual(self.load_yaml(ChunkReader(chunks)))
+
+    def test_load_from_file(self):
+        with tempfile.TemporaryDirectory() as tempdir:
+            for source, data in ((json_source, self.json), (yaml_source, self.yaml)):
+                file = os.path.join(tempdir, 'commandline')
+                with open(file, 'w') as fh:
+                    fh.write(data)
+
+                commandline = source.load_from_file(file)
+                self.assertTrue(commandline.is_validated())
+                self.assertExportsEqual(commandline)
+
+if __name__ == '__main__':
+    unittest.main()
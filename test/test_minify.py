@@ -0,0 +1,110 @@
+#!/usr/bin/python3
+
+import os
+import sys
+import shutil
+import unittest
+import subprocess
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from argparse_shell_complete.minify import minify
+
+HEREDOC = '''\
+f() {
+  cat <<EOF
+  # not a comment
+    indented 'quote
+EOF
+  cat <<-'END'
+	  # tab stripped
+	END
+  echo   after
+}
+f
+'''
+
+ANSI_C = '''\
+if true; then
+  # comment
+  echo $'it\\'s' "a  # b"
+  echo $'line
+  # kept
+'
+fi
+'''
+
+COMMENT_IN_CONDITION = '''\
+f() {
+  [[ $1 == #* ]] && echo 'x
+  # kept'
+}
+'''
+
+class MinifyTest(unittest.TestCase):
+    def test_comments_and_indentation(self):
+        code = '  # comment\n\n  echo a # trailing\n\tif true; then\n    echo b\n  fi\n'
+        self.assertEqual(minify(code, 'bash'), 'echo a # trailing\nif true; then\necho b\nfi')
+
+    def test_multiline_strings(self):
+        code = "echo 'a\n  # kept\n'\n  echo \"b\n  \\\"  # kept\n\"\n"
+        self.assertEqual(minify(code, 'bash'), "echo 'a\n  # kept\n'\necho \"b\n  \\\"  # kept\n\"")
+
+    def test_line_continuation(self):
+        code = 'echo a \\\n  # not a comment\n  b\n'
+        self.assertEqual(minify(code, 'bash'), 'echo a \\\n# not a comment\nb')
+
+    def test_heredoc(self):
+        self.assertEqual(minify(HEREDOC, 'bash'), '''\
+f() {
+cat <<EOF
+  # not a comment
+    indented 'quote
+EOF
+cat <<-'END'
+	  # tab stripped
+	END
+echo   after
+}
+f''')
+
+    def test_unterminated_heredoc(self):
+        code = '  x=$(( 1 << 2 ))\n  echo $x\n'
+        self.assertEqual(minify(code, 'bash'), code)
+
+    def test_herestring(self):
+        self.assertEqual(minify('  read x <<< "a b"\n  echo $x\n', 'bash'), 'read x <<< "a b"\necho $x')
+
+    def test_ansi_c_quoting(self):
+        self.assertEqual(minify(ANSI_C, 'bash'), '''\
+if true; then
+echo $'it\\'s' "a  # b"
+echo $'line
+  # kept
+'
+fi''')
+
+    def test_fish_quoting(self):
+        # fish allows \\' inside single quotes, but has no $'' strings
+        code = "  echo 'it\\'s\n  # kept'\n  # comment\n  echo a\\'b\n"
+        self.assertEqual(minify(code, 'fish'), "echo 'it\\'s\n  # kept'\necho a\\'b")
+        self.assertEqual(minify("  echo $'\n  # kept'\n", 'fish'), "echo $'\n  # kept'")
+
+    def test_comment_followed_by_quotes(self):
+        # `#` may or may not start a comment, so the quoting is unknown
+        self.assertEqual(minify(COMMENT_IN_CONDITION, 'zsh'), COMMENT_IN_CONDITION)
+        self.assertEqual(minify("  echo a #b 'c'\n", 'bash'), "  echo a #b 'c'\n")
+
+    def test_unterminated_quote(self):
+        code = "  echo 'a\n  b\n"
+        self.assertEqual(minify(code, 'bash'), code)
+
+    @unittest.skipUnless(shutil.which('bash'), 'bash not installed')
+    def test_same_output_in_bash(self):
+        for code in (HEREDOC, ANSI_C):
+            original = subprocess.check_output(['bash', '-c', code], universal_newlines=True)
+            minified = subprocess.check_output(['bash', '-c', minify(code, 'bash')], universal_newlines=True)
+            self.assertEqual(original, minified)
+
+if __name__ == '__main__':
+    unittest.main()
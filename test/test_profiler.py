@@ -0,0 +1,73 @@
+#!/usr/bin/python3
+
+import os
+import sys
+import json
+import tempfile
+import unittest
+import subprocess
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from argparse_shell_complete import profiler
+
+TEST_DIR = os.path.dirname(os.path.abspath(__file__))
+PROGRAM = os.path.join(TEST_DIR, '..', 'argparse-shell-complete')
+
+def run_program(args):
+    env = dict(os.environ, PYTHONHASHSEED='0')
+    env.pop('ARGPARSE_SHELL_COMPLETE_SERVER', None)
+    return subprocess.run([sys.executable, PROGRAM, '--allow-python'] + args, cwd=TEST_DIR, env=env,
+        stdout=subprocess.PIPE, stderr=subprocess.PIPE, universal_newlines=True)
+
+class SpanTest(unittest.TestCase):
+    def tearDown(self):
+        profiler.disable()
+
+    def test_disabled(self):
+        with profiler.span('a') as span:
+            self.assertNotIsInstance(span, profiler.Span)
+        self.assertFalse(profiler.is_enabled())
+
+    def test_tree(self):
+        profiler.enable()
+        with profiler.span('a'):
+            with profiler.span('b'):
+                pass
+        with profiler.span('c'):
+            pass
+
+        names = [line.split()[-1] for line in profiler.format_tree().split('\n')]
+        self.assertEqual(names, ['total', 'a', 'b', 'c'])
+
+        events = profiler.get_chrome_trace()['traceEvents']
+        self.assertEqual([event['name'] for event in events], ['total', 'a', 'b', 'c'])
+        for event in events:
+            self.assertGreaterEqual(event['ts'], 0)
+            self.assertGreaterEqual(event['dur'], 0)
+
+class ProfileOptionTest(unittest.TestCase):
+    def test_same_output(self):
+        for shell in ('bash', 'fish', 'zsh', 'json', 'yaml'):
+            args = [shell, 'argparse-shell-complete-test']
+            result = run_program(args)
+            profiled = run_program(['--profile'] + args)
+            self.assertEqual(result.returncode, 0, result.stderr)
+            self.assertEqual(profiled.returncode, 0, profiled.stderr)
+            self.assertEqual(profiled.stdout, result.stdout, shell)
+            self.assertIn(' total', profiled.stderr)
+
+    def test_trace(self):
+        with tempfile.TemporaryDirectory() as tempdir:
+            trace = os.path.join(tempdir, 'trace.json')
+            result = run_program(['--profile-trace', trace, 'bash', 'argparse-shell-complete-test'])
+            self.assertEqual(result.returncode, 0, result.stderr)
+
+            with open(trace) as fh:
+                names = [event['name'] for event in json.load(fh)['traceEvents']]
+
+        for name in ('total', 'import', 'load python', 'validate', 'generate_completion', 'write output'):
+            self.assertIn(name, names)
+
+if __name__ == '__main__':
+    unittest.main()
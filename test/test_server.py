@@ -0,0 +1,100 @@
+#!/usr/bin/python3
+
+import os
+import sys
+import time
+import tempfile
+import unittest
+import subprocess
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from argparse_shell_complete import server
+
+TEST_DIR = os.path.dirname(os.path.abspath(__file__))
+PROGRAM = os.path.join(TEST_DIR, '..', 'argparse-shell-complete')
+
+# The fish generator orders some flags by their hash
+ENV = dict(os.environ, PYTHONHASHSEED='0')
+ENV.pop(server.SOCKET_ENVIRONMENT_VARIABLE, None)
+
+class ServerTest(unittest.TestCase):
+    def setUp(self):
+        self.tempdir = tempfile.TemporaryDirectory()
+        self.socket = os.path.join(self.tempdir.name, 'server.sock')
+        self.server = subprocess.Popen([sys.executable, PROGRAM, 'serve', '--socket', self.socket],
+            env=ENV, stderr=subprocess.DEVNULL)
+
+        deadline = time.monotonic() + 10
+        while not server._is_running(self.socket):
+            if time.monotonic() > deadline or self.server.poll() is not None:
+                self.fail('Server did not start')
+            time.sleep(0.05)
+
+    def tearDown(self):
+        self.server.terminate()
+        self.server.wait()
+        self.tempdir.cleanup()
+
+    def run_program(self, args, use_server):
+        env = dict(ENV)
+        if use_server:
+            env[server.SOCKET_ENVIRONMENT_VARIABLE] = self.socket
+
+        return subprocess.run([sys.executable, PROGRAM] + args, cwd=TEST_DIR, env=env,
+            stdout=subprocess.PIPE, stderr=subprocess.PIPE, universal_newlines=True)
+
+    def test_same_output_as_direct_run(self):
+        for shell in ('bash', 'fish', 'zsh'):
+            args = ['--allow-python', '--fish-fast=true', shell, 'argparse-shell-complete-test']
+            direct = self.run_program(args, False)
+            # The second request uses the cached model
+            for i in range(2):
+                forwarded = self.run_program(args, True)
+                self.assertEqual(forwarded.returncode, direct.returncode)
+                self.assertEqual(forwarded.stdout, direct.stdout)
+
+    def test_relative_output_file(self):
+        output = os.path.join(self.tempdir.name, 'completion.bash')
+        relative_output = os.path.relpath(output, TEST_DIR)
+        result = self.run_program(['--allow-python', '-o', relative_output, 'bash', 'argparse-shell-complete-test'], True)
+        self.assertEqual(result.returncode, 0)
+        self.assertTrue(os.path.exists(output))
+
+    def test_edited_local_module(self):
+        # The program imports its option names from a local module
+        directory = os.path.join(self.tempdir.name, 'program')
+        os.mkdir(directory)
+        with open(os.path.join(directory, 'program_options.py'), 'w') as fh:
+            fh.write("OPTION = '--first-option'\n")
+        with open(os.path.join(directory, 'program.py'), 'w') as fh:
+            fh.write('import argparse\n'
+                     'from program_options import OPTION\n'
+                     "argp = argparse.ArgumentParser(prog='program')\n"
+                     'argp.add_argument(OPTION)\n')
+
+        args = ['--allow-python', 'bash', os.path.join(directory, 'program.py')]
+        result = self.run_program(args, True)
+        self.assertEqual(result.returncode, 0, result.stderr)
+        self.assertIn('--first-option', result.stdout)
+
+        with open(os.path.join(directory, 'program_options.py'), 'w') as fh:
+            fh.write("OPTION = '--second-option'\n")
+
+        result = self.run_program(args, True)
+        self.assertEqual(result.returncode, 0, result.stderr)
+        self.assertIn('--second-option', result.stdout)
+        self.assertNotIn('--first-option', result.stdout)
+
+    def test_watch_is_rejected(self):
+        output = os.path.join(self.tempdir.name, 'completion.bash')
+        result = self.run_program(['--allow-python', '--watch', '-o', output, 'bash', 'argparse-shell-complete-test'], True)
+        self.assertEqual(result.returncode, 1)
+        self.assertIn('--watch is not supported by the server', result.stderr)
+
+        result = self.run_program(['--allow-python', '--profile-trace', 'trace.json', 'bash', 'argparse-shell-complete-test'], True)
+        self.assertEqual(result.returncode, 1)
+        self.assertIn('--profile-trace requires an absolute path', result.stderr)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,154 @@
+#!/usr/bin/python3
+
+import os
+import sys
+import time
+import tempfile
+import threading
+import unittest
+import subprocess
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from argparse_shell_complete import server, watcher
+
+TEST_DIR = os.path.dirname(os.path.abspath(__file__))
+PROGRAM = os.path.join(TEST_DIR, '..', 'argparse-shell-complete')
+
+PROGRAM_SOURCE = '''\
+import os
+import time
+import argparse
+
+# Tell the test that the source is being loaded, and give it time to edit it
+open(os.path.join(os.path.dirname(os.path.abspath(__file__)), 'started'), 'w').close()
+time.sleep(%(delay)s)
+
+argp = argparse.ArgumentParser(prog='program')
+argp.add_argument('%(option)s')
+'''
+
+def write_file(file, content):
+    with open(file, 'w') as fh:
+        fh.write(content)
+
+def replace_file(file, content):
+    # Editors often write a new file and rename it
+    write_file(file + '.tmp', content)
+    os.rename(file + '.tmp', file)
+
+def wait_for(condition, timeout=10):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            return False
+        time.sleep(0.05)
+    return True
+
+class WatcherTestBase:
+    def make_watcher(self, files):
+        raise NotImplementedError
+
+    def setUp(self):
+        self.tempdir = tempfile.TemporaryDirectory()
+        self.file = os.path.join(self.tempdir.name, 'source.py')
+        self.other = os.path.join(self.tempdir.name, 'other.py')
+        write_file(self.file, 'a')
+        write_file(self.other, 'a')
+
+    def tearDown(self):
+        self.tempdir.cleanup()
+
+    def wait_after(self, w, action):
+        timer = threading.Timer(0.3, action)
+        timer.start()
+        try:
+            return w.wait()
+        finally:
+            timer.join()
+            w.close()
+
+    def test_write(self):
+        w = self.make_watcher([self.file])
+        self.assertEqual(self.wait_after(w, lambda: write_file(self.file, 'bb')), {self.file})
+
+    def test_replace(self):
+        w = self.make_watcher([self.file])
+        self.assertEqual(self.wait_after(w, lambda: replace_file(self.file, 'bb')), {self.file})
+
+    def test_change_before_wait(self):
+        w = self.make_watcher([self.file, self.other])
+        write_file(self.other, 'bb')
+        try:
+            self.assertEqual(w.wait(), {self.other})
+        finally:
+            w.close()
+
+    def test_other_files_are_ignored(self):
+        w = self.make_watcher([self.file])
+        def action():
+            write_file(os.path.join(self.tempdir.name, 'unrelated'), 'b')
+            time.sleep(0.6)
+            write_file(self.file, 'bb')
+        self.assertEqual(self.wait_after(w, action), {self.file})
+
+@unittest.skipUnless(watcher._load_libc() is not None, 'inotify not available')
+class InotifyWatcherTest(WatcherTestBase, unittest.TestCase):
+    def make_watcher(self, files):
+        return watcher.InotifyWatcher(files, watcher._load_libc(), debounce=0.1)
+
+    def test_make_watcher(self):
+        w = watcher.make_watcher([self.file])
+        w.close()
+        self.assertIsInstance(w, watcher.InotifyWatcher)
+
+class PollingWatcherTest(WatcherTestBase, unittest.TestCase):
+    def make_watcher(self, files):
+        return watcher.PollingWatcher(files, debounce=0.1)
+
+class WatchTest(unittest.TestCase):
+    def setUp(self):
+        self.tempdir = tempfile.TemporaryDirectory()
+        self.source = os.path.join(self.tempdir.name, 'program.py')
+        self.output = os.path.join(self.tempdir.name, 'program.bash')
+        self.started = os.path.join(self.tempdir.name, 'started')
+        self.process = None
+
+    def tearDown(self):
+        if self.process is not None:
+            self.process.terminate()
+            self.process.wait()
+        self.tempdir.cleanup()
+
+    def start(self):
+        env = dict(os.environ)
+        env.pop(server.SOCKET_ENVIRONMENT_VARIABLE, None)
+        self.process = subprocess.Popen([sys.executable, PROGRAM, '--allow-python', '--watch',
+            '-o', self.output, 'bash', self.source], env=env, stderr=subprocess.DEVNULL)
+
+    def output_contains(self, string):
+        try:
+            with open(self.output) as fh:
+                return string in fh.read()
+        except OSError:
+            return False
+
+    def test_regenerate(self):
+        write_file(self.source, PROGRAM_SOURCE % {'option': '--first-option', 'delay': 0})
+        self.start()
+        self.assertTrue(wait_for(lambda: self.output_contains('--first-option')))
+
+        replace_file(self.source, PROGRAM_SOURCE % {'option': '--second-option', 'delay': 0})
+        self.assertTrue(wait_for(lambda: self.output_contains('--second-option')))
+
+    def test_change_while_generating(self):
+        write_file(self.source, PROGRAM_SOURCE % {'option': '--first-option', 'delay': 1})
+        self.start()
+
+        # Edit the source while the first version is being loaded
+        self.assertTrue(wait_for(lambda: os.path.exists(self.started)))
+        replace_file(self.source, PROGRAM_SOURCE % {'option': '--second-option', 'delay': 0})
+        self.assertTrue(wait_for(lambda: self.output_contains('--second-option')))
+
+if __name__ == '__main__':
+    unittest.main()
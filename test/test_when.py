@@ -0,0 +1,28 @@
+#!/usr/bin/python3
+
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from argparse_shell_complete import when
+
+class ParseWhenTest(unittest.TestCase):
+    def test_shared_result(self):
+        parsed = when.parse_when('option_is --var -V -- foo bar')
+        self.assertIsInstance(parsed, when.OptionIs)
+        self.assertIs(when.parse_when('option_is --var -V -- foo bar'), parsed)
+
+    def test_cache_is_bounded(self):
+        for i in range(when.PARSE_CACHE_SIZE + 100):
+            when.parse_when('has_option --option-%d' % i)
+        self.assertEqual(when.parse_when.cache_info().currsize, when.PARSE_CACHE_SIZE)
+
+    def test_invalid_command(self):
+        for i in range(2):
+            with self.assertRaises(Exception):
+                when.parse_when('no_such_command --var')
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,44 @@
+#!/usr/bin/python3
+
+import os
+import sys
+import shutil
+import tempfile
+import unittest
+import subprocess
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from argparse_shell_complete import zsh
+
+TEST_DIR = os.path.dirname(os.path.abspath(__file__))
+PROGRAM = os.path.join(TEST_DIR, '..', 'argparse-shell-complete')
+
+def run_program(args):
+    env = dict(os.environ)
+    env.pop('ARGPARSE_SHELL_COMPLETE_SERVER', None)
+    return subprocess.run([sys.executable, PROGRAM, '--allow-python'] + args, cwd=TEST_DIR, env=env,
+        stdout=subprocess.PIPE, stderr=subprocess.PIPE, universal_newlines=True)
+
+class ZcompileTest(unittest.TestCase):
+    def test_requires_output(self):
+        result = run_program(['--zsh-zcompile=true', 'zsh', 'argparse-shell-complete-test'])
+        self.assertEqual(result.returncode, 1)
+        self.assertEqual(result.stdout, '')
+        self.assertIn('--zsh-zcompile requires --output', result.stderr)
+
+    @unittest.skipUnless(shutil.which('zsh'), 'zsh not installed')
+    def test_compile(self):
+        with tempfile.TemporaryDirectory() as tempdir:
+            output = os.path.join(tempdir, '_argparse-shell-complete-test')
+            result = run_program(['--zsh-zcompile=true', '--zsh-compdef=true', '-o', output,
+                'zsh', 'argparse-shell-complete-test'])
+            self.assertEqual(result.returncode, 0, result.stderr)
+            self.assertTrue(os.path.exists(zsh.get_compiled_file(output)))
+
+            # The compiled file defines the same functions as the source
+            code = 'fpath=(%s $fpath); autoload -Uz +X _argparse-shell-complete-test && print ok' % tempdir
+            self.assertEqual(subprocess.check_output(['zsh', '-f', '-c', code], universal_newlines=True), 'ok\n')
+
+if __name__ == '__main__':
+    unittest.main()
@@ -968,4 +968,523 @@ repeated1  (Repeated positional)  repeated2  (Repeated positional)\
 '''
 },
 
+{'generate-scripts': ['--minify=true']},
+
+{
+ 'number': 50,
+ 'description': 'minify: No arguments, check if all commands are listed',
+ 'send': 'argparse-shell-complete-test ',
+ 'bash_expected': '''\
+> argparse-shell-complete-test
+alias1            argparse-actions  subcommand        when
+alias2            complete          test
+> argparse-shell-complete-test\
+''',
+ 'fish_skip': 'Expected output not yet generated by running fish',
+ 'fish_expected': '''\
+> argparse-shell-complete-test
+alias1        (For testing the completer)  subcommand  (Test nested subcommands)
+alias2        (For testing the completer)  test      (For testing the completer)
+argparse-actions  (argparse tool actions)  when        (Test the "when"-feature)
+complete         (Test complete commands)\
+''',
+ 'zsh_skip': 'Expected output not yet generated by running zsh',
+ 'zsh_expected': '''\
+> argparse-shell-complete-test
+alias2            alias1  test  -- For testing the completer
+argparse-actions                -- argparse tool actions
+complete                        -- Test complete commands
+subcommand                      -- Test nested subcommands
+when                            -- Test the "when"-feature\
+'''
+},
+
+{
+ 'number': 51,
+ 'description': 'minify: Check if all options are listed',
+ 'send': 'argparse-shell-complete-test test -',
+ 'bash_expected': '''\
+> argparse-shell-complete-test test -
+-A                              -h
+--arg                           --help
+-arg                            --multiple-arg
+--exclusive-1                   --multiple-flag
+--exclusive-2                   -O
+-F                              --optional
+--flag                          -optional
+-flag                           --special-chars-in-description
+> argparse-shell-complete-test test -\
+''',
+ 'fish_skip': 'Expected output not yet generated by running fish',
+ 'fish_expected': '''\
+> argparse-shell-complete-test test -
+-A  -arg  --arg                                        (Option with arg)
+-F  -flag  --flag                                        (A option flag)
+-h  --help                             (show this help message and exit)
+-O  -optional  --optional  --optional=        (Option with optional arg)
+--exclusive-1
+--exclusive-2
+--multiple-arg
+--multiple-flag
+--special-chars-in-description  (Here are some special chars: $"'\\[]*`))\
+''',
+ 'zsh_skip': 'Expected output not yet generated by running zsh',
+ 'zsh_expected': '''\
+> argparse-shell-complete-test test -
+--exclusive-1      --exclusive-2      --multiple-arg     --multiple-flag
+--arg
+-arg                            -A  -- Option with arg
+--flag
+-flag                           -F  -- A option flag
+--help                          -h  -- show this help message and exit
+--optional
+-optional                       -O  -- Option with optional arg
+--special-chars-in-description      -- Here are some special chars: $"'\\[]*`)\
+'''
+},
+
+{
+ 'number': 52,
+ 'description': 'minify: Check long option with argument (with equal sign)',
+ 'send': 'argparse-shell-complete-test test --arg=',
+ 'bash_expected': '''\
+> argparse-shell-complete-test test --arg=
+1  2  3
+> argparse-shell-complete-test test --arg=\
+''',
+ 'fish_skip': 'Expected output not yet generated by running fish',
+ 'fish_expected': '''\
+> argparse-shell-complete-test test --arg=
+--arg=1  (Option with arg)  --arg=3  (Option with arg)
+--arg=2  (Option with arg)\
+''',
+ 'zsh_skip': 'Expected output not yet generated by running zsh',
+ 'zsh_expected': '''\
+> argparse-shell-complete-test test --arg=
+1  2  3\
+'''
+},
+
+{
+ 'number': 53,
+ 'description': 'minify: Check short option with optional argument',
+ 'comment': 'FISH has a slightly wrong output',
+ 'send': 'argparse-shell-complete-test test -O',
+ 'bash_expected': '''\
+> argparse-shell-complete-test test -O
+-O1  -O2  -O3
+> argparse-shell-complete-test test -O\
+''',
+ 'fish_skip': 'Expected output not yet generated by running fish',
+ 'fish_expected': '''\
+> argparse-shell-complete-test test -O
+-O1  (Option with optional arg)  -OA                  (Option with arg)
+-O2  (Option with optional arg)  -OF                    (A option flag)
+-O3  (Option with optional arg)  -Oh  (show this help message and exit)\
+''',
+ 'zsh_skip': 'Expected output not yet generated by running zsh',
+ 'zsh_expected': '''\
+> argparse-shell-complete-test test -O
+1  2  3\
+'''
+},
+
+{
+ 'number': 54,
+ 'description': 'minify: Check if mutually exclusive options work',
+ 'send': 'argparse-shell-complete-test test --exclusive-1 --exclusive',
+ 'bash_expected': '''\
+> argparse-shell-complete-test test --exclusive-1 --exclusive\
+''',
+ 'fish_skip': 'Expected output not yet generated by running fish',
+ 'fish_expected': '''\
+> argparse-shell-complete-test test --exclusive-1 --exclusive\
+''',
+ 'zsh_skip': 'Expected output not yet generated by running zsh',
+ 'zsh_expected': '''\
+> argparse-shell-complete-test test --exclusive-1 --exclusive\
+'''
+},
+
+{
+ 'number': 55,
+ 'description': 'minify: Check option stacking (with required argument and space)',
+ 'send': 'argparse-shell-complete-test test -FA ',
+ 'bash_expected': '''\
+> argparse-shell-complete-test test -FA
+1  2  3
+> argparse-shell-complete-test test -FA\
+''',
+ 'fish_skip': 'Expected output not yet generated by running fish',
+ 'fish_expected': '''\
+> argparse-shell-complete-test test -FA
+1  (Option with arg)  2  (Option with arg)  3  (Option with arg)\
+''',
+ 'zsh_skip': 'Expected output not yet generated by running zsh',
+ 'zsh_expected': '''\
+> argparse-shell-complete-test test -FA
+1  2  3\
+'''
+},
+
+{
+ 'number': 56,
+ 'description': 'minify: when: Check if --if-var and --if-var-is-foo appears (with -V foo)',
+ 'send': 'argparse-shell-complete-test when -V foo --if-',
+ 'bash_expected': '''\
+> argparse-shell-complete-test when -V foo --if-
+--if-var         --if-var-is-foo
+> argparse-shell-complete-test when -V foo --if-var\
+''',
+ 'fish_skip': 'Expected output not yet generated by running fish',
+ 'fish_expected': '''\
+> argparse-shell-complete-test when -V foo --if-var
+--if-var              (Only show option if --var is given)
+--if-var-is-foo  (Only show option if --var is foo or bar)\
+''',
+ 'zsh_tabs': 2,
+ 'zsh_skip': 'Expected output not yet generated by running zsh',
+ 'zsh_expected': '''\
+> argparse-shell-complete-test when -V foo --if-var
+--if-var-is-foo  -- Only show option if --var is foo or bar
+--if-var         -- Only show option if --var is given\
+'''
+},
+
+{
+ 'number': 57,
+ 'description': 'minify: when: Check if --if-optional and --if-optional-is-foo appears (with -Ofoo)',
+ 'send': 'argparse-shell-complete-test when -Ofoo --if-',
+ 'bash_expected': '''\
+> argparse-shell-complete-test when -Ofoo --if-
+--if-optional         --if-optional-is-foo
+> argparse-shell-complete-test when -Ofoo --if-optional\
+''',
+ 'fish_skip': 'Expected output not yet generated by running fish',
+ 'fish_expected': '''\
+> argparse-shell-complete-test when -Ofoo --if-optional
+…-optional       (Only show option if --optional is given)
+…-optional-is-foo  (Only show option if --optional is foo)\
+''',
+ 'zsh_tabs': 2,
+ 'zsh_skip': 'Expected output not yet generated by running zsh',
+ 'zsh_expected': '''\
+> argparse-shell-complete-test when -Ofoo --if-optional
+--if-optional-is-foo  -- Only show option if --optional is foo
+--if-optional         -- Only show option if --optional is given\
+'''
+},
+
+{
+ 'number': 58,
+ 'description': 'minify: complete: Check --exec',
+ 'send': 'argparse-shell-complete-test complete --exec ',
+ 'bash_expected': '''\
+> argparse-shell-complete-test complete --exec
+Item\\ 1  Item\\ 2
+> argparse-shell-complete-test complete --exec Item\\\
+''',
+ 'fish_skip': 'Expected output not yet generated by running fish',
+ 'fish_expected': '''\
+> argparse-shell-complete-test complete --exec Item\\
+Item 1  (Description 1)  Item 2  (Description 2)\
+''',
+ 'zsh_skip': 'Expected output not yet generated by running zsh',
+ 'zsh_expected': '''\
+> argparse-shell-complete-test complete --exec Item\\\
+'''
+},
+
+{
+ 'number': 59,
+ 'description': 'minify: complete: Check --value-list #3',
+ 'send': 'argparse-shell-complete-test complete --value-list foo',
+ 'bash_expected': '''\
+> argparse-shell-complete-test complete --value-list foo\
+''',
+ 'fish_skip': 'Expected output not yet generated by running fish',
+ 'fish_expected': '''\
+> argparse-shell-complete-test complete --value-list foo\
+''',
+ 'zsh_skip': 'Expected output not yet generated by running zsh',
+ 'zsh_expected': '''\
+> argparse-shell-complete-test complete --value-list foo,\
+'''
+},
+
+{
+ 'number': 60,
+ 'description': 'minify: Check if positionals are working (1st positional)',
+ 'send': 'argparse-shell-complete-test test ',
+ 'bash_expected': '''\
+> argparse-shell-complete-test test
+first1  first2  first3
+> argparse-shell-complete-test test first\
+''',
+ 'fish_skip': 'Expected output not yet generated by running fish',
+ 'fish_expected': '''\
+> argparse-shell-complete-test test first
+first1  (First positional)  first3  (First positional)
+first2  (First positional)\
+''',
+ 'zsh_skip': 'Expected output not yet generated by running zsh',
+ 'zsh_expected': '''\
+> argparse-shell-complete-test test first\
+'''
+},
+
+{
+ 'number': 61,
+ 'description': 'minify: Check if aliases are working (alias1)',
+ 'send': 'argparse-shell-complete-test alias1 --arg ',
+ 'bash_expected': '''\
+> argparse-shell-complete-test alias1 --arg
+1  2  3
+> argparse-shell-complete-test alias1 --arg\
+''',
+ 'fish_skip': 'Expected output not yet generated by running fish',
+ 'fish_expected': '''\
+> argparse-shell-complete-test alias1 --arg
+1  (Option with arg)  2  (Option with arg)  3  (Option with arg)\
+''',
+ 'zsh_skip': 'Expected output not yet generated by running zsh',
+ 'zsh_expected': '''\
+> argparse-shell-complete-test alias1 --arg
+1  2  3\
+'''
+},
+
+{'generate-scripts': []},
+
+{
+ 'number': 62,
+ 'description': 'Check if mutually exclusive options work in a subcommand',
+ 'send': 'argparse-shell-complete-test subcommand --exclusive-1 --exclusive-',
+ 'bash_expected': '''\
+> argparse-shell-complete-test subcommand --exclusive-1 --exclusive-flag\
+''',
+ 'fish_skip': 'Expected output not yet generated by running fish',
+ 'fish_expected': '''\
+> argparse-shell-complete-test subcommand --exclusive-1 --exclusive-flag\
+''',
+ 'zsh_skip': 'Expected output not yet generated by running zsh',
+ 'zsh_expected': '''\
+> argparse-shell-complete-test subcommand --exclusive-1 --exclusive-flag\
+'''
+},
+
+{
+ 'number': 63,
+ 'description': 'Check a mutually exclusive group with more than 62 repeatable options',
+ 'send': 'argparse-shell-complete-test subcommand --many-1 --many-',
+ 'bash_expected': '''\
+> argparse-shell-complete-test subcommand --many-1 --many-1\
+''',
+ 'fish_skip': 'Expected output not yet generated by running fish',
+ 'fish_expected': '''\
+> argparse-shell-complete-test subcommand --many-1 --many-1\
+''',
+ 'zsh_skip': 'Expected output not yet generated by running zsh',
+ 'zsh_expected': '''\
+> argparse-shell-complete-test subcommand --many-1 --many-1\
+'''
+},
+
+{
+ 'number': 64,
+ 'description': 'Check if mutually exclusive options work in a nested subcommand',
+ 'send': 'argparse-shell-complete-test subcommand sub-subcommand --sub-first --sub-s',
+ 'bash_expected': '''\
+> argparse-shell-complete-test subcommand sub-subcommand --sub-first --sub-subco
+mmand-choices\
+''',
+ 'fish_skip': 'Expected output not yet generated by running fish',
+ 'fish_expected': '''\
+> argparse-shell-complete-test subcommand sub-subcommand --sub-first --sub-subco
+mmand-choices\
+''',
+ 'zsh_skip': 'Expected output not yet generated by running zsh',
+ 'zsh_expected': '''\
+> argparse-shell-complete-test subcommand sub-subcommand --sub-first --sub-subco
+mmand-choices\
+'''
+},
+
+{
+ 'number': 65,
+ 'description': 'Check if a parent group does not affect a nested group',
+ 'send': 'argparse-shell-complete-test subcommand --exclusive-1 sub-subcommand --sub-f',
+ 'bash_expected': '''\
+> argparse-shell-complete-test subcommand --exclusive-1 sub-subcommand --sub-fir
+st\
+''',
+ 'fish_skip': 'Expected output not yet generated by running fish',
+ 'fish_expected': '''\
+> argparse-shell-complete-test subcommand --exclusive-1 sub-subcommand --sub-fir
+st\
+''',
+ 'zsh_skip': 'Expected output not yet generated by running zsh',
+ 'zsh_expected': '''\
+> argparse-shell-complete-test subcommand --exclusive-1 sub-subcommand --sub-fir
+st\
+'''
+},
+
+{
+ 'number': 66,
+ 'description': 'Check if a parent group does not affect a nested group (option after subcommand)',
+ 'send': 'argparse-shell-complete-test subcommand sub-subcommand --exclusive-1 --sub-f',
+ 'bash_expected': '''\
+> argparse-shell-complete-test subcommand sub-subcommand --exclusive-1 --sub-fir
+st\
+''',
+ 'fish_skip': 'Expected output not yet generated by running fish',
+ 'fish_expected': '''\
+> argparse-shell-complete-test subcommand sub-subcommand --exclusive-1 --sub-fir
+st\
+''',
+ 'zsh_skip': 'Expected output not yet generated by running zsh',
+ 'zsh_expected': '''\
+> argparse-shell-complete-test subcommand sub-subcommand --exclusive-1 --sub-fir
+st\
+'''
+},
+
+{'generate-scripts': ['--bash-single-pass=true', '--inherit-options=true']},
+
+{
+ 'number': 67,
+ 'description': 'single-pass: Check if mutually exclusive options work in a subcommand',
+ 'send': 'argparse-shell-complete-test subcommand --exclusive-1 --exclusive-',
+ 'bash_expected': '''\
+> argparse-shell-complete-test subcommand --exclusive-1 --exclusive-flag\
+''',
+ 'fish_skip': 'Expected output not yet generated by running fish',
+ 'fish_expected': '''\
+> argparse-shell-complete-test subcommand --exclusive-1 --exclusive-flag\
+''',
+ 'zsh_skip': 'Expected output not yet generated by running zsh',
+ 'zsh_expected': '''\
+> argparse-shell-complete-test subcommand --exclusive-1 --exclusive-flag\
+'''
+},
+
+{
+ 'number': 68,
+ 'description': 'single-pass: Check a mutually exclusive group with more than 62 repeatable options',
+ 'send': 'argparse-shell-complete-test subcommand --many-1 --many-',
+ 'bash_expected': '''\
+> argparse-shell-complete-test subcommand --many-1 --many-1\
+''',
+ 'fish_skip': 'Expected output not yet generated by running fish',
+ 'fish_expected': '''\
+> argparse-shell-complete-test subcommand --many-1 --many-1\
+''',
+ 'zsh_skip': 'Expected output not yet generated by running zsh',
+ 'zsh_expected': '''\
+> argparse-shell-complete-test subcommand --many-1 --many-1\
+'''
+},
+
+{
+ 'number': 69,
+ 'description': 'single-pass: Check if mutually exclusive options work in a nested subcommand',
+ 'send': 'argparse-shell-complete-test subcommand sub-subcommand --sub-first --sub-s',
+ 'bash_expected': '''\
+> argparse-shell-complete-test subcommand sub-subcommand --sub-first --sub-subco
+mmand-choices\
+''',
+ 'fish_skip': 'Expected output not yet generated by running fish',
+ 'fish_expected': '''\
+> argparse-shell-complete-test subcommand sub-subcommand --sub-first --sub-subco
+mmand-choices\
+''',
+ 'zsh_skip': 'Expected output not yet generated by running zsh',
+ 'zsh_expected': '''\
+> argparse-shell-complete-test subcommand sub-subcommand --sub-first --sub-subco
+mmand-choices\
+'''
+},
+
+{
+ 'number': 70,
+ 'description': 'single-pass: Check if a parent group does not affect a nested group',
+ 'send': 'argparse-shell-complete-test subcommand --exclusive-1 sub-subcommand --sub-f',
+ 'bash_expected': '''\
+> argparse-shell-complete-test subcommand --exclusive-1 sub-subcommand --sub-fir
+st\
+''',
+ 'fish_skip': 'Expected output not yet generated by running fish',
+ 'fish_expected': '''\
+> argparse-shell-complete-test subcommand --exclusive-1 sub-subcommand --sub-fir
+st\
+''',
+ 'zsh_skip': 'Expected output not yet generated by running zsh',
+ 'zsh_expected': '''\
+> argparse-shell-complete-test subcommand --exclusive-1 sub-subcommand --sub-fir
+st\
+'''
+},
+
+{
+ 'number': 71,
+ 'description': 'single-pass: Check if a parent group does not affect a nested group (option after subcommand)',
+ 'send': 'argparse-shell-complete-test subcommand sub-subcommand --exclusive-1 --sub-f',
+ 'bash_expected': '''\
+> argparse-shell-complete-test subcommand sub-subcommand --exclusive-1 --sub-fir
+st\
+''',
+ 'fish_skip': 'Expected output not yet generated by running fish',
+ 'fish_expected': '''\
+> argparse-shell-complete-test subcommand sub-subcommand --exclusive-1 --sub-fir
+st\
+''',
+ 'zsh_skip': 'Expected output not yet generated by running zsh',
+ 'zsh_expected': '''\
+> argparse-shell-complete-test subcommand sub-subcommand --exclusive-1 --sub-fir
+st\
+'''
+},
+
+{'generate-scripts': ['--bash-max-candidates=4']},
+
+{
+ 'number': 72,
+ 'description': 'max-candidates: Check if the number of candidates is limited',
+ 'send': 'argparse-shell-complete-test subcommand --many-',
+ 'bash_expected': '''\
+> argparse-shell-complete-test subcommand --many-
+--many-0             --many-2             (59 more not shown)
+--many-1             --many-3
+> argparse-shell-complete-test subcommand --many-\
+''',
+ 'fish_skip': '--bash-max-candidates only affects bash',
+ 'fish_expected': '''\
+\
+''',
+ 'zsh_skip': '--bash-max-candidates only affects bash',
+ 'zsh_expected': '''\
+\
+'''
+},
+
+{
+ 'number': 73,
+ 'description': 'max-candidates: Check if fewer candidates are not changed',
+ 'send': 'argparse-shell-complete-test subcommand --exclusive-',
+ 'bash_expected': '''\
+> argparse-shell-complete-test subcommand --exclusive-
+--exclusive-flag  --exclusive-1     --exclusive-2
+> argparse-shell-complete-test subcommand --exclusive-\
+''',
+ 'fish_skip': '--bash-max-candidates only affects bash',
+ 'fish_expected': '''\
+\
+''',
+ 'zsh_skip': '--bash-max-candidates only affects bash',
+ 'zsh_expected': '''\
+\
+'''
+},
+
 ]
\ No newline at end of file